@@ -1,34 +1,26 @@
 # agents/boss_agent.py
-from crewai import Agent, Task
-# --- Use ChatOpenAI ---
-from langchain_openai import ChatOpenAI
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-# --- Instantiate ChatOpenAI with Concurrency Limit ---
-llm = ChatOpenAI(
-    model_name="gpt-3.5-turbo", # Or your preferred model
-    openai_api_key=openai_api_key,
-    temperature=0.7,
-    max_concurrency=10 # Limit concurrent requests for this LLM instance
-)
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING: from crewai import Agent, Task
+# crewai and the shared LLM (core/llm_pool.py) are loaded on first use, not at import
 
 def create_boss_agent():
-    """Creates the Boss Agent using ChatOpenAI."""
+    """Creates the Boss Agent using the shared crewai LLM."""
+    from crewai import Agent
+    from core.llm_pool import get_crew_llm
     return Agent(
         role="Boss",
         goal="Review and validate drafts to ensure they meet quality standards.",
         backstory="You are a strict editor with high standards, ensuring every draft meets tone, length, and depth requirements.",
         verbose=False,
-        llm=llm # Use the configured ChatOpenAI instance
+        llm=get_crew_llm("boss") # Shared crewai LLM with the pooled route settings
     )
 
 def validation_task(agent: Agent, draft: str, research_content: str, content_tone: str, content_length: str) -> Task:
     """Creates the validation task for the Boss Agent."""
     # (Task description remains the same as the previous version)
+    from crewai import Task
     return Task(
         description=f"""
         Validate the following draft:
@@ -55,4 +47,45 @@ def validation_task(agent: Agent, draft: str, research_content: str, content_ton
         """,
         agent=agent,
         expected_output="A single JSON object string with 'approved' (boolean) and 'issues' (list of feedback dictionaries or empty list)."
-    )
\ No newline at end of file
+    )
+
+def section_validation_task(agent: Agent, numbered_draft: str, research_content: str, content_tone: str, content_length: str, previous_feedback: str = None) -> Task:
+    """Validation task for patch-based revisions: issues name the draft section they apply to.
+    With previous_feedback, only the rewritten sections are shown in full and the review focuses on them."""
+    from crewai import Task
+    focus = ""
+    if previous_feedback:
+        focus = f"""
+        Only the sections rewritten in the last revision are shown in full; sections marked (unchanged) were already reviewed.
+        Check whether the rewritten sections fix this earlier feedback, and judge the draft as a whole from there:
+        --- PREVIOUS FEEDBACK START ---
+        {previous_feedback}
+        --- PREVIOUS FEEDBACK END ---
+        """
+    return Task(
+        description=f"""
+        Validate the following draft. It is split into numbered sections [S1], [S2], ...
+        --- DRAFT START ---
+        {numbered_draft}
+        --- DRAFT END ---
+        {focus}
+        Research Content (for context):
+        --- RESEARCH START ---
+        {research_content}
+        --- RESEARCH END ---
+
+        Requirements: Must match {content_tone} tone and {content_length} length, and have sufficient depth based on the research.
+
+        If the draft does not meet requirements, provide specific, actionable feedback tied to the section that must change.
+
+        Output your response ONLY as a valid JSON object string. Start directly with {{ and end directly with }}. No other text before or after.
+        The JSON object must have two keys:
+        1. 'approved' (boolean): true if the draft meets all requirements, false otherwise.
+        2. 'issues' (list): If 'approved' is false, one dictionary per problem with 'section' (the section number, e.g. 3, or null if the problem concerns the whole draft) and 'instructions' (specific feedback). If 'approved' is true, this should be an empty list [].
+
+        Example Output (Not Approved): {{"approved": false, "issues": [{{"section": 2, "instructions": "Support the claim with a statistic from the research."}}, {{"section": 5, "instructions": "Conclusion is too abrupt; add a call to action."}}]}}
+        Example Output (Approved): {{"approved": true, "issues": []}}
+        """,
+        agent=agent,
+        expected_output="A single JSON object string with 'approved' (boolean) and 'issues' (list of {section, instructions} dictionaries or empty list)."
+    )
@@ -1,29 +1,20 @@
 # agents/filter_agent.py
-from crewai import Agent, Task
-# --- Use ChatOpenAI ---
-from langchain_openai import ChatOpenAI
-import os
-from dotenv import load_dotenv
+from __future__ import annotations
+from typing import TYPE_CHECKING
 
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-# --- Instantiate ChatOpenAI with Concurrency Limit ---
-llm = ChatOpenAI(
-    model_name="gpt-3.5-turbo", # Or your preferred model
-    openai_api_key=openai_api_key,
-    temperature=0.7,
-    max_concurrency=10 # Limit concurrent requests for this LLM instance
-)
+if TYPE_CHECKING: from crewai import Agent, Task
+# crewai and the shared LLM (core/llm_pool.py) are loaded on first use, not at import
 
 def create_filter_agent():
-    """Creates the Filter Agent using ChatOpenAI."""
+    """Creates the Filter Agent using the shared crewai LLM."""
+    from crewai import Agent
+    from core.llm_pool import get_crew_llm
     return Agent(
         role="Idea Filter",
         goal="Filter and rank ideas based on relevance and feasibility, outputting the result strictly in JSON format.",
         backstory="You are a precise analytical agent who evaluates ideas and outputs results in structured JSON format. You never include any text outside the JSON object.",
         verbose=False,
-        llm=llm, # Use the configured ChatOpenAI instance
+        llm=get_crew_llm("filter"), # Shared crewai LLM with the pooled route settings
         allow_delegation=False,
         max_iterations=1
     )
@@ -36,6 +27,7 @@ def filter_ideas_task(agent: Agent, ideas: list, niche: str, target_audience: st
     else:
         ideas_str = str(ideas)
 
+    from crewai import Task
     return Task(
         description=f"""
         **System Instruction**: You are a JSON output generator. Your response must be ONLY a valid JSON string. Start directly with {{ and end directly with }}. No other text, commentary, or explanations.
@@ -1,43 +1,17 @@
 # agents/idea_agent.py
-from crewai import Agent, Task
-# --- Use ChatOpenAI ---
-from langchain_openai import ChatOpenAI
-from crewai.tools import BaseTool
-from langchain_community.tools import DuckDuckGoSearchRun
-import os
-from dotenv import load_dotenv
-import re
-
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key: raise ValueError("OPENAI_API_KEY not found")
+from __future__ import annotations
+from typing import TYPE_CHECKING
 
-# --- Instantiate ChatOpenAI with Concurrency Limit ---
-llm = ChatOpenAI(
-    model_name="gpt-3.5-turbo", # Or your preferred model
-    openai_api_key=openai_api_key,
-    temperature=0.7,
-    max_concurrency=10 # Limit concurrent requests for this LLM instance
-)
-
-# --- Define the Custom Tool Wrapper (remains the same) ---
-class WebSearchTool(BaseTool):
-    name: str = "DuckDuckGo Web Search"
-    description: str = "Search the web for information, trends, articles. Input is a search query."
-    def _run(self, query: str) -> str:
-        duckduckgo_search = DuckDuckGoSearchRun()
-        try:
-            print(f"Executing search for: {query}")
-            response = duckduckgo_search.invoke(query)
-            print(f"Search response length: {len(response)}")
-            max_length = 2000 # Truncate long search results
-            if len(response) > max_length: response = response[:max_length] + "... (truncated)"
-            return response
-        except Exception as e: print(f"Search failed for '{query}': {e}"); return f"Error: {e}"
+if TYPE_CHECKING: from crewai import Agent, Task
+# crewai and the shared LLM (core/llm_pool.py) are loaded on first use, not at import
+import re
 
 # --- Define the Idea Agent using the Custom Tool ---
 def create_idea_agent():
-    """Creates an Idea Agent using ChatOpenAI."""
+    """Creates an Idea Agent using the shared crewai LLM."""
+    from crewai import Agent
+    from core.llm_pool import get_crew_llm
+    from agents.tools import WebSearchTool
     return Agent(
         role="Trend Analyst and Idea Generator",
         goal=(
@@ -52,7 +26,7 @@ def create_idea_agent():
             "synthesize trends, and then brainstorm original content ideas."
         ),
         verbose=False,
-        llm=llm, # Use the configured ChatOpenAI instance
+        llm=get_crew_llm("idea"), # Shared crewai LLM with the pooled route settings
         tools=[WebSearchTool()],
         allow_delegation=False
     )
@@ -63,6 +37,7 @@ def idea_generation_task(agent: Agent, niche: str, content_type: str, target_aud
     keyword_string = ", ".join(keywords)
     search_query_hint = f"recent popular articles {niche} {keyword_string} site:medium.com"
 
+    from crewai import Task
     return Task(
         description=f"""
         **Objective**: Generate exactly {num_ideas} distinct content ideas for '{content_type}' based on current trends observed on Medium.
@@ -1,44 +1,45 @@
 # agents/research_agent.py
-from crewai import Agent, Task
-# --- Use ChatOpenAI ---
-from langchain_openai import ChatOpenAI
-import os
-from dotenv import load_dotenv
+from __future__ import annotations
+from typing import TYPE_CHECKING
 
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-# --- Instantiate ChatOpenAI with Concurrency Limit ---
-llm = ChatOpenAI(
-    model_name="gpt-3.5-turbo", # Or your preferred model
-    openai_api_key=openai_api_key,
-    temperature=0.7,
-    max_concurrency=10 # Limit concurrent requests for this LLM instance
-)
+if TYPE_CHECKING: from crewai import Agent, Task
+# crewai and the shared LLM (core/llm_pool.py) are loaded on first use, not at import
 
 def create_research_agent():
-    """Creates the Research Agent using ChatOpenAI."""
+    """Creates the Research Agent using the shared crewai LLM."""
+    from crewai import Agent
+    from core.llm_pool import get_crew_llm
+    from agents.tools import KnowledgeBaseTool
     return Agent(
         role="Researcher",
         goal="Conduct thorough, focused research on a specific topic to gather information for content creation.",
         backstory="You are a diligent researcher skilled at finding relevant, accurate, and detailed information from reliable sources. You focus specifically on the query provided.",
         verbose=False,
-        llm=llm # Use the configured ChatOpenAI instance
-        # tools=[] # Add WebSearchTool here if needed for researcher
+        llm=get_crew_llm("research"), # Shared crewai LLM with the pooled route settings
+        tools=[KnowledgeBaseTool()] # Check stored research before writing from scratch
     )
 
-def research_task(agent: Agent, idea: str, additional_context: str = None) -> Task:
-    """Creates the research task for the Research Agent."""
-    # (Task description remains the same as the previous version)
+def research_task(agent: Agent, idea: str, additional_context: str = None, existing_research: str = None) -> Task:
+    """Creates the research task for the Research Agent. With existing_research, only asks for what is missing."""
     query = idea
     if additional_context:
         query += f". Specifically focus on aspects related to: {additional_context}"
+    top_up = ""
+    if existing_research:
+        top_up = f"""
+        Research on a closely related topic already exists (below). Do NOT repeat it. Only add facts, statistics and examples that are missing for this exact topic.
+        --- EXISTING RESEARCH START ---
+        {existing_research}
+        --- EXISTING RESEARCH END ---
+        """
 
+    from crewai import Task
     return Task(
         description=f"""
         Conduct in-depth research on the following specific topic:
         '{query}'
-
+        {top_up}
+        First use the 'Research Knowledge Base' tool to check for stored research or documents on this topic, then fill any gaps.
         Gather relevant facts, statistics, examples, and key points that would be useful for creating content (like a blog post or newsletter) about this exact topic.
         Summarize the findings clearly and concisely. Ensure the information is accurate and directly related to the query.
         """,
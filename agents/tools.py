@@ -0,0 +1,34 @@
+# agents/tools.py
+"""CrewAI tools shared by the agents. Imported from the create_*_agent functions so crewai loads lazily."""
+from crewai.tools import BaseTool
+
+from core.search import get_search_service
+from vectorstore.chroma_setup import get_collection
+
+
+# --- Web search (backed by the shared, cached search service) ---
+class WebSearchTool(BaseTool):
+    name: str = "DuckDuckGo Web Search"
+    description: str = "Search the web for information, trends, articles. Input is a search query."
+    def _run(self, query: str) -> str:
+        # Normalization, TTL cache, request coalescing and truncation live in core/search.py
+        return get_search_service().search(query)
+
+
+# --- Retrieval over the 'research_docs' Chroma collection ---
+class KnowledgeBaseTool(BaseTool):
+    name: str = "Research Knowledge Base"
+    description: str = "Look up stored research notes and ingested documents related to a topic. Input is a search query."
+    def _run(self, query: str) -> str:
+        collection = get_collection()
+        if collection is None: return "Knowledge base unavailable."
+        try:
+            result = collection.query(query_texts=[query], n_results=3, include=["documents", "metadatas", "distances"])
+        except Exception as e: print(f"Knowledge base query failed for '{query}': {e}"); return f"Error: {e}"
+        documents = result["documents"][0] if result.get("documents") else []
+        if not documents: return "No stored research found."
+        entries = []
+        for document, metadata, distance in zip(documents, result["metadatas"][0], result["distances"][0]):
+            source = (metadata or {}).get("idea") or (metadata or {}).get("source", "unknown")
+            entries.append(f"[Source: {source} | distance {distance:.3f}]\n{document[:1500]}")
+        return "\n\n".join(entries)
@@ -1,24 +1,15 @@
 # agents/writer_agent.py
-from crewai import Agent, Task
-# --- Use ChatOpenAI ---
-from langchain_openai import ChatOpenAI
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-# --- Instantiate ChatOpenAI with Concurrency Limit ---
-llm = ChatOpenAI(
-    model_name="gpt-3.5-turbo", # Or your preferred model
-    openai_api_key=openai_api_key,
-    temperature=0.7,
-    max_concurrency=10 #Limit concurrent requests for this LLM instance
-)
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING: from crewai import Agent, Task
+# crewai and the shared LLM (core/llm_pool.py) are loaded on first use, not at import
 
 # Define the Writer Agent
 def create_writer_agent():
-    """Creates the Writer Agent using ChatOpenAI."""
+    """Creates the Writer Agent using the shared crewai LLM."""
+    from crewai import Agent
+    from core.llm_pool import get_crew_llm
     return Agent(
         role="Writer",
         goal="Create high-quality drafts based on research and revise them based on specific feedback.",
@@ -28,17 +19,21 @@ def create_writer_agent():
             "When feedback is provided, you carefully analyze it and thoughtfully revise your work to meet all requirements."
         ),
         verbose=False,
-        llm=llm # Use the configured ChatOpenAI instance
+        llm=get_crew_llm("writer") # Shared crewai LLM with the pooled route settings
     )
 
 # Define the Writing Task
-def writing_task(agent: Agent, idea: str, research_content: str, content_type: str, target_audience: str, content_tone: str, content_length: str) -> Task:
-    """Creates the initial writing task for the Writer Agent."""
+def writing_task(agent: Agent, idea: str, research_content: str, content_type: str, target_audience: str, content_tone: str, content_length: str,
+                 keywords: list = None, word_range: tuple = None) -> Task:
+    """Creates the initial writing task for the Writer Agent. keywords / word_range are the targets checked by core/draft_checks.py."""
     # (Task description remains the same as the previous version)
+    from crewai import Task
+    length_hint = f" ({word_range[0]}-{word_range[1]} words)" if word_range else ""
+    keyword_hint = f"\n        Work these keywords in naturally: {', '.join(keywords)}.\n" if keywords else ""
     return Task(
         description=f"""
-        Write a '{content_length.lower()}' length '{content_type.lower()}' piece for a '{target_audience.lower()}' audience in a '{content_tone.lower()}' tone.
-
+        Write a '{content_length.lower()}' length{length_hint} '{content_type.lower()}' piece for a '{target_audience.lower()}' audience in a '{content_tone.lower()}' tone.
+{keyword_hint}
         The main topic is: "{idea}"
 
         Use the following Research Content as the basis for your writing. Incorporate the key findings and information naturally within the text:
@@ -56,6 +51,7 @@ def writing_task(agent: Agent, idea: str, research_content: str, content_type: s
 def revision_task(agent: Agent, draft: str, feedback: str, content_type: str, target_audience: str, content_tone: str, research_content: str) -> Task:
     """Creates the revision task for the Writer Agent."""
     # (Task description remains the same as the previous version)
+    from crewai import Task
     return Task(
         description=f"""
         Revise the following draft of a {content_type.lower()} (intended for {target_audience.lower()}, in a {content_tone.lower()} tone).
@@ -81,4 +77,44 @@ def revision_task(agent: Agent, draft: str, feedback: str, content_type: str, ta
         """,
         agent=agent,
         expected_output=f"A revised draft of the {content_type.lower()} that incorporates all the provided feedback while maintaining tone and style."
-    )
\ No newline at end of file
+    )
+
+# Define the Section Revision Task (patch-based revisions, see core/draft_sections.py)
+def section_revision_task(agent: Agent, sections: str, draft_outline: str, feedback: str, content_type: str, target_audience: str, content_tone: str, research_content: str) -> Task:
+    """Creates a revision task that rewrites only the flagged sections of the draft."""
+    from crewai import Task
+    return Task(
+        description=f"""
+        Revise specific sections of a {content_type.lower()} (intended for {target_audience.lower()}, in a {content_tone.lower()} tone).
+
+        Outline of the whole draft (for context, do NOT rewrite sections that are not listed below):
+        --- OUTLINE START ---
+        {draft_outline}
+        --- OUTLINE END ---
+
+        Sections to revise:
+        --- SECTIONS START ---
+        {sections}
+        --- SECTIONS END ---
+
+        Research Content (for context and ensuring accuracy):
+        --- RESEARCH START ---
+        {research_content}
+        --- RESEARCH END ---
+
+        Feedback per section:
+        --- FEEDBACK START ---
+        {feedback}
+        --- FEEDBACK END ---
+
+        Rewrite ONLY the sections listed above so they address ALL of their feedback, keeping the tone, style and flow with the surrounding sections.
+        Output each rewritten section on its own, starting with its marker line, and nothing else:
+        [S2]
+        full new text of section 2
+        [S5]
+        full new text of section 5
+        To remove a section entirely, output its marker followed by the single word DELETE.
+        """,
+        agent=agent,
+        expected_output="Only the rewritten sections, each preceded by its [S<number>] marker line."
+    )
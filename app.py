@@ -1,54 +1,22 @@
 # app.py
 import streamlit as st
-from crewai import Crew, Process
-# Import agent creation and task functions
-# ASSUMES these imports point to files using ChatOpenAI with max_concurrency=10
-from agents.idea_agent import create_idea_agent, idea_generation_task
-from agents.filter_agent import create_filter_agent, filter_ideas_task
-from agents.research_agent import create_research_agent, research_task
-from agents.writer_agent import create_writer_agent, writing_task, revision_task
-from agents.boss_agent import create_boss_agent, validation_task
+# Pipeline engine (agents, tasks, retries and output parsing live in core/pipeline.py)
+from core.pipeline import PipelineEvent, PipelineJob, format_choices, format_variants, run_pipeline_async, switch_idea
+from core.config import get_settings
 # Standard libraries
-import json
-import os
-# import time # No longer needed
-import re
-import traceback
-
-# --- Caching and Retry Imports ---
-from langchain_community.cache import InMemoryCache # Corrected import
-from langchain.globals import set_llm_cache
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from litellm.exceptions import APIConnectionError, Timeout, RateLimitError, ServiceUnavailableError, BadRequestError # Keep for retry types
-try:
-    from openai import RateLimitError as OpenAIRateLimitError, APIError # Add generic APIError
-    RETRY_ERRORS = (APIConnectionError, Timeout, RateLimitError, ServiceUnavailableError, BadRequestError, OpenAIRateLimitError, APIError)
-except ImportError:
-    RETRY_ERRORS = (APIConnectionError, Timeout, RateLimitError, ServiceUnavailableError, BadRequestError) # Fallback
+import asyncio
+import time
 
 # === Application Setup ===
 
-# --- Setup LLM Caching ---
-set_llm_cache(InMemoryCache())
-print("Initialized LLM Cache (In-Memory)")
-
-# --- Define Retry Logic (Keep tenacity) ---
-retry_on_api_error = retry(
-    wait=wait_exponential(multiplier=1, min=2, max=60),
-    stop=stop_after_attempt(5),
-    retry=retry_if_exception_type(RETRY_ERRORS),
-    reraise=True
-)
-
-# --- Wrapper function for Crew Kickoff with Retry ---
-@retry_on_api_error
-def kickoff_with_retry(crew: Crew):
-    """ Executes crew.kickoff() with retry logic for specified API errors. """
-    task_description = crew.tasks[0].description[:100] if crew.tasks else "Unknown Task"
-    print(f"Attempting kickoff for task: {task_description}...")
-    result = crew.kickoff()
-    print(f"Kickoff successful for task: {task_description}.")
-    return result
+# --- Setup LLM Caching (deferred until the first run so the UI renders without loading langchain) ---
+@st.cache_resource
+def init_llm_cache():
+    from langchain.globals import set_llm_cache
+    from core.llm_cache import get_llm_cache, get_cache_store
+    set_llm_cache(get_llm_cache()) # Shared SQLite cache; agents use their own namespaces
+    print(f"Initialized LLM Cache (SQLite: {get_cache_store().path})")
+    return get_cache_store()
 
 # --- Streamlit Page Configuration ---
 st.set_page_config( page_title="MindFlow", layout="wide", initial_sidebar_state="expanded" )
@@ -77,21 +45,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True) # Keep CSS
 
-# --- Helper function for Fallback Filter Data ---
-def fallback_filter_data(ideas):
-    """Creates fallback filter data when JSON parsing or filtering fails."""
-    print("Executing fallback_filter_data.")
-    if isinstance(ideas, list) and ideas:
-        print(f"Using first idea as fallback: {ideas[0]}")
-        return { "Idea": [ideas[0]], "Score": [0.5], "Reasoning": ["Fallback: Filter agent output issue."] }
-    elif isinstance(ideas, str) and ideas.strip():
-        ideas_list = [idea.strip() for idea in ideas.split("\n") if idea.strip()]
-        if ideas_list:
-            print(f"Using first parsed idea as fallback: {ideas_list[0]}")
-            return { "Idea": [ideas_list[0]], "Score": [0.5], "Reasoning": ["Fallback: Filter agent output issue."] }
-    print("Fallback: No valid ideas provided."); return { "Idea": ["Default Fallback Idea"], "Score": [0.1], "Reasoning": ["Fallback: Critical error."] }
-
-
 # --- Initialize Session State ---
 default_state = {
     "niche": "", "ideas": None, "filtered_data": None, # Original state keys
@@ -100,7 +53,13 @@ default_state = {
     "needs_more_research": False, "boss_feedback": "", "draft_approved": False,
     "research_cache": {}, "max_revisions": 5, "keywords": [],
     "content_type": "Blog", "target_audience": "Beginners", "content_tone": "Professional",
-    "content_length": "Medium"
+    "content_length": "Medium", "error": None,
+    "idea_index": 0, "speculative_research": 0, "idea_fallback": False, "research_context": None,
+    "stream_draft": True, "ttft": {}, "cancel_requested": False, "run_id": None,
+    "revision_mode": "full", "changed_sections": None, "parse_stats": {},
+    "precheck": True, "precheck_stats": {}, "prerank_top_k": 5, "fast_filter": False, "draft_candidates": 1,
+    "fanout_types": [], "fanout_tones": [], "fanout_lengths": [], "outputs": {},
+    "use_queue": get_settings().use_queue, "queue_job_id": None, "queue_event_id": 0
 }
 for key, value in default_state.items():
     if key not in st.session_state: st.session_state[key] = value
@@ -148,6 +107,51 @@ st.session_state.content_length = length_labels[content_length_slider] # Update
 # Update niche state
 st.session_state.niche = niche
 
+# Multi-format fan-out: one research pass, one draft per selected combination
+with st.sidebar.expander("📚 Multi-format fan-out"):
+    st.caption("Pick several values to write every combination in parallel from the same research. Empty keeps the choice above.")
+    st.session_state.fanout_types = st.multiselect("Content types", content_type_options, default=st.session_state.fanout_types)
+    st.session_state.fanout_tones = st.multiselect("Tones", tone_options, default=st.session_state.fanout_tones)
+    st.session_state.fanout_lengths = st.multiselect("Lengths", list(length_labels.values()), default=st.session_state.fanout_lengths)
+
+# Speculative research options
+st.session_state.speculative_research = st.sidebar.slider(
+    "Speculative Research (top N ideas)", 0, 3, st.session_state.speculative_research,
+    help="Research the top N filtered ideas in parallel so switching ideas costs no research time. 0 = off."
+)
+st.session_state.idea_fallback = st.sidebar.checkbox(
+    "Fall back to next idea if draft is rejected", value=st.session_state.idea_fallback
+)
+st.session_state.stream_draft = st.sidebar.checkbox(
+    "Stream draft as it is written", value=st.session_state.stream_draft
+)
+st.session_state.draft_candidates = st.sidebar.slider(
+    "Draft candidates", 1, 5, st.session_state.draft_candidates,
+    help="Sample several first drafts in one call and send only the best by the local checks to Boss review. Candidates are not streamed."
+)
+st.session_state.prerank_top_k = st.sidebar.slider(
+    "Ideas sent to Filter (after dedup)", 0, 10, st.session_state.prerank_top_k,
+    help="Near-duplicate ideas are merged and the rest ranked by embedding similarity to the niche and keywords. 0 sends every idea."
+)
+st.session_state.fast_filter = st.sidebar.checkbox(
+    "⚡ Fast mode (skip Filter agent)", value=st.session_state.fast_filter,
+    help="Uses the embedding ranking as the filter result instead of an LLM call."
+)
+st.session_state.precheck = st.sidebar.checkbox(
+    "Local checks before Boss review", value=st.session_state.precheck,
+    help="Length, keywords, structure and readability are checked locally; clear failures go straight back to the writer."
+)
+st.session_state.use_queue = st.sidebar.checkbox(
+    "🧵 Run in background workers", value=st.session_state.use_queue,
+    help="Enqueue the run for `python -m core.worker` processes instead of running it in this page. The run survives closing the tab."
+)
+revision_mode_labels = {"full": "Rewrite full draft", "patch": "Patch flagged sections"}
+st.session_state.revision_mode = st.sidebar.radio(
+    "Revision Mode", list(revision_mode_labels), format_func=revision_mode_labels.get,
+    index=list(revision_mode_labels).index(st.session_state.revision_mode),
+    help="Patch mode asks the boss to tie issues to sections and the writer to return edits for those sections only."
+)
+
 # --- Reset Workflow Button ---
 if st.sidebar.button("Reset Workflow"):
     print("Workflow Reset Requested.")
@@ -162,6 +166,29 @@ if st.sidebar.button("Reset Workflow"):
     # import time; time.sleep(1) # Optional brief pause
     st.rerun()
 
+# --- Resume a checkpointed run (core/run_store.py), e.g. after a browser refresh or an error ---
+def resume_stored_run(run_id: str):
+    from dataclasses import asdict
+    from core.run_store import get_run_store, restore_state
+    loaded = get_run_store().load(run_id)
+    if loaded is None: st.sidebar.error("Stored run not found."); return
+    job, data, step = loaded
+    for name, value in asdict(job).items():
+        if name in default_state: st.session_state[name] = value # Restore the sidebar inputs of the run
+    st.session_state.fanout_types, st.session_state.fanout_tones, st.session_state.fanout_lengths = format_choices(job.formats)
+    restore_state(data, st.session_state)
+    st.session_state.pipeline_step = step; st.session_state.error = None; st.session_state.cancel_requested = False
+    st.rerun()
+
+if st.session_state.pipeline_step in ("not_started", "failed"):
+    from core.run_store import get_run_store
+    run_store = get_run_store()
+    unfinished = run_store.list(limit=10, unfinished=True) if run_store else [] # Failed or stale only: never a run a worker is still executing
+    if unfinished:
+        run_labels = {run["run_id"]: f"{run['niche']} · {run['step']} ({run['status']})" for run in unfinished}
+        resume_choice = st.sidebar.selectbox("Unfinished Runs", list(run_labels), format_func=run_labels.get)
+        if st.sidebar.button("▶️ Resume Run", help="Continue from the last completed step; earlier LLM work is not redone."): resume_stored_run(resume_choice)
+
 # --- Sidebar Task List ---
 st.sidebar.header("Agent Tasks Status")
 tasks_display = [
@@ -172,42 +199,48 @@ tasks_display = [
     ("Write Draft", "draft_text"),
     ("Validation/Revision", "validation_result")
 ]
-current_step = st.session_state.pipeline_step
-
-for task_name, state_key in tasks_display:
-    status_icon = "⬜" # Pending
-    step_active = False
-
-    # Determine if the step is active or done
-    if state_key == "ideas" and current_step == "ideas": step_active = True
-    elif state_key == "filtered_data" and current_step == "filter_ideas": step_active = True
-    elif state_key == "top_ideas" and current_step == "filter_ideas": step_active = True # Active during filtering
-    elif state_key == "research_content" and current_step == "research": step_active = True
-    elif state_key == "draft_text" and current_step == "write_draft": step_active = True
-    elif state_key == "validation_result" and current_step == "revision_loop": step_active = True
-
-    # Determine if step is done
-    if st.session_state.get(state_key) is not None:
-        if state_key == "validation_result" and not st.session_state.draft_approved:
-             status_icon = "🔄" # In progress if result exists but not approved
-        elif state_key == "validation_result" and st.session_state.draft_approved:
-             status_icon = "✅" # Done if approved
-        elif state_key != "validation_result":
-             status_icon = "✅" # Done for other steps if state has value
-
-    # Override for failure state
-    if current_step == "failed": status_icon = "❌"
-
-    # Display logic
-    display_text = f"{status_icon} {task_name}"
-    if step_active: display_text = f"⏳ {task_name}"
-    if state_key == "validation_result" and current_step == "revision_loop":
-        display_text += f" (Rev {st.session_state.revision_count})"
-
-    st.sidebar.write(display_text)
-
-if st.session_state.needs_more_research and current_step == "revision_loop":
-    st.sidebar.write("Requesting More Research 🔄")
+sidebar_tasks_placeholder = st.sidebar.empty() # Re-rendered on every engine event
+
+def render_sidebar_tasks():
+    current_step = st.session_state.pipeline_step
+    lines = []
+    for task_name, state_key in tasks_display:
+        status_icon = "⬜" # Pending
+        step_active = False
+
+        # Determine if the step is active or done
+        if state_key == "ideas" and current_step == "ideas": step_active = True
+        elif state_key == "filtered_data" and current_step == "filter_ideas": step_active = True
+        elif state_key == "top_ideas" and current_step == "filter_ideas": step_active = True # Active during filtering
+        elif state_key == "research_content" and current_step == "research": step_active = True
+        elif state_key == "draft_text" and current_step in ("write_draft", "fan_out"): step_active = True
+        elif state_key == "validation_result" and current_step == "revision_loop": step_active = True
+
+        # Determine if step is done
+        if st.session_state.get(state_key) is not None:
+            if state_key == "validation_result" and not st.session_state.draft_approved:
+                 status_icon = "🔄" # In progress if result exists but not approved
+            elif state_key == "validation_result" and st.session_state.draft_approved:
+                 status_icon = "✅" # Done if approved
+            elif state_key != "validation_result":
+                 status_icon = "✅" # Done for other steps if state has value
+
+        # Override for failure state
+        if current_step == "failed": status_icon = "❌"
+
+        # Display logic
+        display_text = f"{status_icon} {task_name}"
+        if step_active: display_text = f"⏳ {task_name}"
+        if state_key == "validation_result" and current_step == "revision_loop":
+            display_text += f" (Rev {st.session_state.revision_count})"
+        lines.append(display_text)
+
+    if st.session_state.needs_more_research and current_step == "revision_loop":
+        lines.append("Requesting More Research 🔄")
+    with sidebar_tasks_placeholder.container():
+        for line in lines: st.write(line)
+
+render_sidebar_tasks()
 
 # === END Sidebar UI ===
 
@@ -216,85 +249,103 @@ st.markdown('<div class="main-header">MindFlow</div>', unsafe_allow_html=True);
 st.markdown('<div class="sub-header">AI Content Generation Pipeline</div>', unsafe_allow_html=True) # Added subheader
 
 # --- Progress Bar ---
-pipeline_progress = { "not_started": 0.0, "ideas": 0.1, "filter_ideas": 0.3, "research": 0.5, "write_draft": 0.7, "revision_loop": 0.85, "completed": 1.0, "failed": 1.0 }
-current_progress = pipeline_progress.get(st.session_state.pipeline_step, 0.0)
-if st.session_state.pipeline_step == "revision_loop": current_progress += min(st.session_state.revision_count * 0.03, 0.1)
-st.progress(current_progress)
+pipeline_progress = { "not_started": 0.0, "ideas": 0.1, "filter_ideas": 0.3, "research": 0.5, "write_draft": 0.7, "fan_out": 0.75, "revision_loop": 0.85, "completed": 1.0, "failed": 1.0 }
+progress_bar = st.progress(0.0)
+
+def render_progress():
+    current_progress = pipeline_progress.get(st.session_state.pipeline_step, 0.0)
+    if st.session_state.pipeline_step == "revision_loop": current_progress += min(st.session_state.revision_count * 0.03, 0.1)
+    progress_bar.progress(current_progress)
+
+render_progress()
 # --- END Progress Bar ---
 
 # --- UI Display Columns ---
-cols = st.columns(5);
+columns_placeholder = st.empty() # Re-rendered on every engine event
+draft_stream_slot = None # Slot in the Draft column that "token" events write into (recreated by each live render)
 
 # Function to get completion checkmark
 def get_checkmark(state_key):
     if state_key == "validation_result": return "✅" if st.session_state.get("draft_approved", False) else ""
     else: return "✅" if st.session_state.get(state_key) is not None else ""
 
-# Column 1: Ideas
-with cols[0]:
-    checkmark = get_checkmark("ideas")
-    st.markdown(f'<div class="column-header">💡 1. Ideas {checkmark}</div>', unsafe_allow_html=True)
-    if st.session_state.ideas:
-        ideas_list = st.session_state.ideas if isinstance(st.session_state.ideas, list) else []
-        if ideas_list:
-            for idea in ideas_list[:10]: st.markdown(f'<div class="task-card"><div class="task-desc">{idea}</div></div>', unsafe_allow_html=True)
-        else: st.markdown('<div class="task-card"><div class="task-desc">No ideas generated.</div></div>', unsafe_allow_html=True)
-    else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
-# Column 2: Filtered
-with cols[1]:
-    checkmark = get_checkmark("filtered_data")
-    st.markdown(f'<div class="column-header">📊 2. Filtered {checkmark}</div>', unsafe_allow_html=True)
-    if st.session_state.filtered_data:
-        data = st.session_state.filtered_data; ideas_list = data.get("Idea", []); scores_list = data.get("Score", []); reasonings_list = data.get("Reasoning", [])
-        if isinstance(ideas_list, list) and len(ideas_list) == len(scores_list) == len(reasonings_list) and ideas_list:
-            for idea, score, reasoning in zip(ideas_list, scores_list, reasonings_list):
-                 score_formatted = f"{score:.2f}" if isinstance(score, float) else score
-                 st.markdown(f'<div class="task-card"><div class="task-title">{idea}</div><div class="task-desc">Score: {score_formatted} - {reasoning}</div></div>', unsafe_allow_html=True)
-        else: st.markdown('<div class="task-card"><div class="task-desc">No filtered ideas or data mismatch.</div></div>', unsafe_allow_html=True)
-    else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
-# Column 3: Selected
-with cols[2]:
-    checkmark = get_checkmark("top_ideas")
-    st.markdown(f'<div class="column-header">🎯 3. Selected {checkmark}</div>', unsafe_allow_html=True)
-    if st.session_state.top_ideas and isinstance(st.session_state.top_ideas, list) and st.session_state.top_ideas:
-        st.markdown(f'<div class="task-card selected-card"><div class="task-title">{st.session_state.top_ideas[0]}</div><div class="task-desc">Chosen for development.</div></div>', unsafe_allow_html=True)
-    else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
-# Column 4: Research
-with cols[3]:
-    checkmark = get_checkmark("research_content")
-    st.markdown(f'<div class="column-header">🔬 4. Research {checkmark}</div>', unsafe_allow_html=True)
-    if st.session_state.research_content:
-        st.markdown(f'<div class="task-card"><div class="task-title">Research Summary</div><div class="task-desc" style="max-height: 300px; overflow-y: auto;">{st.session_state.research_content}</div></div>', unsafe_allow_html=True)
-    else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
-# Column 5: Draft & Status
-with cols[4]:
-    checkmark = get_checkmark("validation_result")
-    st.markdown(f'<div class="column-header">📄 5. Draft & Status {checkmark}</div>', unsafe_allow_html=True)
-    if st.session_state.draft_text:
-        st.markdown(f"""
-        <div class="task-card">
-            <div class="task-title">Draft (Revision {st.session_state.revision_count})</div>
-            <div class="task-desc" style="max-height: 200px; overflow-y: auto; border: 1px solid #4a4f5e; padding: 8px; background-color: #3a3f4e;">{st.session_state.draft_text}</div>
-        </div>
-        """, unsafe_allow_html=True)
-        if st.session_state.draft_approved:
-            # st.success("✅ Draft Approved!") # Now handled by st.status completion
-            if st.button("Export Approved Draft"):
-                 filepath = "draft_export.txt"
-                 try:
-                     with open(filepath, "w", encoding="utf-8") as f: f.write(str(st.session_state.draft_text))
-                     st.success(f"Draft exported to {filepath}")
-                     st.download_button(label="Download Draft", data=str(st.session_state.draft_text), file_name=f"draft_{st.session_state.top_ideas[0][:20].replace(' ','_')}.txt", mime="text/plain")
-                 except Exception as e: st.error(f"Failed to export draft: {e}")
-        elif st.session_state.validation_result and isinstance(st.session_state.validation_result, dict):
-             feedback = st.session_state.validation_result.get("issues", [])
-             if feedback:
-                 st.warning("Feedback Received (Requires Revision):")
-                 feedback_text = "\n".join([f"- {item.get('instructions', 'General feedback.')}" for item in feedback if isinstance(item, dict)])
-                 st.text_area("Issues to Address:", feedback_text, height=100, key="feedback_display", disabled=True)
-             # else: st.info("Draft under review...") # Covered by st.status
-        # else: st.info("Draft written, pending validation...") # Covered by st.status
-    else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
+def render_columns(live: bool = False):
+    """Draws the five result columns. `live=True` skips interactive widgets so it can be redrawn mid-run."""
+    global draft_stream_slot
+    with columns_placeholder.container():
+        cols = st.columns(5);
+        # Column 1: Ideas
+        with cols[0]:
+            checkmark = get_checkmark("ideas")
+            st.markdown(f'<div class="column-header">💡 1. Ideas {checkmark}</div>', unsafe_allow_html=True)
+            if st.session_state.ideas:
+                ideas_list = st.session_state.ideas if isinstance(st.session_state.ideas, list) else []
+                if ideas_list:
+                    for idea in ideas_list[:10]: st.markdown(f'<div class="task-card"><div class="task-desc">{idea}</div></div>', unsafe_allow_html=True)
+                else: st.markdown('<div class="task-card"><div class="task-desc">No ideas generated.</div></div>', unsafe_allow_html=True)
+            else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
+        # Column 2: Filtered
+        with cols[1]:
+            checkmark = get_checkmark("filtered_data")
+            st.markdown(f'<div class="column-header">📊 2. Filtered {checkmark}</div>', unsafe_allow_html=True)
+            if st.session_state.filtered_data:
+                data = st.session_state.filtered_data; ideas_list = data.get("Idea", []); scores_list = data.get("Score", []); reasonings_list = data.get("Reasoning", [])
+                if isinstance(ideas_list, list) and len(ideas_list) == len(scores_list) == len(reasonings_list) and ideas_list:
+                    for idea, score, reasoning in zip(ideas_list, scores_list, reasonings_list):
+                         score_formatted = f"{score:.2f}" if isinstance(score, float) else score
+                         st.markdown(f'<div class="task-card"><div class="task-title">{idea}</div><div class="task-desc">Score: {score_formatted} - {reasoning}</div></div>', unsafe_allow_html=True)
+                else: st.markdown('<div class="task-card"><div class="task-desc">No filtered ideas or data mismatch.</div></div>', unsafe_allow_html=True)
+            else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
+        # Column 3: Selected
+        with cols[2]:
+            checkmark = get_checkmark("top_ideas")
+            st.markdown(f'<div class="column-header">🎯 3. Selected {checkmark}</div>', unsafe_allow_html=True)
+            if st.session_state.top_ideas and isinstance(st.session_state.top_ideas, list) and st.session_state.top_ideas:
+                st.markdown(f'<div class="task-card selected-card"><div class="task-title">{st.session_state.top_ideas[0]}</div><div class="task-desc">Chosen for development.</div></div>', unsafe_allow_html=True)
+                filtered_ideas = (st.session_state.filtered_data or {}).get("Idea", [])
+                if not live and len(filtered_ideas) > 1 and st.session_state.pipeline_step in ("completed", "failed"):
+                    choice = st.selectbox("Develop another idea", range(len(filtered_ideas)), index=st.session_state.idea_index,
+                                          format_func=lambda i: f"{'🔬 ' if filtered_ideas[i] in st.session_state.research_cache else ''}{filtered_ideas[i][:60]}")
+                    if st.button("Switch Idea") and choice != st.session_state.idea_index:
+                        switch_idea(st.session_state, choice); st.rerun()
+            else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
+        # Column 4: Research
+        with cols[3]:
+            checkmark = get_checkmark("research_content")
+            st.markdown(f'<div class="column-header">🔬 4. Research {checkmark}</div>', unsafe_allow_html=True)
+            if st.session_state.research_content:
+                st.markdown(f'<div class="task-card"><div class="task-title">Research Summary</div><div class="task-desc" style="max-height: 300px; overflow-y: auto;">{st.session_state.research_content}</div></div>', unsafe_allow_html=True)
+            else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
+        # Column 5: Draft & Status
+        with cols[4]:
+            checkmark = get_checkmark("validation_result")
+            st.markdown(f'<div class="column-header">📄 5. Draft & Status {checkmark}</div>', unsafe_allow_html=True)
+            if live: draft_stream_slot = st.empty()
+            if st.session_state.draft_text:
+                st.markdown(f"""
+                <div class="task-card">
+                    <div class="task-title">Draft (Revision {st.session_state.revision_count})</div>
+                    <div class="task-desc" style="max-height: 200px; overflow-y: auto; border: 1px solid #4a4f5e; padding: 8px; background-color: #3a3f4e;">{st.session_state.draft_text}</div>
+                </div>
+                """, unsafe_allow_html=True)
+                if live: pass # Widgets are only drawn once the run has finished
+                elif st.session_state.draft_approved:
+                    if st.button("Export Approved Draft"):
+                         filepath = "draft_export.txt"
+                         try:
+                             with open(filepath, "w", encoding="utf-8") as f: f.write(str(st.session_state.draft_text))
+                             st.success(f"Draft exported to {filepath}")
+                             st.download_button(label="Download Draft", data=str(st.session_state.draft_text), file_name=f"draft_{st.session_state.top_ideas[0][:20].replace(' ','_')}.txt", mime="text/plain")
+                         except Exception as e: st.error(f"Failed to export draft: {e}")
+                elif st.session_state.validation_result and isinstance(st.session_state.validation_result, dict):
+                     feedback = st.session_state.validation_result.get("issues", [])
+                     if feedback:
+                         st.warning("Local Checks Failed (Requires Revision):" if st.session_state.validation_result.get("source") == "precheck" else "Feedback Received (Requires Revision):")
+                         feedback_text = "\n".join([f"- {item.get('instructions', 'General feedback.')}" for item in feedback if isinstance(item, dict)])
+                         st.text_area("Issues to Address:", feedback_text, height=100, key="feedback_display", disabled=True)
+            else: st.markdown('<div class="task-card"><div class="task-desc">Waiting...</div></div>', unsafe_allow_html=True)
+
+render_columns()
 
 
 # === Pipeline Execution Logic ===
@@ -302,23 +353,102 @@ with cols[4]:
 # --- Create Status Placeholder ---
 status_placeholder = st.empty() # Create a placeholder for status messages
 
-# --- Wrapper function to run crew tasks with error handling ---
-# Modified to accept status object for updates
-def run_crew_task(crew: Crew, task_name: str, status_context):
-    """ Runs a crew task using kickoff_with_retry and handles potential errors, updating status. """
-    print(f"--- Running Task: {task_name} ---")
-    try:
-        result = kickoff_with_retry(crew)
-        print(f"--- Task '{task_name}' Completed Successfully ---")
-        return result
-    except Exception as e:
-        error_msg = f"Error during {task_name}: {type(e).__name__}"
-        print(f"--- ERROR ---"); traceback.print_exc(); print(f"--- END ERROR ---")
-        if status_context: # Update status context if provided
-             status_context.update(label=f"❌ {error_msg}", state="error", expanded=True)
-        st.error(f"{error_msg} - {e}") # Show error in main area too
-        st.session_state.pipeline_step = "failed"
-        st.stop() # Stop the Streamlit script execution
+# --- Engine glue: current inputs and event display ---
+def current_job() -> PipelineJob:
+    """Builds the engine job from the sidebar selections."""
+    return PipelineJob(
+        niche=st.session_state.niche, keywords=st.session_state.keywords,
+        content_type=st.session_state.content_type, target_audience=st.session_state.target_audience,
+        content_tone=st.session_state.content_tone, content_length=st.session_state.content_length,
+        max_revisions=st.session_state.max_revisions,
+        speculative_research=st.session_state.speculative_research, idea_fallback=st.session_state.idea_fallback,
+        stream_draft=st.session_state.stream_draft, revision_mode=st.session_state.revision_mode, precheck=st.session_state.precheck,
+        prerank_top_k=st.session_state.prerank_top_k, fast_filter=st.session_state.fast_filter,
+        draft_candidates=st.session_state.draft_candidates,
+        formats=format_variants(st.session_state.fanout_types, st.session_state.fanout_tones, st.session_state.fanout_lengths),
+    )
+
+# Status labels shown while each engine step runs
+STEP_LABELS = {
+    "ideas": "💡 Idea Agent thinking...",
+    "filter_ideas": "📊 Filter Agent selecting best ideas...",
+    "research": "🔬 Research Agent gathering information...",
+    "write_draft": "✍️ Writer Agent drafting...",
+    "revision_loop": "🧐 Boss Agent validating & Writer revising...",
+    "fan_out": "📚 Writing and reviewing every format in parallel...",
+}
+STEP_TOASTS = { "ideas": "💡 Ideas ready!", "filter_ideas": "📊 Ideas filtered!", "research": "🔬 Research gathered!", "write_draft": "✍️ Draft ready for review!" }
+
+def render_stream(event):
+    """Writes the streamed draft so far into the Draft column (only the slot, not the whole page)."""
+    if draft_stream_slot is None or (event.data or {}).get("format"): return # Parallel fan-out drafts would overwrite each other
+    title = "Writing draft" if event.step == "write_draft" else f"Revising (Revision {st.session_state.revision_count})"
+    cursor = "" if (event.data or {}).get("done") else " ▌"
+    draft_stream_slot.markdown(f"""
+    <div class="task-card">
+        <div class="task-title">✍️ {title}...</div>
+        <div class="task-desc" style="max-height: 200px; overflow-y: auto; border: 1px solid #4a4f5e; padding: 8px; background-color: #3a3f4e;">{event.data["text"]}{cursor}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def stop_run():
+    """Stop button callback: Streamlit interrupts the running script, so the run is marked failed here."""
+    st.session_state.cancel_requested = True
+    if st.session_state.queue_job_id:
+        from core.job_queue import get_job_queue
+        get_job_queue().cancel(st.session_state.queue_job_id); st.session_state.queue_job_id = None
+    st.session_state.pipeline_step = "failed"; st.session_state.error = "Run stopped by user."
+
+def make_event_handler(status_context):
+    """Returns an on_event callback that pushes engine progress into the UI without reruns."""
+    def on_event(event):
+        if event.kind == "token": render_stream(event); return
+        if event.kind == "start":
+            status_context.update(label=STEP_LABELS.get(event.step, event.message), state="running", expanded=True)
+        elif event.kind == "warning": st.warning(event.message)
+        elif event.kind == "progress": st.write(event.message)
+        elif event.kind == "complete":
+            st.write(f"✅ {event.message}")
+            if event.step in STEP_TOASTS: st.toast(STEP_TOASTS[event.step])
+            elif event.step == "revision_loop": st.toast(f"✅ {event.message}")
+        elif event.kind == "error":
+            status_context.update(label=f"❌ {event.message}", state="error", expanded=True)
+            st.error(event.message)
+        if event.step == "revision_loop" and event.kind != "start":
+            status_context.update(label=f"{STEP_LABELS['revision_loop']} (Rev {st.session_state.revision_count})")
+        render_sidebar_tasks(); render_progress(); render_columns(live=True)
+    return on_event
+
+def load_checkpoint(run_id: str):
+    """Copies the latest run store checkpoint of a queued run into session_state."""
+    from core.run_store import get_run_store, restore_state
+    loaded = get_run_store().load(run_id) if run_id and get_run_store() else None
+    if loaded is not None: restore_state(loaded[1], st.session_state)
+
+def follow_queued_job(on_event, poll_interval: float = 0.5):
+    """Enqueues the current job (once) and replays its worker events until it finishes."""
+    from core.job_queue import get_job_queue
+    queue = get_job_queue()
+    if not st.session_state.queue_job_id:
+        st.session_state.queue_job_id = queue.enqueue(current_job()); st.session_state.queue_event_id = 0
+        st.write("🧵 Queued for background workers (start them with `python -m core.worker`).")
+    job_id, partial = st.session_state.queue_job_id, None
+    while True:
+        record = queue.get(job_id)
+        if record is None: st.session_state.pipeline_step = "failed"; st.session_state.error = "Queued job disappeared."; break
+        for event_id, step, kind, message, data in queue.events(job_id, st.session_state.queue_event_id):
+            st.session_state.queue_event_id = event_id
+            if kind == "complete": load_checkpoint(record["run_id"]) # Show the step's results
+            on_event(PipelineEvent(step, kind, message, data))
+        if record["partial"] and record["partial"] != partial:
+            partial = record["partial"]; render_stream(PipelineEvent(st.session_state.pipeline_step, "token", "", {"text": partial}))
+        if record["status"] in ("completed", "failed", "cancelled"):
+            load_checkpoint(record["run_id"])
+            if record["result"]: st.session_state.draft_text = record["result"]["draft"]; st.session_state.draft_approved = record["result"]["approved"]
+            st.session_state.pipeline_step = "completed" if record["status"] == "completed" else "failed"
+            st.session_state.error = record["error"]; st.session_state.queue_job_id = None
+            break
+        time.sleep(poll_interval)
 
 # --- Start Pipeline Button Logic ---
 if st.button("Start Pipeline") and st.session_state.pipeline_step == "not_started":
@@ -326,241 +456,41 @@ if st.button("Start Pipeline") and st.session_state.pipeline_step == "not_starte
     if not st.session_state.keywords: st.error("Please select Keywords"); st.stop()
     print("Start Pipeline button clicked.");
     st.session_state.pipeline_step = "ideas"
-    st.rerun()
 
-# --- Sequential Pipeline Steps ---
-
-# Step 1: Generate Ideas
-if st.session_state.pipeline_step == "ideas":
-    print("Executing Step: Generate Ideas")
-    with st.status("💡 Idea Agent thinking...", expanded=True) as status: # Use st.status
-        st.write("Searching for Medium trends...")
-        agent = create_idea_agent()
-        task = idea_generation_task(agent, st.session_state.niche, st.session_state.content_type, st.session_state.target_audience, st.session_state.content_tone, st.session_state.keywords)
-        crew = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
-        ideas_output = run_crew_task(crew, "Idea Generation", status) # Pass status
-        st.write("Processing generated ideas...")
-        if ideas_output:
-            # Corrected parsing logic
-            ideas_list = []
-            if isinstance(ideas_output, str):
-                lines = [line.strip() for line in ideas_output.split('\n')]
-                for line in lines:
-                    if line:
-                        if line.startswith('"') and line.endswith('"'): line = line[1:-1]
-                        elif line.startswith("'") and line.endswith("'"): line = line[1:-1]
-                        ideas_list.append(line)
-            elif isinstance(ideas_output, list): ideas_list = [str(item).strip().strip('"\'') for item in ideas_output]
-            else: ideas_list = [str(ideas_output).strip().strip('"\'')]; st.warning("Unexpected output type from Idea Agent.")
-            st.session_state.ideas = ideas_list
-
-            if not st.session_state.ideas:
-                st.error("Idea generation failed."); st.session_state.pipeline_step = "failed"
-                status.update(label="❌ Idea Generation Failed!", state="error")
+# --- Run (or continue) the whole pipeline in one event loop ---
+if st.session_state.pipeline_step not in ("not_started", "completed", "failed"):
+    with status_placeholder.container():
+        st.button("⏹ Stop", on_click=stop_run, help="Cancel the current run (e.g. a draft heading the wrong way).")
+        with st.status(STEP_LABELS.get(st.session_state.pipeline_step, "Running pipeline..."), expanded=True) as status:
+            if st.session_state.use_queue or st.session_state.queue_job_id: follow_queued_job(make_event_handler(status))
             else:
-                num_ideas = len(st.session_state.ideas)
-                print(f"Generated {num_ideas} ideas.")
-                st.write(f"✅ Generated {num_ideas} ideas.")
-                st.session_state.pipeline_step = "filter_ideas"
-                status.update(label="💡 Ideas Generated!", state="complete", expanded=False)
-                st.toast("💡 Ideas ready!")
-    if st.session_state.pipeline_step != "failed": st.rerun()
-
-
-# Step 2: Filter Ideas
-if st.session_state.pipeline_step == "filter_ideas":
-    print("Executing Step: Filter Ideas")
-    if not st.session_state.get("ideas"): st.error("Cannot filter, no ideas."); st.session_state.pipeline_step = "failed"; st.rerun()
-    else:
-        with st.status("📊 Filter Agent selecting best ideas...", expanded=True) as status: # Use st.status
-            st.write("Evaluating relevance and feasibility...")
-            agent = create_filter_agent()
-            task = filter_ideas_task(agent, st.session_state.ideas, st.session_state.niche, st.session_state.target_audience, st.session_state.keywords)
-            crew = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
-            crew_output = run_crew_task(crew, "Idea Filtering", status)
-            st.write("Processing filtered results...")
-            if crew_output:
-                # Keep robust JSON processing logic
-                raw_output = getattr(crew_output, 'raw', str(crew_output)); filtered_data = None
-                try: # Robust JSON processing...
-                    filtered_data = json.loads(raw_output)
-                    if not isinstance(filtered_data.get("Idea"), list) or not isinstance(filtered_data.get("Score"), list) or not isinstance(filtered_data.get("Reasoning"), list) or len(filtered_data["Idea"]) != len(filtered_data["Score"]) != len(filtered_data["Reasoning"]): raise ValueError("Invalid JSON structure")
-                except (json.JSONDecodeError, ValueError, TypeError) as e:
-                    st.warning(f"Filter JSON invalid: {e}. Trying regex."); print(f"Filter Raw Output:\n{raw_output}")
-                    json_match = re.search(r'(\{.*\})', raw_output, re.DOTALL)
-                    if json_match:
-                        try: filtered_data = json.loads(json_match.group(1)); # Re-validate...
-                        except (json.JSONDecodeError, ValueError, TypeError) as e_inner: st.warning(f"Filter regex parse failed: {e_inner}. Using fallback."); filtered_data = fallback_filter_data(st.session_state.ideas)
-                    else: st.warning("No JSON via regex. Using fallback."); filtered_data = fallback_filter_data(st.session_state.ideas)
-
-                if not filtered_data or not filtered_data.get("Idea") or not filtered_data["Idea"]:
-                    st.warning("Filtering resulted in no ideas."); st.session_state.pipeline_step = "failed"
-                    status.update(label="❌ Filtering Failed!", state="error")
-                else:
-                    num_filtered = len(filtered_data["Idea"])
-                    st.write(f"✅ Selected top {num_filtered} ideas.")
-                    st.session_state.filtered_data = filtered_data; st.session_state.top_ideas = [filtered_data["Idea"][0]]; print(f"Selected top idea."); st.session_state.pipeline_step = "research"
-                    status.update(label="📊 Filtering Complete!", state="complete", expanded=False)
-                    st.toast("📊 Ideas filtered!")
-        if st.session_state.pipeline_step != "failed": st.rerun()
-
-
-# Step 3: Research
-if st.session_state.pipeline_step == "research":
-    print("Executing Step: Research")
-    if not st.session_state.get("top_ideas"): st.error("Cannot research, no top idea."); st.session_state.pipeline_step = "failed"; st.rerun()
-    else:
-        top_idea = st.session_state.top_ideas[0]
-        if top_idea in st.session_state.research_cache: # Use cache
-             st.session_state.research_content = st.session_state.research_cache[top_idea]; print(f"Using cached research.");
-             st.success("✅ Research loaded from cache.") # Show success outside status
-             st.toast("🔬 Research loaded from cache!")
-             st.session_state.pipeline_step = "write_draft"
-             st.rerun() # Rerun immediately after cache hit
-        else:
-            with st.status("🔬 Research Agent gathering information...", expanded=True) as status: # Use st.status
-                 st.write(f"Researching topic: {top_idea[:60]}...")
-                 print(f"Running research agent."); agent = create_research_agent(); task = research_task(agent, top_idea)
-                 crew = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
-                 research_summary = run_crew_task(crew, "Research", status) # Pass status
-                 if research_summary:
-                     st.write("✅ Research complete.")
-                     st.session_state.research_content = str(research_summary); st.session_state.research_cache[top_idea] = st.session_state.research_content; print("Research successful."); st.session_state.pipeline_step = "write_draft"
-                     status.update(label="🔬 Research Complete!", state="complete", expanded=False)
-                     st.toast("🔬 Research gathered!")
-                 # Error handled in run_crew_task
-            if st.session_state.pipeline_step != "failed": st.rerun()
-
-
-# Step 4: Write Initial Draft
-if st.session_state.pipeline_step == "write_draft":
-    print("Executing Step: Write Draft")
-    if not st.session_state.get("research_content") or not st.session_state.get("top_ideas"): st.error("Cannot write draft, missing inputs."); st.session_state.pipeline_step = "failed"; st.rerun()
-    else:
-        with st.status("✍️ Writer Agent drafting...", expanded=True) as status: # Use st.status
-            st.write("Crafting the initial version...")
-            agent = create_writer_agent()
-            task = writing_task(agent, st.session_state.top_ideas[0], st.session_state.research_content, st.session_state.content_type, st.session_state.target_audience, st.session_state.content_tone, st.session_state.content_length)
-            crew = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
-            draft = run_crew_task(crew, "Draft Writing", status) # Pass status
-            if draft:
-                st.write("✅ Initial draft complete.")
-                st.session_state.draft_text = str(draft); print("Initial draft written.")
-                st.session_state.pipeline_step = "revision_loop"; st.session_state.validation_result = {"approved": False, "issues": [{"instructions": "Initial draft requires review."}]}; st.session_state.revision_count = 0; st.session_state.draft_approved = False # Setup for loop
-                status.update(label="✍️ Initial Draft Complete!", state="complete", expanded=False)
-                st.toast("✍️ Draft ready for review!")
-            # Error handled in run_crew_task
-        if st.session_state.pipeline_step != "failed": st.rerun()
-
-
-# Step 5: Autonomous Feedback/Revision Loop
-if st.session_state.pipeline_step == "revision_loop" and not st.session_state.draft_approved:
-    print(f"Executing Step: Revision Loop (Iteration {st.session_state.revision_count})")
-    # Max revision check
-    if st.session_state.revision_count >= st.session_state.max_revisions:
-        st.session_state.draft_approved = True; st.session_state.pipeline_step = "completed"; st.warning(f"Max revisions reached."); st.session_state.validation_result = {"approved": True, "issues": [{"instructions": f"Max revisions reached. Auto-approved."}]}; st.rerun()
-
-    # --- Validation Step ---
-    print("Loop Step: Validating current draft.")
-    validation_result = None
-    validation_status_label = f"🧐 Boss Agent validating (Rev {st.session_state.revision_count})..."
-    with st.status(validation_status_label, expanded=True) as status_validation: # Use st.status
-        st.write("Checking quality standards...")
-        agent = create_boss_agent()
-        task = validation_task(agent, st.session_state.draft_text, st.session_state.research_content, st.session_state.content_tone, st.session_state.content_length)
-        crew = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
-        crew_output = run_crew_task(crew, f"Validation (Rev {st.session_state.revision_count})", status_validation) # Pass status
-        st.write("Processing validation results...")
-        if crew_output:
-            # Keep robust JSON processing logic
-            raw_output = getattr(crew_output, 'raw', str(crew_output));
-            try:
-                validation_result = json.loads(raw_output)
-                if not isinstance(validation_result.get("approved"), bool) or not isinstance(validation_result.get("issues"), list): raise ValueError("Invalid JSON structure")
-            except (json.JSONDecodeError, ValueError, TypeError) as e:
-                st.warning(f"Boss JSON invalid: {e}. Trying regex."); print(f"Boss Raw Output:\n{raw_output}")
-                json_match = re.search(r'(\{.*\})', raw_output, re.DOTALL)
-                if json_match:
-                    try: validation_result = json.loads(json_match.group(1)); # Re-validate...
-                    except (json.JSONDecodeError, ValueError, TypeError) as e_inner: st.warning(f"Boss regex parse failed: {e_inner}."); validation_result = None
-                else: st.warning("No JSON via regex in boss output."); validation_result = None
-            if validation_result is None:
-                 validation_result = {"approved": False, "issues": [{"instructions": "System could not parse validation feedback."}]}
-                 if st.session_state.revision_count >= 2: st.error("Multiple validation parse failures. Auto-approving."); validation_result["approved"] = True
-        st.session_state.validation_result = validation_result
-        # Update status based on outcome
-        if validation_result and validation_result.get("approved", False):
-            status_validation.update(label=f"✅ Validation Approved (Rev {st.session_state.revision_count})", state="complete", expanded=False)
-        elif validation_result:
-            status_validation.update(label=f"🧐 Validation Complete - Revisions Needed (Rev {st.session_state.revision_count})", state="complete", expanded=False)
-
-    # --- Check Approval and Decide Next Action ---
-    if st.session_state.pipeline_step != "failed":
-        if validation_result and validation_result.get("approved", False):
-            st.session_state.draft_approved = True; st.session_state.pipeline_step = "completed"; print(f"Draft approved.");
-            st.toast(f"✅ Draft Approved after {st.session_state.revision_count} revisions!")
-            st.rerun()
-        else:
-            # --- Revision is Needed ---
-            print("Loop Step: Revision required.")
-            st.session_state.revision_count += 1
-            issues = validation_result.get("issues", [{"instructions": "Improve clarity."}]) if validation_result else [{"instructions": "Validation failed."}]
-            feedback_instructions = " ".join([issue.get("instructions", "") for issue in issues if isinstance(issue, dict)])
-            st.session_state.boss_feedback = feedback_instructions
-            print(f"Feedback for Rev {st.session_state.revision_count}: {feedback_instructions}")
-            needs_more_research = "depth" in feedback_instructions.lower() or "information" in feedback_instructions.lower() or "research" in feedback_instructions.lower()
-            st.session_state.needs_more_research = needs_more_research
-
-            if needs_more_research:
-                print("Loop Step: Additional research needed.")
-                with st.status(f"🔬 Research Agent gathering more info (Rev {st.session_state.revision_count})...", expanded=True) as status_research: # Use st.status
-                    st.write("Looking for details based on feedback...")
-                    research_agent = create_research_agent()
-                    if not st.session_state.top_ideas: st.error("Cannot research, top idea missing."); st.session_state.pipeline_step = "failed"; st.rerun()
-                    top_idea = st.session_state.top_ideas[0]; research_context = f"Address feedback: {feedback_instructions}"; cache_key = f"{top_idea}_additional_rev{st.session_state.revision_count}"
-                    if cache_key in st.session_state.research_cache:
-                        additional_research = st.session_state.research_cache[cache_key]; print("Using cached additional research.")
-                        st.session_state.research_content += "\n\nAdditional Research (Cached):\n" + str(additional_research)
-                        st.write("✅ Additional research loaded from cache.")
-                        status_research.update(label=f"🔬 Add. research cached (Rev {st.session_state.revision_count})", state="complete", expanded=False)
-                        st.toast("🔬 Additional research cached!")
-                    else:
-                        print("Running additional research agent.")
-                        task = research_task(research_agent, top_idea, additional_context=research_context)
-                        crew = Crew(agents=[research_agent], tasks=[task], process=Process.sequential, verbose=False)
-                        additional_research = run_crew_task(crew, f"Additional Research (Rev {st.session_state.revision_count})", status_research) # Pass status
-                        if additional_research:
-                            st.write("✅ Additional research complete.")
-                            additional_research_str = str(additional_research); st.session_state.research_cache[cache_key] = additional_research_str; st.session_state.research_content += "\n\nAdditional Research:\n" + additional_research_str; print("Additional research successful.")
-                            status_research.update(label=f"🔬 Add. research finished (Rev {st.session_state.revision_count})", state="complete", expanded=False)
-                            st.toast("🔬 Additional research complete!")
-                st.session_state.needs_more_research = False
-
-            # --- Perform Revision (only if pipeline hasn't failed) ---
-            if st.session_state.pipeline_step != "failed":
-                print(f"Loop Step: Revising draft (Revision {st.session_state.revision_count}).")
-                with st.status(f"✍️ Writer Agent revising draft (Rev {st.session_state.revision_count})...", expanded=True) as status_revision: # Use st.status
-                    st.write("Incorporating feedback...")
-                    writer_agent = create_writer_agent()
-                    task = revision_task(writer_agent, st.session_state.draft_text, st.session_state.boss_feedback, st.session_state.content_type, st.session_state.target_audience, st.session_state.content_tone, st.session_state.research_content)
-                    crew = Crew(agents=[writer_agent], tasks=[task], process=Process.sequential, verbose=False)
-                    revised_draft = run_crew_task(crew, f"Revision (Rev {st.session_state.revision_count})", status_revision) # Pass status
-                    if revised_draft:
-                        st.write(f"✅ Revision {st.session_state.revision_count} complete.")
-                        st.session_state.draft_text = str(revised_draft); print("Revision successful.")
-                        status_revision.update(label=f"✍️ Revision {st.session_state.revision_count} finished!", state="complete", expanded=False)
-                        st.toast(f"✍️ Revision {st.session_state.revision_count} complete!")
-
-            # Re-run to trigger next validation check or show fail state
-            st.rerun()
+                init_llm_cache()
+                asyncio.run(run_pipeline_async(current_job(), st.session_state, on_event=make_event_handler(status)))
+            if st.session_state.pipeline_step == "completed":
+                status.update(label=f"✅ Draft Approved (Rev {st.session_state.revision_count})", state="complete", expanded=False)
+    st.rerun() # Single rerun to redraw interactive widgets (export, feedback) for the final state
 
 
 # === Final Status Display ===
 if st.session_state.pipeline_step == "completed" and st.session_state.draft_approved:
     st.success("✅ Workflow Completed Successfully!")
 elif st.session_state.pipeline_step == "failed":
-    # Error shown by run_crew_task's status update
-    pass
+    st.error(f"❌ Pipeline failed: {st.session_state.error or 'Unknown error'}. Use 'Reset Workflow' to start again.")
+if st.session_state.ttft:
+    st.caption("⏱️ Time to first token: " + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in st.session_state.ttft.items()))
+
+if st.session_state.outputs:
+    st.subheader("📚 Formats")
+    for tab, (label, output) in zip(st.tabs(list(st.session_state.outputs)), st.session_state.outputs.items()):
+        with tab:
+            if output["status"] == "completed": st.success(f"Approved after {output['revisions']} revision(s).")
+            else: st.error(f"Not approved: {output['error'] or 'unknown error'}")
+            if output["draft"]:
+                st.markdown(output["draft"])
+                st.download_button("Download", data=output["draft"], file_name=f"draft_{label.replace(' · ', '_')}.md", mime="text/markdown", key=f"download_{label}")
+
+if st.session_state.precheck_stats.get("rejected"):
+    st.caption(f"🧪 Local checks caught {st.session_state.precheck_stats['rejected']} draft(s) before Boss review.")
 
 # Footer
 st.markdown('<div class="footer">MindFlow by AB @2025</div>', unsafe_allow_html=True)
\ No newline at end of file
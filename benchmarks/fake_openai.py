@@ -0,0 +1,289 @@
+# benchmarks/fake_openai.py
+"""
+Local fake of the OpenAI API for offline benchmarks. Stdlib only, no network.
+
+Endpoints: POST /v1/chat/completions (incl. SSE streaming), POST /v1/embeddings, GET /v1/models.
+Replies are canned per agent, recognised from the role in the prompt:
+    idea → numbered list, filter → JSON ranking of the input ideas, research → summary,
+    writer → draft ("(revised)" on revisions), boss → rejects first drafts (reject_first) then approves.
+Requests with `tools` (structured output) get the JSON back as tool-call arguments; repair prompts
+("failed validation") always get a valid object.
+
+Latency, token rate and error injection (429 with Retry-After, 503, stalls past the client timeout,
+malformed JSON) are configurable. Which request fails is derived from the seed and the request body,
+so a run is reproducible regardless of scheduling.
+
+    python -m benchmarks.fake_openai --port 8765 --latency 0.2 --token-rate 200 --rate-limit-rate 0.05
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.05 # Seconds before the first token
+    token_rate: float = 400.0 # Completion tokens per second (0 = instant)
+    rate_limit_rate: float = 0.0 # Fraction of requests answered with 429 + Retry-After
+    server_error_rate: float = 0.0 # Fraction answered with 503
+    timeout_rate: float = 0.0 # Fraction that stall for `stall_seconds` (set above the client's MINDFLOW_HTTP_TIMEOUT)
+    stall_seconds: float = 30.0
+    malformed_rate: float = 0.0 # Fraction of filter / boss replies that are not valid JSON (exercises parse fallbacks)
+    reject_first: bool = True # Boss rejects first drafts, so every pipeline runs one revision
+    weak_draft_rate: float = 0.0 # Fraction of sampled first drafts (per choice) that leave out the keywords, so local checks reject them
+    retry_after: float = 1.0
+    embedding_dim: int = 256
+    seed: int = 0
+
+
+# --- Canned replies ---
+AGENT_MARKERS = [("Trend Analyst", "idea"), ("Idea Filter", "filter"), ("Researcher", "research"), ("You are Boss", "boss"), ("You are Writer", "writer")]
+
+def detect_agent(prompt: str) -> str:
+    for marker, agent in AGENT_MARKERS:
+        if marker in prompt: return agent
+    return "writer"
+
+def _topic(prompt: str) -> str:
+    match = re.search(r'main topic is: "([^"]+)"', prompt) or re.search(r"specific topic:\s*'([^']+)'", prompt) or re.search(r"Niche: ([^\n]+)", prompt)
+    return match.group(1).strip() if match else "the topic"
+
+def reply_for(agent: str, prompt: str, malformed: bool, reject_first: bool) -> str:
+    if agent == "idea":
+        niche = _topic(prompt)
+        match = re.search(r"exactly (\d+) distinct", prompt); count = int(match.group(1)) if match else 7
+        return "\n".join(f"{i}. {angle} for {niche}" for i, angle in enumerate(
+            ["A beginner's guide", "Five common mistakes", "A Beginner's Guide", "The future of", "Tools that save hours", "Case study: scaling",
+             "Myths and facts about", "A weekly checklist", "Interview questions about", "Budget playbook"][:count], 1))
+    if agent == "filter":
+        if malformed: return "Here are the best ideas: 1, 2 and 3"
+        ideas = re.findall(r"^\s*- (.+)$", prompt.split("**Input Ideas**:")[-1].split("**Steps**")[0], re.M)[:3]
+        return json.dumps({"Idea": ideas, "Score": [round(0.9 - 0.1 * i, 2) for i in range(len(ideas))], "Reasoning": ["Relevant and uses the keywords." for _ in ideas]})
+    if agent == "boss":
+        if malformed: return "The draft looks fine overall {approved: yes"
+        draft = prompt.split("--- DRAFT START ---")[-1].split("--- DRAFT END ---")[0]
+        if reject_first and "(revised)" not in draft:
+            return json.dumps({"approved": False, "issues": [{"section": 2, "instructions": "Add more depth with concrete statistics from the research."}]})
+        return json.dumps({"approved": True, "issues": []})
+    if agent == "research":
+        topic = _topic(prompt)
+        return "\n\n".join(f"Finding {i}: {topic} — teams report {10 * i}% faster delivery after adopting structured workflows; surveys of 500 practitioners cite tooling and training as the main levers." for i in range(1, 6))
+    if "--- SECTIONS START ---" in prompt: # Patch-mode revision: rewrite only the listed sections
+        listed = re.findall(r"^\[S(\d+)\]$", prompt.split("--- SECTIONS START ---")[-1].split("--- SECTIONS END ---")[0], re.M)
+        return "\n".join(f"[S{n}]\nParagraph {n} now backs its point about {_topic(prompt)} with a 42% adoption statistic. (revised)" for n in listed)
+    if "--- FEEDBACK START ---" in prompt: # Full revision: the previous draft, plus any keywords the local checks asked for
+        draft = prompt.split("--- DRAFT START ---")[-1].split("--- DRAFT END ---")[0].strip()
+        missing = re.search(r"keywords naturally into the draft: ([^\n]+?)\.(?:\s|$)", prompt)
+        extra = f"\n\nIt also matters for {missing.group(1)}." if missing else ""
+        return f"{draft}{extra} (revised)"
+    return draft_for(prompt)
+
+def draft_for(prompt: str) -> str:
+    """Markdown draft with a title, intro, headed sections and a conclusion, sized to the requested word range and using the keywords."""
+    topic = _topic(prompt)
+    match = re.search(r"\((\d+)-(\d+) words\)", prompt); target = (int(match.group(1)) + int(match.group(2))) // 2 if match else 800
+    match = re.search(r"Work these keywords in naturally: ([^\n]+?)\.\s*$", prompt, re.M); keywords = match.group(1) if match else "these tools"
+    paragraph = lambda i: (f"This part shows how {topic} works in practice. Teams that use {keywords} see clear gains. "
+                           f"One group cut review time by {10 + i}% in a month. They kept the steps small and tracked each result. "
+                           "Start with one habit, measure it for two weeks, and then add the next one. Share what works with the team.")
+    sections = max(2, round((target - 60) / 70))
+    body = "\n\n".join(f"## Step {i}: Getting results\n\n{paragraph(i)}" for i in range(1, sections + 1))
+    return (f"# {topic}\n\nThis guide explains {topic} in plain terms. You will learn what to try first and how to measure it.\n\n{body}"
+            f"\n\n## Conclusion\n\nIn short, {topic} pays off when you start small, measure often and keep what works.")
+
+def weak_draft(prompt: str, text: str) -> str:
+    """The same draft without the job keywords (fails the local keyword check; a full revision adds them back)."""
+    match = re.search(r"Work these keywords in naturally: ([^\n]+?)\.\s*$", prompt, re.M)
+    return text.replace(match.group(1), "these tools") if match else text
+
+def is_first_draft(agent: str, prompt: str) -> bool:
+    return agent == "writer" and "--- SECTIONS START ---" not in prompt and "--- FEEDBACK START ---" not in prompt
+
+def repair_reply(tool_name: str, prompt: str) -> str:
+    """Valid object for a structured-output repair call (see core.pipeline.repair_structured_output)."""
+    if "Filter" in tool_name:
+        ideas = re.findall(r"^- (.+)$", prompt.split("--- OUTPUT START ---")[0], re.M)[:3]
+        return json.dumps({"Idea": ideas, "Score": [round(0.9 - 0.1 * i, 2) for i in range(len(ideas))], "Reasoning": ["Restated from the original output." for _ in ideas]})
+    return json.dumps({"approved": True, "issues": []})
+
+def wrap_for_crew(prompt: str, text: str) -> str:
+    """CrewAI's ReAct prompt expects 'Final Answer:'; direct (streamed) calls get the bare text."""
+    return f"Thought: I now can give a great answer\nFinal Answer: {text}" if "Final Answer" in prompt else text
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def embed(text: str, dim: int) -> list:
+    """Deterministic bag-of-hashed-words vector, L2-normalised, so similar texts get similar embeddings."""
+    vector = [0.0] * dim
+    for word, count in Counter(re.findall(r"\w+", text.lower())).items():
+        digest = hashlib.sha256(word.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % dim] += count * (1 if digest[4] & 1 else -1)
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+# --- Server ---
+class FakeOpenAIServer:
+    """Runs the fake API on a background thread. Use as a context manager; `base_url` is ready for OPENAI_BASE_URL."""
+
+    def __init__(self, config: FakeConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeConfig()
+        self.stats = Counter()
+        self._attempts = Counter() # request-body hash -> attempts seen (deterministic fault injection)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True); self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown(); self.httpd.server_close()
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+    def _choice_roll(self, body: bytes, index: int) -> float:
+        """Uniform [0, 1) from (seed, request body, choice index); fixed per choice, unlike _roll."""
+        digest = hashlib.sha256(f"{self.config.seed}:choice:{index}:".encode("utf-8") + body).digest()
+        return int.from_bytes(digest[:8], "little") / 2 ** 64
+
+    def _roll(self, body: bytes) -> float:
+        """Uniform [0, 1) from (seed, request body, attempt number): retries of a failed request get a fresh draw."""
+        key = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            self._attempts[key] += 1; attempt = self._attempts[key]
+        digest = hashlib.sha256(f"{self.config.seed}:{key}:{attempt}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "little") / 2 ** 64
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            def log_message(self, *args): pass
+
+            def _json(self, status: int, payload: dict, headers: dict = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items(): self.send_header(key, value)
+                self.end_headers(); self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"): self._json(200, {"object": "list", "data": [{"id": "fake-gpt", "object": "model"}]})
+                else: self._json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                request = json.loads(raw or b"{}")
+                if self.path.endswith("/embeddings"): return self._embeddings(request)
+                if not self.path.endswith("/chat/completions"): return self._json(404, {"error": {"message": "not found"}})
+                self._chat(request, raw)
+
+            def _embeddings(self, request: dict):
+                inputs = request.get("input") or []
+                if isinstance(inputs, str): inputs = [inputs]
+                with server._lock: server.stats["embeddings"] += len(inputs)
+                data = [{"object": "embedding", "index": i, "embedding": embed(str(text), server.config.embedding_dim)} for i, text in enumerate(inputs)]
+                self._json(200, {"object": "list", "data": data, "model": request.get("model", "fake-embedding"), "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+            def _chat(self, request: dict, raw: bytes):
+                config = server.config
+                prompt = "\n".join(str(m.get("content") or "") for m in request.get("messages", []))
+                tool_name = ((request.get("tools") or [{}])[0].get("function") or {}).get("name")
+                agent = "repair" if tool_name and "failed validation" in prompt else detect_agent(prompt)
+                roll = server._roll(raw)
+                with server._lock: server.stats["requests"] += 1; server.stats[f"requests_{agent}"] += 1
+                # Fault injection, in a fixed order over one draw
+                if roll < config.rate_limit_rate:
+                    with server._lock: server.stats["rate_limited"] += 1
+                    return self._json(429, {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}}, {"Retry-After": str(config.retry_after)})
+                roll -= config.rate_limit_rate
+                if roll < config.server_error_rate:
+                    with server._lock: server.stats["server_errors"] += 1
+                    return self._json(503, {"error": {"message": "Service unavailable (fake)", "type": "server_error"}})
+                roll -= config.server_error_rate
+                if roll < config.timeout_rate:
+                    with server._lock: server.stats["stalled"] += 1
+                    time.sleep(config.stall_seconds)
+                roll -= config.timeout_rate
+                malformed = 0 <= roll < config.malformed_rate and agent in ("filter", "boss")
+                if malformed:
+                    with server._lock: server.stats["malformed"] += 1
+                if agent == "repair": text = repair_reply(tool_name, prompt)
+                else: text = reply_for(agent, prompt, malformed, config.reject_first)
+                texts = [text] * (1 if tool_name or request.get("stream") else max(1, int(request.get("n") or 1))) # n-sampling
+                if is_first_draft(agent, prompt):
+                    weak = [i for i in range(len(texts)) if server._choice_roll(raw, i) < config.weak_draft_rate]
+                    texts = [weak_draft(prompt, t) if i in weak else t for i, t in enumerate(texts)]
+                    if weak:
+                        with server._lock: server.stats["weak_drafts"] += len(weak)
+                if not tool_name: texts = [wrap_for_crew(prompt, t) for t in texts]
+                text = texts[0]
+                usage = {"prompt_tokens": count_tokens(prompt), "completion_tokens": sum(count_tokens(t) for t in texts)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                time.sleep(config.latency)
+                if request.get("stream"): self._stream(request, text, usage)
+                else:
+                    if config.token_rate: time.sleep(usage["completion_tokens"] / config.token_rate)
+                    messages = [{"role": "assistant", "content": t} for t in texts]
+                    if tool_name: messages = [{"role": "assistant", "content": None, "tool_calls": [{"id": "call_fake", "type": "function", "function": {"name": tool_name, "arguments": text}}]}]
+                    self._json(200, {"id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": request.get("model", "fake-gpt"),
+                                     "choices": [{"index": i, "message": message, "finish_reason": "tool_calls" if tool_name else "stop"} for i, message in enumerate(messages)], "usage": usage})
+
+            def _stream(self, request: dict, text: str, usage: dict):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream"); self.send_header("Cache-Control", "no-cache"); self.send_header("Connection", "close")
+                self.end_headers()
+                model = request.get("model", "fake-gpt")
+                def send(delta: dict, finish=None, chunk_usage=None):
+                    payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                               "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if delta is not None else []}
+                    if chunk_usage: payload["usage"] = chunk_usage
+                    self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8")); self.wfile.flush()
+                send({"role": "assistant", "content": ""})
+                words = re.findall(r"\S+\s*", text)
+                delay = (usage["completion_tokens"] / server.config.token_rate / max(1, len(words))) if server.config.token_rate else 0
+                for word in words:
+                    send({"content": word})
+                    if delay: time.sleep(delay)
+                send({}, finish="stop")
+                if (request.get("stream_options") or {}).get("include_usage"): send(None, chunk_usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n"); self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fake_openai", description="Run the fake OpenAI-compatible server.")
+    parser.add_argument("--host", default="127.0.0.1"); parser.add_argument("--port", type=int, default=8765)
+    for name, value in vars(FakeConfig()).items():
+        flag = "--" + name.replace("_", "-")
+        if isinstance(value, bool): parser.add_argument(flag, type=lambda v: v.lower() in ("1", "true", "yes"), default=value)
+        else: parser.add_argument(flag, type=type(value), default=value)
+    args = vars(parser.parse_args(argv))
+    host, port = args.pop("host"), args.pop("port")
+    server = FakeOpenAIServer(FakeConfig(**args), host, port)
+    print(f"Fake OpenAI API at {server.base_url} (set OPENAI_BASE_URL to this)")
+    try: server.httpd.serve_forever()
+    except KeyboardInterrupt: server.stop()
+
+if __name__ == "__main__":
+    main()
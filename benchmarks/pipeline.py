@@ -0,0 +1,166 @@
+# benchmarks/pipeline.py
+"""
+Offline pipeline benchmark: every agent talks to benchmarks/fake_openai.py, search uses the static
+backend and all caches live in a throwaway directory, so runs cost nothing and need no network.
+
+    python -m benchmarks.pipeline --pipelines 20 --concurrency 5
+    python -m benchmarks.pipeline --pipelines 10 --rate-limit-rate 0.1 --malformed-rate 0.2 --json
+    python -m benchmarks.pipeline --stream-draft --token-rate 100   # TTFT vs full-draft latency
+    python -m benchmarks.pipeline --no-reject-first --weak-draft-rate 0.5 --draft-candidates 3   # draft tournament vs one draft
+    python -m benchmarks.pipeline --content-types Blog,Newsletter,Social   # three formats per research pass
+
+Reports per-step and end-to-end p50/p95 latency, throughput, LLM calls / retries seen by the fake,
+and memory use (peak RSS and traced Python allocations).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_openai import FakeConfig, FakeOpenAIServer
+
+NICHES = ["Fintech", "Remote work", "Home gardening", "Indie games", "Healthy cooking", "Cybersecurity", "E-commerce", "Personal finance"]
+
+
+class SpanCollector:
+    """In-memory stand-in for the telemetry exporter (see core.telemetry.set_telemetry)."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+def configure_env(base_url: str, data_dir: str, args):
+    """Points every client at the fake server and isolates caches. Must run before core.config.get_settings() is first called."""
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-fake-benchmark", "OPENAI_BASE_URL": base_url, "OPENAI_API_BASE": base_url,
+        "OPENAI_MODEL_NAME": args.model, "MINDFLOW_DATA_DIR": data_dir,
+        "MINDFLOW_CACHE_PATH": os.path.join(data_dir, "llm_cache.sqlite"), "MINDFLOW_SEARCH_CACHE_PATH": os.path.join(data_dir, "search_cache.sqlite"),
+        "MINDFLOW_CHROMA_PATH": os.path.join(data_dir, "chroma"), "MINDFLOW_SEARCH_BACKEND": "static",
+        "MINDFLOW_RESEARCH_MEMORY": "1" if args.research_memory else "0",
+        "MINDFLOW_HTTP_TIMEOUT": str(args.http_timeout), "MINDFLOW_RPM": str(args.rpm), "MINDFLOW_TPM": str(args.tpm),
+        "MINDFLOW_TELEMETRY": "1",
+    })
+
+def make_jobs(args) -> list:
+    from core.pipeline import PipelineJob, format_variants
+    return [PipelineJob(niche=f"{NICHES[i % len(NICHES)]} #{i}", keywords=["AI", "productivity"], max_revisions=args.max_revisions,
+                        stream_draft=args.stream_draft, speculative_research=args.speculative_research, revision_mode=args.revision_mode, precheck=args.precheck,
+                        prerank_top_k=args.prerank_top_k, fast_filter=args.fast_filter, draft_candidates=args.draft_candidates,
+                        formats=format_variants([name.strip() for name in args.content_types.split(",") if name.strip()])) for i in range(args.pipelines)]
+
+async def run_all(jobs: list, concurrency: int) -> list:
+    from core.pipeline import run_job_async
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 2)) # Crew kickoffs run in threads
+    semaphore = asyncio.Semaphore(concurrency)
+    async def run_one(job):
+        async with semaphore: return await run_job_async(job)
+    return await asyncio.gather(*(run_one(job) for job in jobs))
+
+def report(results: list, spans: list, elapsed: float, server: FakeOpenAIServer, args, memory: dict) -> dict:
+    steps = defaultdict(list); agents = defaultdict(list); routes = defaultdict(list)
+    for span in spans:
+        if span.kind == "step": steps[span.name].append(span.wall_seconds)
+        elif span.kind == "llm": agents[span.name].append(span.wall_seconds)
+        elif span.kind == "route": routes[span.name].append(span.wall_seconds)
+    end_to_end = [r["elapsed_seconds"] for r in results if r.get("elapsed_seconds") is not None]
+    ttft = [seconds for r in results for seconds in (r.get("ttft") or {}).values()]
+    parse_stats = defaultdict(lambda: defaultdict(int))
+    for r in results:
+        for role, outcomes in (r.get("parse_stats") or {}).items():
+            for outcome, count in outcomes.items(): parse_stats[role][outcome] += count
+    summarize = lambda values: {"count": len(values), "p50": round(percentile(values, 0.5), 3), "p95": round(percentile(values, 0.95), 3)}
+    return {
+        "config": {"pipelines": args.pipelines, "concurrency": args.concurrency, "stream_draft": args.stream_draft, "revision_mode": args.revision_mode, "draft_candidates": args.draft_candidates, "content_types": args.content_types, "fake": vars(server.config)},
+        "completed": sum(r["status"] == "completed" for r in results), "failed": sum(r["status"] != "completed" for r in results),
+        "errors": sorted({r["error"] for r in results if r.get("error")}),
+        "wall_seconds": round(elapsed, 2), "throughput_per_min": round(len(results) / elapsed * 60, 2) if elapsed else 0.0,
+        "end_to_end": summarize(end_to_end), "ttft": summarize(ttft),
+        "steps": {name: summarize(values) for name, values in sorted(steps.items())},
+        "agents": {name: summarize(values) for name, values in sorted(agents.items())},
+        "routes": {name: summarize(values) for name, values in sorted(routes.items())},
+        "revisions_mean": round(sum(r["revisions"] for r in results) / len(results), 2) if results else 0.0,
+        "retries": sum(span.retries for span in spans if span.kind == "llm"),
+        "retry_waste": {"seconds": round(sum(span.wasted_seconds for span in spans if span.kind == "run"), 2), "tokens": sum(span.wasted_tokens for span in spans if span.kind == "run")},
+        "structured_output": {role: dict(outcomes) for role, outcomes in sorted(parse_stats.items())},
+        "precheck": {outcome: sum((r.get("precheck_stats") or {}).get(outcome, 0) for r in results) for outcome in ("passed", "rejected")},
+        "fake_server": dict(server.stats), "memory": memory,
+    }
+
+def print_report(data: dict):
+    print(f"{data['completed']} completed, {data['failed']} failed in {data['wall_seconds']}s ({data['throughput_per_min']} pipelines/min, concurrency {data['config']['concurrency']})")
+    for error in data["errors"]: print(f"  error: {error}")
+    print(f"\n{'':<28}{'count':>7}{'p50 s':>9}{'p95 s':>9}")
+    print(f"{'end-to-end':<28}{data['end_to_end']['count']:>7}{data['end_to_end']['p50']:>9.2f}{data['end_to_end']['p95']:>9.2f}")
+    if data["ttft"]["count"]: print(f"{'ttft':<28}{data['ttft']['count']:>7}{data['ttft']['p50']:>9.2f}{data['ttft']['p95']:>9.2f}")
+    for section in ("steps", "agents", "routes"):
+        print(f"-- {section}")
+        for name, s in data[section].items(): print(f"{name:<28}{s['count']:>7}{s['p50']:>9.2f}{s['p95']:>9.2f}")
+    print(f"\nrevisions/pipeline {data['revisions_mean']}, retries {data['retries']} (wasted {data['retry_waste']['seconds']}s, {data['retry_waste']['tokens']} tokens), fake server {data['fake_server']}")
+    print(f"local pre-checks: {data['precheck']['passed']} passed, {data['precheck']['rejected']} rejected (boss calls saved)")
+    for role, outcomes in data["structured_output"].items(): print(f"structured output [{role}]: {outcomes}")
+    print(f"memory: peak RSS {data['memory']['peak_rss_mb']} MB, traced peak {data['memory']['traced_peak_mb']} MB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.pipeline", description="Benchmark N concurrent pipelines against a local fake LLM.")
+    parser.add_argument("--pipelines", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--max-revisions", type=int, default=3)
+    parser.add_argument("--stream-draft", action="store_true", help="Stream writer / revision tokens (reports TTFT).")
+    parser.add_argument("--speculative-research", type=int, default=0)
+    parser.add_argument("--revision-mode", choices=["full", "patch"], default="full")
+    parser.add_argument("--prerank-top-k", type=int, default=5, help="Distinct ideas sent to the filter agent after embedding dedup (0 = all).")
+    parser.add_argument("--fast-filter", action="store_true", help="Skip the filter agent and use the embedding ranking.")
+    parser.add_argument("--no-precheck", dest="precheck", action="store_false", help="Send every draft to the boss (skip core/draft_checks.py).")
+    parser.add_argument("--draft-candidates", type=int, default=1, help="Draft tournament size (sampled in one call, best local score wins).")
+    parser.add_argument("--content-types", default="", help="Comma-separated content types to fan out per pipeline from one research pass, e.g. Blog,Newsletter,Social.")
+    parser.add_argument("--research-memory", action="store_true", help="Enable Chroma research memory (embeddings also come from the fake).")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--http-timeout", type=float, default=10.0)
+    parser.add_argument("--rpm", type=float, default=100000); parser.add_argument("--tpm", type=float, default=100000000)
+    parser.add_argument("--latency", type=float, default=0.05); parser.add_argument("--token-rate", type=float, default=400.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0); parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0); parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--no-reject-first", dest="reject_first", action="store_false", help="Boss approves first drafts.")
+    parser.add_argument("--weak-draft-rate", type=float, default=0.0, help="Fraction of sampled first drafts missing the keywords (with --no-reject-first, shows tournament gains).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args(argv)
+
+    config = FakeConfig(latency=args.latency, token_rate=args.token_rate, rate_limit_rate=args.rate_limit_rate, server_error_rate=args.server_error_rate,
+                        timeout_rate=args.timeout_rate, stall_seconds=args.http_timeout + 1, malformed_rate=args.malformed_rate,
+                        reject_first=args.reject_first, weak_draft_rate=args.weak_draft_rate, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="mindflow-bench-") as data_dir, FakeOpenAIServer(config) as server:
+        configure_env(server.base_url, data_dir, args)
+        from core import telemetry
+        collector = SpanCollector(); telemetry.set_telemetry(collector)
+        jobs = make_jobs(args)
+        tracemalloc.start()
+        start = time.perf_counter()
+        results = asyncio.run(run_all(jobs, args.concurrency))
+        elapsed = time.perf_counter() - start
+        _, traced_peak = tracemalloc.get_traced_memory(); tracemalloc.stop()
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        data = report(results, collector.spans, elapsed, server, args, {"peak_rss_mb": round(peak_rss, 1), "traced_peak_mb": round(traced_peak / 2 ** 20, 1)})
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump(data, f, indent=2)
+    if args.json: print(json.dumps(data, indent=2))
+    else: print_report(data)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmark: import time per module, each measured in a fresh interpreter.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --json --budget-ms 300 core.pipeline
+
+Uses `python -X importtime`, so numbers are cumulative (the module plus everything it pulls in).
+Exits with status 1 if any module exceeds --budget-ms, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules on the cold-start path of app.py / core.batch. None of these should load crewai, langchain or chromadb.
+DEFAULT_MODULES = [
+    "core.config",
+    "core.pipeline",
+    "core.batch",
+    "agents.idea_agent",
+    "agents.filter_agent",
+    "agents.research_agent",
+    "agents.writer_agent",
+    "agents.boss_agent",
+    "vectorstore.chroma_setup",
+    "vectorstore.research_memory",
+]
+HEAVY_MODULES = ("crewai", "langchain", "langchain_core", "langchain_openai", "litellm", "chromadb", "openai", "tiktoken")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> dict:
+    """Imports `module` in a fresh interpreter; returns its cumulative import time (ms) and the heavy packages it loaded."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"module": module, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"}
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line: continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit(): continue
+        cumulative[parts[2].strip()] = int(parts[1])
+    heavy = sorted(name for name in cumulative if name in HEAVY_MODULES)
+    return {"module": module, "ms": round(cumulative.get(module, 0) / 1000, 1), "heavy": heavy}
+
+
+def run(modules: list, repeat: int = 3) -> list:
+    """Median of `repeat` cold imports per module."""
+    results = []
+    for module in modules:
+        samples = [measure(module) for _ in range(repeat)]
+        failed = next((s for s in samples if "error" in s), None)
+        if failed: results.append(failed); continue
+        results.append({"module": module, "ms": statistics.median(s["ms"] for s in samples), "heavy": samples[0]["heavy"]})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description="Measure per-module cold import time.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module (median is reported).")
+    parser.add_argument("--budget-ms", type=float, help="Fail if any module takes longer than this to import.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = run(args.modules, args.repeat)
+    over_budget = [r for r in results if "error" in r or (args.budget_ms is not None and r["ms"] > args.budget_ms)]
+    if args.json:
+        print(json.dumps({"budget_ms": args.budget_ms, "results": results}, indent=2))
+    else:
+        print(f"{'module':<32}{'import ms':>10}  heavy imports")
+        for r in results:
+            if "error" in r: print(f"{r['module']:<32}{'ERROR':>10}  {r['error']}"); continue
+            print(f"{r['module']:<32}{r['ms']:>10.1f}  {', '.join(r['heavy']) or '-'}")
+    if over_budget:
+        print(f"{len(over_budget)} module(s) failed or exceeded the budget.", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# core/batch.py
+"""
+Headless batch runner: generate content for many niches without the Streamlit UI.
+
+    python -m core.batch jobs.jsonl --output results.jsonl --concurrency 4
+
+Input is JSONL (one object per line) or CSV with columns:
+    niche, keywords, content_type, audience, tone, length   (keywords comma-separated in CSV)
+Optional content_types / tones / lengths (lists, or comma-separated) fan one job out into every
+combination, all written from a single research pass; results carry one entry per format in "outputs".
+Each finished job is appended to the output JSONL immediately.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.pipeline import PipelineJob, run_job_async
+
+
+def load_jobs(path: str) -> list:
+    """Reads jobs from a .jsonl/.json-lines or .csv file. Invalid rows are reported and skipped."""
+    records = []
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            records = list(csv.DictReader(f))
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip(): continue
+                try: records.append(json.loads(line))
+                except json.JSONDecodeError as e: print(f"Skipping line {line_no}: invalid JSON ({e})")
+    jobs = []
+    for i, record in enumerate(records, 1):
+        try: jobs.append(PipelineJob.from_dict(record))
+        except ValueError as e: print(f"Skipping job {i}: {e}")
+    return jobs
+
+
+async def run_batch_async(jobs: list, output_path: str, concurrency: int = 8) -> dict:
+    """Runs jobs in one event loop with at most `concurrency` pipelines in flight, streaming each result as it finishes."""
+    concurrency = max(1, concurrency)
+    # Crew.kickoff_async runs each kickoff in a worker thread; size the pool so it is never the bottleneck
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 2))
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"completed": 0, "failed": 0}
+    start = time.perf_counter()
+
+    async def run_one(index, job):
+        async with semaphore:
+            try: record = await run_job_async(job)
+            except Exception as e: record = {"job": vars(job), "status": "failed", "error": f"{type(e).__name__}: {e}"}
+        record["index"] = index
+        return job, record
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "a", encoding="utf-8") as out:
+        for finished in asyncio.as_completed([run_one(index, job) for index, job in enumerate(jobs)]):
+            job, record = await finished
+            out.write(json.dumps(record, ensure_ascii=False) + "\n"); out.flush()
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            print(f"[{sum(counts.values())}/{len(jobs)}] {record['status']}: {job.niche}")
+    counts["elapsed_seconds"] = round(time.perf_counter() - start, 2)
+    return counts
+
+
+def run_batch(jobs: list, output_path: str, concurrency: int = 8) -> dict:
+    return asyncio.run(run_batch_async(jobs, output_path, concurrency))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.batch", description="Run the MindFlow pipeline for many jobs.")
+    parser.add_argument("jobs", help="Path to a JSONL or CSV file of jobs.")
+    parser.add_argument("--output", "-o", default="results.jsonl", help="Output JSONL (appended to).")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Max pipelines running at once.")
+    parser.add_argument("--max-revisions", type=int, help="Override max_revisions for every job.")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.jobs)
+    if args.max_revisions is not None:
+        for job in jobs: job.max_revisions = args.max_revisions
+    if not jobs: print("No valid jobs found."); return
+    print(f"Running {len(jobs)} jobs with concurrency {args.concurrency} → {args.output}")
+    summary = run_batch(jobs, args.output, args.concurrency)
+    print(f"Done: {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# core/config.py
+"""
+Application settings, loaded once per process from the environment / .env file.
+Every module reads configuration through get_settings() instead of calling load_dotenv itself.
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+@dataclass(frozen=True)
+class Settings:
+    openai_api_key: str
+    openai_base_url: str # None = api.openai.com; point at any OpenAI-compatible server (e.g. benchmarks/fake_openai.py)
+    model_name: str
+    data_dir: str
+    # LLM cache (core/llm_cache.py)
+    cache_path: str
+    cache_ttl: float
+    cache_max_entries: int
+    # Client pool / rate limiter (core/llm_pool.py)
+    rpm: float
+    tpm: float
+    max_connections: int
+    http_timeout: float
+    agent_shares: str
+    routes: str # Per-agent model routes / cascades (core/routing.py): inline JSON or a JSON file path
+    # Prompt budgets (core/prompt_budget.py)
+    context_window: int # 0 = from the model name
+    prompt_budgets: str
+    # Retry policy / circuit breaker (core/retry_policy.py)
+    retry_max_attempts: int
+    retry_base_delay: float
+    retry_max_delay: float
+    step_deadline: float
+    step_token_budget: int
+    breaker_failures: int
+    breaker_cooldown: float
+    # Search (core/search.py)
+    search_backend: str
+    search_fixtures: str
+    search_cache_path: str
+    search_ttl: float
+    # Vector store (vectorstore/)
+    chroma_path: str
+    research_memory: bool
+    research_reuse_threshold: float
+    research_topup_threshold: float
+    embedding_model: str
+    embedding_cache: bool
+    embedding_cache_dir: str
+    # Idea pre-ranking (core/idea_rank.py)
+    idea_dedup_threshold: float
+    # Run store (core/run_store.py)
+    run_store: bool
+    run_store_path: str
+    # Job queue / workers (core/job_queue.py, core/worker.py)
+    queue_path: str
+    use_queue: bool
+    workers: int
+    worker_concurrency: int
+    # Telemetry (core/telemetry.py)
+    telemetry: bool
+    trace_path: str
+    trace_max_bytes: int
+    metrics_path: str
+    model_prices: str
+
+    def require_api_key(self) -> str:
+        if not self.openai_api_key: raise ValueError("OPENAI_API_KEY not found")
+        return self.openai_api_key
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Reads .env and the environment on first call; later calls return the same Settings."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    env = os.getenv
+    data_dir = env("MINDFLOW_DATA_DIR", ".mindflow")
+    return Settings(
+        openai_api_key=env("OPENAI_API_KEY"),
+        openai_base_url=env("OPENAI_BASE_URL") or env("OPENAI_API_BASE"),
+        model_name=env("OPENAI_MODEL_NAME", "gpt-3.5-turbo"),
+        data_dir=data_dir,
+        cache_path=env("MINDFLOW_CACHE_PATH", os.path.join(data_dir, "llm_cache.sqlite")),
+        cache_ttl=float(env("MINDFLOW_CACHE_TTL", 7 * 24 * 3600)),
+        cache_max_entries=int(env("MINDFLOW_CACHE_MAX_ENTRIES", 20000)),
+        rpm=float(env("MINDFLOW_RPM", 500)),
+        tpm=float(env("MINDFLOW_TPM", 200000)),
+        max_connections=int(env("MINDFLOW_MAX_CONNECTIONS", 20)),
+        http_timeout=float(env("MINDFLOW_HTTP_TIMEOUT", 120)),
+        agent_shares=env("MINDFLOW_AGENT_SHARES", ""),
+        routes=env("MINDFLOW_ROUTES", ""),
+        context_window=int(env("MINDFLOW_CONTEXT_WINDOW", 0)),
+        prompt_budgets=env("MINDFLOW_PROMPT_BUDGETS", ""),
+        retry_max_attempts=int(env("MINDFLOW_RETRY_MAX_ATTEMPTS", 5)),
+        retry_base_delay=float(env("MINDFLOW_RETRY_BASE_DELAY", 2.0)),
+        retry_max_delay=float(env("MINDFLOW_RETRY_MAX_DELAY", 60.0)),
+        step_deadline=float(env("MINDFLOW_STEP_DEADLINE", 600)),
+        step_token_budget=int(env("MINDFLOW_STEP_TOKEN_BUDGET", 0)),
+        breaker_failures=int(env("MINDFLOW_BREAKER_FAILURES", 5)),
+        breaker_cooldown=float(env("MINDFLOW_BREAKER_COOLDOWN", 30)),
+        search_backend=env("MINDFLOW_SEARCH_BACKEND", "duckduckgo").lower(),
+        search_fixtures=env("MINDFLOW_SEARCH_FIXTURES"),
+        search_cache_path=env("MINDFLOW_SEARCH_CACHE_PATH", os.path.join(data_dir, "search_cache.sqlite")),
+        search_ttl=float(env("MINDFLOW_SEARCH_TTL", 6 * 3600)),
+        chroma_path=env("MINDFLOW_CHROMA_PATH", "./chroma_data"),
+        research_memory=env("MINDFLOW_RESEARCH_MEMORY", "1") != "0",
+        research_reuse_threshold=float(env("MINDFLOW_RESEARCH_REUSE_THRESHOLD", 0.92)),
+        research_topup_threshold=float(env("MINDFLOW_RESEARCH_TOPUP_THRESHOLD", 0.80)),
+        embedding_model=env("MINDFLOW_EMBEDDING_MODEL", "text-embedding-ada-002"),
+        embedding_cache=env("MINDFLOW_EMBEDDING_CACHE", "1") != "0",
+        embedding_cache_dir=env("MINDFLOW_EMBEDDING_CACHE_DIR", os.path.join(data_dir, "embeddings")),
+        idea_dedup_threshold=float(env("MINDFLOW_IDEA_DEDUP_THRESHOLD", 0.90)),
+        run_store=env("MINDFLOW_RUN_STORE", "1") != "0",
+        run_store_path=env("MINDFLOW_RUN_STORE_PATH", os.path.join(data_dir, "runs.sqlite")),
+        queue_path=env("MINDFLOW_QUEUE_PATH", os.path.join(data_dir, "queue.sqlite")),
+        use_queue=env("MINDFLOW_USE_QUEUE", "0") == "1",
+        workers=int(env("MINDFLOW_WORKERS", 2)),
+        worker_concurrency=int(env("MINDFLOW_WORKER_CONCURRENCY", 2)),
+        telemetry=env("MINDFLOW_TELEMETRY", "1") != "0",
+        trace_path=env("MINDFLOW_TRACE_PATH", os.path.join(data_dir, "traces.jsonl")),
+        trace_max_bytes=int(env("MINDFLOW_TRACE_MAX_BYTES", 10_000_000)),
+        metrics_path=env("MINDFLOW_METRICS_PATH", os.path.join(data_dir, "metrics.prom")),
+        model_prices=env("MINDFLOW_MODEL_PRICES", ""),
+    )
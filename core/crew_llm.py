@@ -0,0 +1,52 @@
+# core/crew_llm.py
+"""
+crewai adapter over the shared LangChain clients in core/llm_pool.py.
+
+crewai only keeps models that subclass its BaseLLM and rebuilds everything else through litellm,
+so an Agent given ChatOpenAI directly would bypass the shared limiter, the persistent cache, the
+pooled httpx client, max_retries=0 and the usage callback. PooledCrewLLM forwards each crewai LLM
+call to get_llm(role), so those all apply per call, including every step of a tool-using agent.
+Tools are used through crewai's text (ReAct) loop; native function calling is not advertised.
+"""
+from crewai.llms.base_llm import BaseLLM
+
+from core.llm_pool import get_llm
+from core.prompt_budget import context_window
+
+
+def _no_crewai_retry(method):
+    """Marks a call method so crewai does not wrap it in its own rate-limit retry: core/retry_policy.py owns retries."""
+    method._crewai_rate_limit_wrapped = True
+    return method
+
+
+class PooledCrewLLM(BaseLLM):
+    """crewai view of the shared ChatOpenAI client for one agent role."""
+
+    llm_type: str = "mindflow"
+    role: str
+
+    @_no_crewai_retry
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None, response_model=None, **kwargs):
+        if response_model is not None:
+            return get_llm(self.role).with_structured_output(response_model, method="function_calling").invoke(messages)
+        return self._finish(get_llm(self.role).invoke(messages, stop=self._stops() or None))
+
+    @_no_crewai_retry
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None, response_model=None, **kwargs):
+        if response_model is not None:
+            return await get_llm(self.role).with_structured_output(response_model, method="function_calling").ainvoke(messages)
+        return self._finish(await get_llm(self.role).ainvoke(messages, stop=self._stops() or None))
+
+    def _stops(self) -> list:
+        # Newer crewai sets per-call stop words through `stop_sequences`; older releases only have `stop`
+        return list(getattr(self, "stop_sequences", None) or self.stop or [])
+
+    def _finish(self, message) -> str:
+        """Reply text, cut at the first stop word (the provider already stops there; this covers replays)."""
+        text = message.content or ""
+        cuts = [i for i in (text.find(stop) for stop in self._stops()) if i >= 0]
+        return text[:min(cuts)].rstrip() if cuts else text
+
+    def get_context_window_size(self) -> int:
+        return context_window(self.model)
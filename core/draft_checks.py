@@ -0,0 +1,124 @@
+# core/draft_checks.py
+"""
+Cheap local checks run on a draft before the boss agent sees it.
+
+Word count against the Short / Medium / Long target, keyword coverage, structure (intro, headed
+body sections, conclusion) and readability (Flesch reading ease). Only clear failures are reported,
+with tolerances on every threshold; anything borderline is left to the boss. Issues use the boss's
+{"section", "instructions"} shape, so they feed straight into prepare_revision / patch revisions.
+
+    issues = check_draft(draft, "Blog", "Beginners", "Medium", ["AI", "productivity"])
+    if issues: ... # revise without calling the boss
+    score, issues = score_draft(draft, "Blog", "Beginners", "Medium", ["AI", "productivity"]) # ranks tournament candidates
+"""
+import re
+
+from core import draft_sections
+
+# Target words per content length; social posts are an order of magnitude shorter
+LENGTH_WORDS = {"Short": (300, 600), "Medium": (600, 1200), "Long": (1200, 2500)}
+SOCIAL_LENGTH_WORDS = {"Short": (30, 80), "Medium": (80, 180), "Long": (180, 350)}
+LENGTH_TOLERANCE = (0.7, 1.5) # Clear failure below 70% of the minimum or above 150% of the maximum
+MIN_KEYWORD_COVERAGE = 0.5 # Share of the job keywords that must appear at least once
+STRUCTURED_TYPES = {"Blog", "Newsletter"} # Content types expected to have intro, headed body and conclusion
+MIN_HEADINGS = 2
+MIN_READING_EASE = {"Beginners": 45.0, "Advanced": 25.0, "Experts": 10.0} # Flesch reading ease, clear-failure floor
+READABILITY_MIN_WORDS = 40 # Sections shorter than this are not scored
+MAX_SECTION_ISSUES = 3
+ISSUE_PENALTY = 1.0 # Score cost of each clear failure; outweighs any difference in the soft terms
+READABILITY_HEADROOM = 30.0 # Reading-ease points above the audience floor that earn the full readability term
+
+CONCLUSION_WORDS = re.compile(r"\b(conclusion|summary|takeaways?|final thoughts|wrapping up|in closing|next steps|key points)\b", re.I)
+WORD = re.compile(r"[A-Za-z][A-Za-z'\-]*|\d+(?:[.,]\d+)*")
+
+
+def word_count(text: str) -> int:
+    return len(WORD.findall(text or ""))
+
+def length_target(content_type: str, content_length: str) -> tuple:
+    """(min, max) words for the job, also quoted in the writing task."""
+    table = SOCIAL_LENGTH_WORDS if content_type == "Social" else LENGTH_WORDS
+    return table.get(content_length, table["Medium"])
+
+def _syllables(word: str) -> int:
+    word = word.lower().strip("'")
+    if len(word) <= 3: return 1
+    word = re.sub(r"(?:es|ed|e)$", "", word)
+    return max(1, len(re.findall(r"[aeiouy]+", word)))
+
+def reading_ease(text: str) -> float:
+    """Flesch reading ease (higher is easier; 60-70 is plain English). Headings and list markers are ignored."""
+    text = re.sub(r"^\s*(#{1,6}\s.*|[-*>]\s*)", "", text or "", flags=re.M)
+    words = re.findall(r"[A-Za-z][A-Za-z'\-]*", text)
+    if not words: return 100.0
+    sentences = max(1, len(re.findall(r"[.!?]+(?=\s|$)", text)))
+    return 206.835 - 1.015 * (len(words) / sentences) - 84.6 * (sum(map(_syllables, words)) / len(words))
+
+def _is_heading(line: str) -> bool:
+    return bool(draft_sections.HEADING.match(line))
+
+def keyword_coverage(text: str, keywords: list) -> tuple:
+    """(share of keywords present, missing keywords). Matching is case-insensitive on word boundaries."""
+    keywords = [kw.strip() for kw in keywords or [] if kw.strip()]
+    if not keywords: return 1.0, []
+    lowered = (text or "").lower()
+    missing = [kw for kw in keywords if not re.search(r"(?<!\w)" + re.escape(kw.lower()) + r"(?!\w)", lowered)]
+    return 1 - len(missing) / len(keywords), missing
+
+
+# --- Checks (each returns a list of issues) ---
+def check_length(text: str, content_type: str, content_length: str) -> list:
+    words = word_count(text); low, high = length_target(content_type, content_length)
+    if words < low * LENGTH_TOLERANCE[0]:
+        return [{"check": "length", "section": None, "instructions": f"The draft has {words} words; a {content_length.lower()} {content_type.lower()} needs {low}-{high}. Expand it with more depth from the research."}]
+    if words > high * LENGTH_TOLERANCE[1]:
+        return [{"check": "length", "section": None, "instructions": f"The draft has {words} words; a {content_length.lower()} {content_type.lower()} should have {low}-{high}. Tighten it and cut repetition."}]
+    return []
+
+def check_keywords(text: str, keywords: list) -> list:
+    coverage, missing = keyword_coverage(text, keywords)
+    if coverage >= MIN_KEYWORD_COVERAGE: return []
+    return [{"check": "keywords", "section": None, "instructions": f"Work these keywords naturally into the draft: {', '.join(missing)}."}]
+
+def check_structure(text: str, sections: list, content_type: str) -> list:
+    if content_type not in STRUCTURED_TYPES or not sections: return []
+    blocks = [block.strip() for block in re.split(r"\n\s*\n", text.strip()) if block.strip()]
+    if blocks and blocks[0].startswith("# "): blocks = blocks[1:] # The title is not a section heading
+    headings = [block.splitlines()[0] for block in blocks if _is_heading(block.splitlines()[0])]
+    issues = []
+    if len(headings) < MIN_HEADINGS:
+        issues.append({"check": "structure", "section": None, "instructions": f"Organise the body into at least {MIN_HEADINGS} sections with descriptive headings."})
+    if blocks and _is_heading(blocks[0]) and not re.search(r"intro|overview", blocks[0], re.I):
+        issues.append({"check": "structure", "section": None, "instructions": "Open with an introduction that states the topic and why it matters before the first section."})
+    if len(sections) >= 3 and not CONCLUSION_WORDS.search(sections[-1]):
+        issues.append({"check": "structure", "section": len(sections), "instructions": "End with a clear conclusion that sums up the key takeaways."})
+    return issues
+
+def check_readability(sections: list, target_audience: str) -> list:
+    floor = MIN_READING_EASE.get(target_audience, MIN_READING_EASE["Beginners"])
+    scored = [(reading_ease(section), number) for number, section in enumerate(sections, 1) if word_count(section) >= READABILITY_MIN_WORDS]
+    hard = sorted((score, number) for score, number in scored if score < floor)[:MAX_SECTION_ISSUES]
+    return [{"check": "readability", "section": number,
+             "instructions": f"Section is hard to read for {target_audience.lower()} (reading ease {score:.0f}, needs {floor:.0f}+). Use shorter sentences and plainer words."}
+            for score, number in sorted(hard, key=lambda item: item[1])]
+
+def check_draft(text: str, content_type: str, target_audience: str, content_length: str, keywords: list) -> list:
+    """All clear failures for the draft, or [] if it should go to the boss."""
+    if not (text or "").strip(): return [{"check": "length", "section": None, "instructions": "The draft is empty. Write the full piece."}]
+    sections = draft_sections.split_sections(text)
+    return (check_length(text, content_type, content_length) + check_keywords(text, keywords)
+            + check_structure(text, sections, content_type) + check_readability(sections, target_audience))
+
+
+def score_draft(text: str, content_type: str, target_audience: str, content_length: str, keywords: list) -> tuple:
+    """(score, issues) for ranking candidate drafts; higher is better. Each clear failure costs ISSUE_PENALTY; keyword
+    coverage, closeness to the length target and readability above the audience floor add up to 1 each."""
+    issues = check_draft(text, content_type, target_audience, content_length, keywords)
+    coverage, _ = keyword_coverage(text, keywords)
+    words = word_count(text); low, high = length_target(content_type, content_length)
+    if words < low: length_fit = max(0.0, words / low)
+    elif words > high: length_fit = max(0.0, 1 - (words - high) / high)
+    else: length_fit = 1.0
+    floor = MIN_READING_EASE.get(target_audience, MIN_READING_EASE["Beginners"])
+    readability = min(1.0, max(0.0, (reading_ease(text) - floor) / READABILITY_HEADROOM))
+    return round(coverage + length_fit + readability - ISSUE_PENALTY * len(issues), 3), issues
@@ -0,0 +1,83 @@
+# core/draft_sections.py
+"""
+Section-level view of a draft for patch-based revisions.
+
+A draft is split into numbered sections (blank-line separated blocks; a heading stays with the
+block that follows it). The boss ties issues to section numbers, the writer returns replacement
+text for just those sections as
+
+    [S3]
+    new text for section 3
+    [S5]
+    DELETE
+
+and the edits are applied locally, so a revision costs output tokens for the changed sections only.
+"""
+import re
+
+SECTION_MARKER = re.compile(r"^\s*\[S(\d+)\]\s*$", re.M)
+HEADING = re.compile(r"^\s*(#{1,6}\s|\*\*[^*]+\*\*\s*$)")
+DELETE = "DELETE"
+
+
+def split_sections(text: str) -> list:
+    """Blank-line separated blocks; a block that is only a heading is merged into the next one."""
+    blocks = [block.strip() for block in re.split(r"\n\s*\n", (text or "").strip()) if block.strip()]
+    sections = []
+    for block in blocks:
+        if sections and HEADING.match(sections[-1]) and "\n" not in sections[-1]: sections[-1] += "\n\n" + block
+        else: sections.append(block)
+    return sections
+
+def join_sections(sections: list) -> str:
+    return "\n\n".join(section for section in sections if section)
+
+def number_sections(sections: list, only: set = None, preview_chars: int = 0) -> str:
+    """'[S1]\\n...' listing (1-based). With `only`, other sections are shown as a short preview (or left out if preview_chars=0)."""
+    lines = []
+    for number, section in enumerate(sections, 1):
+        if only is None or number in only: lines.append(f"[S{number}]\n{section}")
+        elif preview_chars: lines.append(f"[S{number}] (unchanged) {section[:preview_chars].splitlines()[0]}...")
+    return "\n\n".join(lines)
+
+def outline(sections: list, chars: int = 80) -> str:
+    """One line per section, to give the writer context for the sections it is not rewriting."""
+    return "\n".join(f"S{number}: {section.splitlines()[0][:chars]}" for number, section in enumerate(sections, 1))
+
+def issue_sections(issues: list, section_count: int) -> dict:
+    """Maps section number -> list of instructions. Issues without a valid 'section' go under 0 (whole draft)."""
+    by_section = {}
+    for issue in issues or []:
+        if not isinstance(issue, dict): continue
+        targets = issue.get("section", issue.get("sections"))
+        targets = targets if isinstance(targets, list) else [targets]
+        numbers = []
+        for target in targets:
+            try: number = int(str(target).lstrip("Ss"))
+            except (TypeError, ValueError): continue
+            if 1 <= number <= section_count: numbers.append(number)
+        for number in numbers or [0]: by_section.setdefault(number, []).append(issue.get("instructions", ""))
+    return by_section
+
+def parse_section_edits(raw: str) -> dict:
+    """Parses '[S<n>]' blocks from the writer's reply into {n: replacement text}; 'DELETE' removes the section."""
+    raw = str(raw or "")
+    markers = list(SECTION_MARKER.finditer(raw))
+    edits = {}
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(raw)
+        text = raw[marker.end():end].strip()
+        if text: edits[int(marker.group(1))] = text
+    return edits
+
+def apply_section_edits(sections: list, edits: dict) -> str:
+    """Replaces (or deletes) the edited sections and returns the new draft text. Out-of-range edits are ignored."""
+    updated = list(sections)
+    for number, text in edits.items():
+        if 1 <= number <= len(sections): updated[number - 1] = "" if text.strip().upper() == DELETE else text.strip()
+    return join_sections(updated)
+
+def changed_sections(old_sections: list, new_sections: list) -> list:
+    """Numbers of sections in `new_sections` whose text did not exist before (edits may split or merge sections)."""
+    previous = set(old_sections)
+    return [number for number, section in enumerate(new_sections, 1) if section not in previous]
@@ -0,0 +1,68 @@
+# core/idea_rank.py
+"""
+Embedding-based pre-filter for generated ideas.
+
+All ideas, the niche and the keywords are embedded in one batched call. Relevance is a weighted
+cosine similarity to the niche and the keywords, near-duplicates (cosine >= dedup threshold) are
+collapsed onto their best-scoring variant, and only the top-K distinct ideas go on to the filter
+agent. In fast mode the ranking itself becomes the {"Idea", "Score", "Reasoning"} filter result.
+
+numpy is imported on first use (it ships with chromadb).
+"""
+import re
+from dataclasses import dataclass, field
+
+NICHE_WEIGHT = 0.6 # Relevance = 0.6 * sim(idea, niche + keywords) + 0.4 * mean sim(idea, keyword)
+DEFAULT_DEDUP_THRESHOLD = 0.90
+
+
+@dataclass
+class IdeaRanking:
+    ideas: list # Distinct ideas, best first (top-K)
+    relevance: list # Cosine relevance per idea, same order
+    duplicates: dict = field(default_factory=dict) # dropped idea -> idea it duplicates
+    keyword_hits: list = field(default_factory=list) # Keywords mentioned literally, per idea
+    total: int = 0 # Ideas before dedup / top-K
+
+    def filter_result(self, niche: str) -> dict:
+        """Local stand-in for the filter agent's output, scores rescaled to 0.5-1.0 (best = 1.0)."""
+        if not self.ideas: return {"Idea": [], "Score": [], "Reasoning": []}
+        low, high = min(self.relevance), max(self.relevance)
+        scores = [round(0.5 + 0.5 * (r - low) / (high - low), 2) if high > low else 1.0 for r in self.relevance]
+        reasoning = [f"Embedding similarity {r:.2f} to '{niche}'" + (f"; mentions {', '.join(hits)}." if hits else ".")
+                     for r, hits in zip(self.relevance, self.keyword_hits)]
+        return {"Idea": list(self.ideas), "Score": scores, "Reasoning": reasoning}
+
+
+def _normalize(matrix):
+    import numpy as np
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+def default_embed(texts: list) -> list:
+    """Embeds with the shared vector-store embedding function (one upstream call for the whole list)."""
+    from vectorstore.chroma_setup import get_embedding_function
+    return get_embedding_function()(texts)
+
+def rank_ideas(ideas: list, niche: str, keywords: list, top_k: int = 5, dedup_threshold: float = DEFAULT_DEDUP_THRESHOLD, embed=None) -> IdeaRanking:
+    """Scores, deduplicates and truncates `ideas`. `embed(texts) -> vectors` defaults to default_embed."""
+    import numpy as np
+    ideas = list(dict.fromkeys(idea.strip() for idea in ideas if idea and idea.strip())) # Exact repeats never reach the embedder
+    keywords = [kw.strip() for kw in keywords or [] if kw.strip()]
+    if not ideas: return IdeaRanking([], [])
+    query = f"{niche}: {', '.join(keywords)}" if keywords else niche
+    vectors = _normalize((embed or default_embed)(ideas + [query] + keywords))
+    idea_vectors, query_vector, keyword_vectors = vectors[:len(ideas)], vectors[len(ideas)], vectors[len(ideas) + 1:]
+    relevance = idea_vectors @ query_vector
+    if len(keyword_vectors): relevance = NICHE_WEIGHT * relevance + (1 - NICHE_WEIGHT) * (idea_vectors @ keyword_vectors.T).mean(axis=1)
+    order = np.argsort(-relevance, kind="stable")
+    similarity = idea_vectors @ idea_vectors.T
+    kept, duplicates = [], {}
+    for i in order: # Greedy in relevance order: an idea survives unless a better one is too similar
+        match = next((k for k in kept if similarity[i, k] >= dedup_threshold), None)
+        if match is None: kept.append(int(i))
+        else: duplicates[ideas[i]] = ideas[match]
+    kept = kept[:top_k] if top_k else kept
+    hits = [[kw for kw in keywords if re.search(r"(?<!\w)" + re.escape(kw.lower()) + r"(?!\w)", ideas[i].lower())] for i in kept]
+    return IdeaRanking([ideas[i] for i in kept], [round(float(relevance[i]), 4) for i in kept], duplicates, hits, total=len(ideas))
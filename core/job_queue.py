@@ -0,0 +1,185 @@
+# core/job_queue.py
+"""
+SQLite-backed queue of pipeline jobs, shared by the Streamlit app, the batch tools and the worker
+processes in core/worker.py.
+
+A job moves queued → running → completed | failed | cancelled. Workers claim jobs atomically,
+heartbeat while they run them and append every engine event (step start / progress / complete,
+warnings, errors) to an events table that the UI polls. Streamed draft tokens only update the
+job's `partial` text instead of adding rows.
+
+    python -m core.job_queue enqueue jobs.jsonl       # same formats as core.batch
+    python -m core.job_queue list --status queued
+    python -m core.job_queue cancel 9b1d...
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, fields
+
+from core.config import get_settings
+
+STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+
+
+class JobQueue:
+    """Jobs and their event streams in one SQLite file (WAL mode; safe across processes)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY, job TEXT NOT NULL, status TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0,
+            worker TEXT, run_id TEXT, attempts INTEGER NOT NULL DEFAULT 0, cancel_requested INTEGER NOT NULL DEFAULT 0,
+            partial TEXT, result TEXT, error TEXT,
+            created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, priority, created_at)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, step TEXT, kind TEXT, message TEXT, data TEXT, created_at REAL NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_job ON events(job_id, id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Producers (UI, CLI) ---
+    def enqueue(self, job, priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        self._conn().execute("INSERT INTO jobs (job_id, job, status, priority, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                             (job_id, json.dumps(asdict(job), default=str), priority, time.time()))
+        return job_id
+
+    def get(self, job_id: str) -> dict:
+        self._conn().row_factory = sqlite3.Row
+        try: row = self._conn().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        finally: self._conn().row_factory = None
+        if row is None: return None
+        record = dict(row)
+        record["job"] = json.loads(record["job"]); record["result"] = json.loads(record["result"]) if record["result"] else None
+        return record
+
+    def events(self, job_id: str, after_id: int = 0) -> list:
+        """Events newer than after_id as (id, step, kind, message, data) tuples."""
+        rows = self._conn().execute("SELECT id, step, kind, message, data FROM events WHERE job_id = ? AND id > ? ORDER BY id", (job_id, after_id)).fetchall()
+        return [(row[0], row[1], row[2], row[3], json.loads(row[4]) if row[4] else None) for row in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a queued job outright; a running job is flagged and stopped by its worker."""
+        conn = self._conn()
+        if conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'", (time.time(), job_id)).rowcount: return True
+        return bool(conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,)).rowcount)
+
+    def list(self, status: str = None, limit: int = 20) -> list:
+        query = "SELECT job_id, status, worker, run_id, attempts, job, error, created_at FROM jobs"
+        params = ()
+        if status: query += " WHERE status = ?"; params = (status,)
+        rows = self._conn().execute(query + " ORDER BY created_at DESC LIMIT ?", params + (limit,)).fetchall()
+        return [{"job_id": job_id, "status": status, "worker": worker, "run_id": run_id, "attempts": attempts, "niche": json.loads(job).get("niche"),
+                 "error": error, "created_at": created_at} for job_id, status, worker, run_id, attempts, job, error, created_at in rows]
+
+    def counts(self) -> dict:
+        return dict(self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    # --- Workers ---
+    def claim(self, worker: str):
+        """Atomically takes the oldest highest-priority queued job. Returns (job_id, PipelineJob) or None."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT job_id, job FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created_at LIMIT 1").fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                             (worker, now, now, row[0]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK"); raise
+        if row is None: return None
+        from core.pipeline import PipelineJob
+        known = {f.name for f in fields(PipelineJob)}
+        return row[0], PipelineJob(**{k: v for k, v in json.loads(row[1]).items() if k in known})
+
+    def heartbeat(self, job_ids: list) -> list:
+        """Refreshes heartbeats; returns the job ids whose cancellation was requested."""
+        if not job_ids: return []
+        marks = ",".join("?" * len(job_ids))
+        conn = self._conn()
+        conn.execute(f"UPDATE jobs SET heartbeat_at = ? WHERE job_id IN ({marks})", (time.time(), *job_ids))
+        return [row[0] for row in conn.execute(f"SELECT job_id FROM jobs WHERE job_id IN ({marks}) AND cancel_requested = 1", job_ids)]
+
+    def add_event(self, job_id: str, event):
+        if event.kind == "token":
+            self._conn().execute("UPDATE jobs SET partial = ? WHERE job_id = ?", ((event.data or {}).get("text", ""), job_id)); return
+        data = json.dumps(event.data, default=str) if event.data else None
+        self._conn().execute("INSERT INTO events (job_id, step, kind, message, data, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                             (job_id, event.step, event.kind, event.message, data, time.time()))
+
+    def set_run_id(self, job_id: str, run_id: str):
+        self._conn().execute("UPDATE jobs SET run_id = ? WHERE job_id = ?", (run_id, job_id))
+
+    def finish(self, job_id: str, status: str, result: dict = None, error: str = None):
+        self._conn().execute("UPDATE jobs SET status = ?, result = ?, error = ?, partial = NULL, finished_at = ? WHERE job_id = ?",
+                             (status, json.dumps(result, default=str) if result is not None else None, error, time.time(), job_id))
+
+    def requeue_stale(self, timeout: float = 60, max_attempts: int = 3) -> int:
+        """Puts running jobs whose worker stopped heartbeating back in the queue (the run store resumes them); fails them after max_attempts."""
+        conn = self._conn(); cutoff = time.time() - timeout
+        conn.execute("UPDATE jobs SET status = 'failed', error = 'Worker lost too many times.', finished_at = ? WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                     (time.time(), cutoff, max_attempts))
+        return conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?", (cutoff,)).rowcount
+
+    def gc(self, older_than_days: float = 7) -> int:
+        conn = self._conn(); cutoff = time.time() - older_than_days * 86400
+        conn.execute("DELETE FROM events WHERE job_id IN (SELECT job_id FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND finished_at < ?)", (cutoff,))
+        return conn.execute("DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND finished_at < ?", (cutoff,)).rowcount
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Process-wide JobQueue at MINDFLOW_QUEUE_PATH."""
+    global _queue
+    with _queue_lock:
+        if _queue is None: _queue = JobQueue(get_settings().queue_path)
+        return _queue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.job_queue", description="Enqueue and inspect pipeline jobs for core.worker.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enqueue = sub.add_parser("enqueue", help="Queue every job in a JSONL / CSV file.")
+    enqueue.add_argument("jobs"); enqueue.add_argument("--priority", type=int, default=0)
+    listing = sub.add_parser("list", help="Most recent jobs.")
+    listing.add_argument("--status", choices=STATUSES); listing.add_argument("--limit", type=int, default=20)
+    cancel = sub.add_parser("cancel", help="Cancel a queued or running job.")
+    cancel.add_argument("job_id")
+    gc = sub.add_parser("gc", help="Delete finished jobs and their events.")
+    gc.add_argument("--older-than-days", type=float, default=7)
+    args = parser.parse_args(argv)
+
+    queue = get_job_queue()
+    if args.command == "enqueue":
+        from core.batch import load_jobs
+        ids = [queue.enqueue(job, args.priority) for job in load_jobs(args.jobs)]
+        print(f"Queued {len(ids)} job(s). Start workers with: python -m core.worker")
+    elif args.command == "list":
+        print(", ".join(f"{status}: {count}" for status, count in sorted(queue.counts().items())) or "Queue is empty.")
+        for job in queue.list(args.status, args.limit):
+            print(f"{job['job_id']}  {job['status']:<10} {job['worker'] or '-':<14} run {job['run_id'] or '-':<12} {job['niche']}" + (f"  ({job['error'][:60]})" if job["error"] else ""))
+    elif args.command == "cancel":
+        print("Cancelled." if queue.cancel(args.job_id) else "Job is not queued or running.")
+    else:
+        print(f"Removed {queue.gc(args.older_than_days)} job(s).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# core/llm_cache.py
+"""
+Persistent LLM response cache shared by all Streamlit workers / processes.
+
+Usage as a CLI:
+    python -m core.llm_cache stats
+    python -m core.llm_cache inspect --namespace research --limit 10
+    python -m core.llm_cache purge [--namespace writer] [--expired]
+"""
+import argparse
+import hashlib
+import json
+from datetime import datetime
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from core import telemetry
+from core.config import get_settings
+from core.sqlite_kv import SQLiteKVStore
+
+# One namespace per agent role, plus "default" for the global langchain cache
+AGENT_NAMESPACES = ("idea", "filter", "research", "writer", "boss")
+DEFAULT_NAMESPACE = "default"
+
+_store = None
+
+
+def get_cache_store() -> SQLiteKVStore:
+    """Returns the process-wide cache store configured from MINDFLOW_CACHE_* settings."""
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = SQLiteKVStore(path=settings.cache_path, table="llm_cache", ttl_seconds=settings.cache_ttl, max_entries=settings.cache_max_entries)
+    return _store
+
+
+class PersistentLLMCache(BaseCache):
+    """LangChain cache backed by SQLiteKVStore, scoped to a single namespace."""
+
+    def __init__(self, store: SQLiteKVStore, namespace: str = DEFAULT_NAMESPACE):
+        self.store = store
+        self.namespace = namespace
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str):
+        value = self.store.get(self.namespace, self._key(prompt, llm_string))
+        telemetry.record_cache(value is not None)
+        if value is None: return None
+        try:
+            return [loads(item) for item in json.loads(value)]
+        except Exception as e:
+            print(f"LLM cache entry unreadable ({self.namespace}): {e}"); return None
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        self.store.set(self.namespace, self._key(prompt, llm_string), json.dumps([dumps(gen) for gen in return_val]))
+
+    def clear(self, **kwargs) -> None:
+        self.store.purge(self.namespace)
+
+
+def get_llm_cache(namespace: str = DEFAULT_NAMESPACE) -> PersistentLLMCache:
+    """Returns a cache view for one agent namespace (idea, filter, research, writer, boss)."""
+    return PersistentLLMCache(get_cache_store(), namespace)
+
+
+# --- CLI ---
+def _format_ts(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.llm_cache", description="Inspect or purge the MindFlow LLM cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show entries and hit/miss counters per namespace.")
+    inspect_p = sub.add_parser("inspect", help="List most recently used entries.")
+    inspect_p.add_argument("--namespace"); inspect_p.add_argument("--limit", type=int, default=20)
+    purge_p = sub.add_parser("purge", help="Delete cached entries.")
+    purge_p.add_argument("--namespace"); purge_p.add_argument("--expired", action="store_true", help="Only drop expired / over-capacity entries.")
+    purge_p.add_argument("--reset-stats", action="store_true", help="Also reset hit/miss counters.")
+    args = parser.parse_args(argv)
+
+    store = get_cache_store()
+    print(f"Cache file: {store.path}")
+    if args.command == "stats":
+        stats = store.stats()
+        if not stats: print("Cache is empty."); return
+        print(f"{'namespace':<12}{'entries':>9}{'bytes':>12}{'hits':>8}{'misses':>8}{'evicted':>9}{'hit rate':>10}")
+        for namespace, s in sorted(stats.items()):
+            print(f"{namespace:<12}{s['entries']:>9}{s['bytes']:>12}{s['hits']:>8}{s['misses']:>8}{s['evictions']:>9}{s['hit_rate']:>10.1%}")
+    elif args.command == "inspect":
+        for namespace, key, created_at, accessed_at, size in store.entries(args.namespace, args.limit):
+            print(f"[{namespace}] {key[:16]}…  created {_format_ts(created_at)}  used {_format_ts(accessed_at)}  {size} bytes")
+    elif args.command == "purge":
+        if args.expired: removed = store.evict()
+        else: removed = store.purge(args.namespace)
+        if args.reset_stats: store.reset_stats(args.namespace)
+        print(f"Removed {removed} entries.")
+
+if __name__ == "__main__":
+    main()
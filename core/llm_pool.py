@@ -0,0 +1,254 @@
+# core/llm_pool.py
+"""
+Process-wide LLM client registry shared by all agents.
+
+- One pooled set of HTTP connections (httpx) for every ChatOpenAI instance.
+- One global token-bucket limiter on requests/minute and estimated tokens/minute.
+- Per-agent priority shares: when the budget is exhausted, callers queue and are served
+  in weighted-fair order instead of failing with RateLimitError.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_openai import ChatOpenAI
+
+from core import telemetry
+from core.config import get_settings
+from core.llm_cache import get_llm_cache
+
+# Relative priority when roles compete for the shared budget (higher = larger share)
+DEFAULT_SHARES = {"writer": 3, "research": 3, "boss": 2, "filter": 1, "idea": 1}
+# Starting per-request token estimates; refined from actual usage as responses arrive
+DEFAULT_TOKEN_ESTIMATES = {"idea": 1500, "filter": 1200, "research": 2500, "writer": 3500, "boss": 3000}
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to `capacity`, refills continuously at `rate` per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity) # Oversized requests wait for a full bucket, not forever
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self.level -= amount
+
+
+class SharedRateLimiter:
+    """Global RPM/TPM limiter with weighted-fair queueing between agent roles (thread- and asyncio-safe)."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, shares: dict = None):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.shares = dict(DEFAULT_SHARES, **(shares or {}))
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._queues = defaultdict(deque) # role -> waiting tickets (FIFO)
+        self._virtual = defaultdict(float) # role -> weighted tokens served (lower goes first)
+        self._estimates = dict(DEFAULT_TOKEN_ESTIMATES)
+        self._seq = itertools.count()
+        self.stats = defaultdict(lambda: {"granted": 0, "queued": 0, "wait_seconds": 0.0, "tokens": 0})
+
+    def estimate(self, role: str) -> int:
+        return int(self._estimates.get(role, 1000))
+
+    # --- Queueing internals ---
+    def _enqueue(self, role: str, tokens: int) -> tuple:
+        ticket = (next(self._seq), role, tokens)
+        with self._lock:
+            if not self._queues[role]: # A role returning from idle must not bank credit while it was away
+                active = [self._virtual[r] for r, q in self._queues.items() if q]
+                if active: self._virtual[role] = max(self._virtual[role], min(active))
+            self._queues[role].append(ticket)
+        return ticket
+
+    def _dequeue(self, ticket: tuple):
+        with self._lock:
+            queue = self._queues[ticket[1]]
+            if ticket in queue: queue.remove(ticket); self._cond.notify_all()
+
+    def _try_grant(self, ticket: tuple) -> float:
+        """Grants the ticket if it is next in line and the budget allows. Returns 0 when granted, else seconds to wait."""
+        _, role, tokens = ticket
+        with self._lock:
+            waiting = [r for r, q in self._queues.items() if q]
+            next_role = min(waiting, key=lambda r: (self._virtual[r], self._queues[r][0][0]))
+            if next_role != role or self._queues[role][0] is not ticket: return 0.05 # Not our turn yet
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0: return wait
+            self.requests.consume(1); self.tokens.consume(tokens)
+            self._queues[role].popleft()
+            self._virtual[role] += tokens / max(self.shares.get(role, 1), 0.1)
+            self.stats[role]["granted"] += 1; self.stats[role]["tokens"] += tokens
+            self._cond.notify_all()
+            return 0.0
+
+    # --- Public API ---
+    def acquire(self, role: str, tokens: int = None, blocking: bool = True) -> bool:
+        """Blocks until `role` may send one request of ~`tokens` tokens. Non-blocking calls return False instead of waiting."""
+        tokens = tokens or self.estimate(role)
+        ticket = self._enqueue(role, tokens); start = time.monotonic()
+        try:
+            while True:
+                wait = self._try_grant(ticket)
+                if wait == 0.0: break
+                if not blocking: return False
+                with self._cond: self._cond.wait(timeout=min(wait, 0.25))
+        finally:
+            self._dequeue(ticket)
+        self._record_wait(role, time.monotonic() - start)
+        return True
+
+    async def aacquire(self, role: str, tokens: int = None, blocking: bool = True) -> bool:
+        """Async variant of acquire(); waits with asyncio.sleep so the event loop keeps running."""
+        tokens = tokens or self.estimate(role)
+        ticket = self._enqueue(role, tokens); start = time.monotonic()
+        try:
+            while True:
+                wait = self._try_grant(ticket)
+                if wait == 0.0: break
+                if not blocking: return False
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            self._dequeue(ticket)
+        self._record_wait(role, time.monotonic() - start)
+        return True
+
+    def _record_wait(self, role: str, waited: float):
+        with self._lock:
+            self.stats[role]["wait_seconds"] += waited
+            if waited > 0.01: self.stats[role]["queued"] += 1
+
+    def record_usage(self, role: str, actual_tokens: int):
+        """Settles the difference between the estimate charged and real usage, and refines the role's estimate."""
+        with self._lock:
+            estimated = self.estimate(role)
+            self.tokens.consume(actual_tokens - estimated) # May go negative: future callers wait off the debt
+            self._estimates[role] = 0.8 * estimated + 0.2 * actual_tokens
+            self.stats[role]["tokens"] += actual_tokens - estimated
+
+
+class AgentRateLimiter(BaseRateLimiter):
+    """LangChain rate limiter view of the shared limiter for a single agent role."""
+
+    def __init__(self, limiter: SharedRateLimiter, role: str):
+        self.limiter = limiter
+        self.role = role
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.limiter.acquire(self.role, blocking=blocking)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return await self.limiter.aacquire(self.role, blocking=blocking)
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Feeds real token usage back into the shared limiter (and the current telemetry span) after each completion."""
+
+    def __init__(self, limiter: SharedRateLimiter, role: str):
+        self.limiter = limiter
+        self.role = role
+
+    def on_llm_end(self, response, **kwargs):
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or {}
+        if usage.get("total_tokens"): self.limiter.record_usage(self.role, int(usage["total_tokens"]))
+        telemetry.record_usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), llm_output.get("model_name"), role=self.role)
+
+
+# --- Registry ---
+_registry_lock = threading.Lock()
+_llms = {}
+_crew_llms = {}
+_limiter = None
+_http_client = None
+_http_async_client = None
+
+
+def _parse_shares(raw: str) -> dict:
+    """Parses 'writer=3,boss=2' into {'writer': 3.0, 'boss': 2.0}."""
+    shares = {}
+    for part in (raw or "").split(","):
+        if "=" in part:
+            role, value = part.split("=", 1)
+            try: shares[role.strip()] = float(value)
+            except ValueError: print(f"Ignoring invalid share '{part}'")
+    return shares
+
+def get_rate_limiter() -> SharedRateLimiter:
+    global _limiter
+    with _registry_lock:
+        if _limiter is None:
+            settings = get_settings()
+            _limiter = SharedRateLimiter(settings.rpm, settings.tpm, shares=_parse_shares(settings.agent_shares))
+        return _limiter
+
+def _http_clients():
+    """One pooled connection set (sync + async) reused by every agent's client."""
+    global _http_client, _http_async_client
+    with _registry_lock:
+        if _http_client is None:
+            settings = get_settings()
+            limits = httpx.Limits(max_connections=settings.max_connections, max_keepalive_connections=settings.max_connections)
+            timeout = httpx.Timeout(settings.http_timeout, connect=10.0)
+            _http_client = httpx.Client(limits=limits, timeout=timeout)
+            _http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        return _http_client, _http_async_client
+
+def get_llm(role: str, model: str = None) -> ChatOpenAI:
+    """Returns the shared ChatOpenAI client for an agent role (idea, filter, research, writer, boss), built on first use.
+    Model, temperature and max tokens come from the role's route (core/routing.py); `model` selects a cascade tier."""
+    from core.routing import get_route, tier_route
+    route = tier_route(role, model) if model else get_route(role)
+    key = (role, route.model)
+    with _registry_lock:
+        if key in _llms: return _llms[key]
+    settings = get_settings()
+    limiter = get_rate_limiter()
+    http_client, http_async_client = _http_clients()
+    llm = ChatOpenAI(
+        model_name=route.model,
+        openai_api_key=settings.require_api_key(),
+        base_url=settings.openai_base_url,
+        temperature=route.temperature,
+        max_tokens=route.max_tokens,
+        max_retries=0, # Retries are owned by core/retry_policy.py (classification, Retry-After, breaker)
+        http_client=http_client,
+        http_async_client=http_async_client,
+        rate_limiter=AgentRateLimiter(limiter, role), # Queue on the shared budget instead of failing
+        cache=get_llm_cache(role), # Persistent cache, namespaced per agent
+        callbacks=[UsageCallback(limiter, role)],
+    )
+    with _registry_lock:
+        return _llms.setdefault(key, llm)
+
+def get_crew_llm(role: str):
+    """Returns the shared crewai LLM for an agent role: a BaseLLM adapter over get_llm(role).
+    crewai rebuilds any model that is not a crewai LLM through litellm, which would skip the limiter, cache and pool."""
+    from core.crew_llm import PooledCrewLLM
+    from core.routing import get_route
+    route = get_route(role)
+    key = (role, route.model)
+    with _registry_lock:
+        if key in _crew_llms: return _crew_llms[key]
+    llm = PooledCrewLLM(role=role, model=route.model, temperature=route.temperature, max_tokens=route.max_tokens)
+    with _registry_lock:
+        return _crew_llms.setdefault(key, llm)
@@ -0,0 +1,841 @@
+# core/pipeline.py
+"""
+Importable idea → filter → research → write → validate engine.
+
+The steps are coroutines built on Crew.kickoff_async, so a whole job runs end to end in one
+event loop and many jobs can be in flight at once. Progress is pushed to callers through
+`on_event` callbacks. Steps operate on any attribute-style state object, so the same code
+drives both `st.session_state` in app.py and the plain `PipelineState` used by headless runs.
+With `job.formats` set, ideas, filtering and research run once and write → validate fans out into
+one branch per format (content type / tone / length), all in parallel; see fan_out.
+"""
+import asyncio
+import itertools
+import time
+import traceback
+from dataclasses import dataclass, field, asdict, replace
+
+from agents.idea_agent import create_idea_agent, idea_generation_task
+from agents.filter_agent import create_filter_agent, filter_ideas_task
+from agents.research_agent import create_research_agent, research_task
+from agents.writer_agent import create_writer_agent, writing_task, revision_task, section_revision_task
+from agents.boss_agent import create_boss_agent, validation_task, section_validation_task
+from core import draft_checks
+from core import draft_sections
+from core import prompt_budget
+from core import routing
+from core import telemetry
+from core.retry_policy import adaptive_retry, step_budget
+from core.research_context import ResearchContext
+from vectorstore.research_memory import get_research_memory
+
+# --- Job / State / Event definitions ---
+CONTENT_TYPES = ["Blog", "Social", "Newsletter", "Product"]
+AUDIENCES = ["Beginners", "Advanced", "Experts"]
+TONES = ["Professional", "Humorous", "Casual"]
+LENGTHS = ["Short", "Medium", "Long"]
+REVISION_MODES = ["full", "patch"]
+FORMAT_FIELDS = {"content_type": CONTENT_TYPES, "content_tone": TONES, "content_length": LENGTHS} # Job fields a fan-out format may set
+
+def _names(value) -> list:
+    """A list of choices from a list or a comma-separated string (JSONL or CSV)."""
+    if isinstance(value, str): return [item.strip() for item in value.split(",") if item.strip()]
+    return list(value or [])
+
+def _formats(value) -> list:
+    """Explicit fan-out formats: a list of dicts as given, or content types ("Blog,Newsletter" / ["Blog", "Newsletter"])."""
+    if isinstance(value, str) or (isinstance(value, list) and all(isinstance(item, str) for item in value)): return format_variants(_names(value))
+    return value
+
+def format_choices(formats: list) -> tuple:
+    """Inverse of format_variants: the distinct (content types, tones, lengths) used by a job's formats."""
+    return tuple(list(dict.fromkeys(f[name] for f in formats or [] if f.get(name))) for name in FORMAT_FIELDS)
+
+def format_variants(content_types=(), tones=(), lengths=()) -> list:
+    """Fan-out formats for every combination of the selected content types, tones and lengths; an empty selection keeps
+    the job's own value. Fewer than two combinations means no fan-out ([])."""
+    choices = [[(name, value) for value in values] for name, values in zip(FORMAT_FIELDS, (content_types, tones, lengths)) if values]
+    variants = [dict(combo) for combo in itertools.product(*choices)] if choices else []
+    return variants if len(variants) > 1 else []
+
+@dataclass
+class PipelineJob:
+    """Inputs for one pipeline run (mirrors the sidebar controls in app.py)."""
+    niche: str
+    keywords: list
+    content_type: str = "Blog"
+    target_audience: str = "Beginners"
+    content_tone: str = "Professional"
+    content_length: str = "Medium"
+    max_revisions: int = 5
+    speculative_research: int = 0 # Research the top-N filtered ideas in parallel as soon as filtering finishes (0 = off)
+    research_concurrency: int = 3 # Cap on concurrent speculative research calls
+    idea_fallback: bool = False # Switch to the next filtered idea instead of auto-approving at max_revisions
+    research_token_budget: int = 1500 # Max research tokens sent to each validation / revision prompt
+    stream_draft: bool = False # Stream writer / revision tokens to on_event as "token" events
+    revision_mode: str = "full" # "full" regenerates the draft; "patch" rewrites only the sections the boss flagged
+    prerank_top_k: int = 5 # Distinct ideas (after embedding dedup / ranking, core/idea_rank.py) sent to the filter agent; 0 = no pre-ranking
+    fast_filter: bool = False # Use the embedding ranking as the filter result and skip the filter agent
+    precheck: bool = True # Run the local checks in core/draft_checks.py first; clear failures skip the boss call
+    draft_candidates: int = 1 # Tournament size: sample this many first drafts in one call and keep the best-scoring one (1 = off; not streamed)
+    formats: list = field(default_factory=list) # Fan-out: [{"content_type", "content_tone", "content_length"}, ...] written in parallel from one research pass; missing keys keep the job's value
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PipelineJob":
+        """Builds a job from a JSONL/CSV record. Accepts short aliases (audience, tone, length) and comma-separated keywords."""
+        keywords = data.get("keywords") or []
+        if isinstance(keywords, str): keywords = [kw.strip() for kw in keywords.split(",") if kw.strip()]
+        job = cls(
+            niche=str(data.get("niche", "")).strip(),
+            keywords=list(keywords),
+            content_type=data.get("content_type") or "Blog",
+            target_audience=data.get("target_audience") or data.get("audience") or "Beginners",
+            content_tone=data.get("content_tone") or data.get("tone") or "Professional",
+            content_length=data.get("content_length") or data.get("length") or "Medium",
+            max_revisions=int(data.get("max_revisions") or 5),
+            speculative_research=int(data.get("speculative_research") or 0),
+            research_concurrency=int(data.get("research_concurrency") or 3),
+            idea_fallback=str(data.get("idea_fallback", "")).lower() in ("1", "true", "yes"),
+            research_token_budget=int(data.get("research_token_budget") or 1500),
+            stream_draft=str(data.get("stream_draft", "")).lower() in ("1", "true", "yes"),
+            revision_mode=data.get("revision_mode") or "full",
+            prerank_top_k=int(data.get("prerank_top_k") if data.get("prerank_top_k") not in (None, "") else 5),
+            fast_filter=str(data.get("fast_filter", "")).lower() in ("1", "true", "yes"),
+            precheck=str(data.get("precheck", "true")).lower() not in ("0", "false", "no"),
+            draft_candidates=int(data.get("draft_candidates") or 1),
+            formats=_formats(data.get("formats")) or format_variants(_names(data.get("content_types")), _names(data.get("tones")), _names(data.get("lengths"))),
+        )
+        job.validate()
+        return job
+
+    def validate(self):
+        if not self.niche: raise ValueError("Job is missing 'niche'.")
+        if not self.keywords: raise ValueError("Job is missing 'keywords'.")
+        for value, allowed, name in [(self.content_type, CONTENT_TYPES, "content_type"), (self.target_audience, AUDIENCES, "audience"), (self.content_tone, TONES, "tone"), (self.content_length, LENGTHS, "length")]:
+            if value not in allowed: raise ValueError(f"Invalid {name} '{value}'. Expected one of {allowed}.")
+        if self.revision_mode not in REVISION_MODES: raise ValueError(f"Invalid revision_mode '{self.revision_mode}'. Expected one of {REVISION_MODES}.")
+        if self.draft_candidates < 1: raise ValueError(f"Invalid draft_candidates {self.draft_candidates}. Expected 1 or more.")
+        if not isinstance(self.formats, list) or not all(isinstance(fmt, dict) for fmt in self.formats):
+            raise ValueError(f"Invalid formats {self.formats!r}. Expected a list of {{field: value}} objects over {list(FORMAT_FIELDS)}.")
+        for fmt in self.formats:
+            for name, value in fmt.items():
+                if name not in FORMAT_FIELDS: raise ValueError(f"Invalid format field '{name}'. Expected one of {list(FORMAT_FIELDS)}.")
+                if value not in FORMAT_FIELDS[name]: raise ValueError(f"Invalid {name} '{value}' in formats. Expected one of {FORMAT_FIELDS[name]}.")
+
+    def variant(self, fmt: dict) -> "PipelineJob":
+        """This job in one fan-out format, as a single-format job."""
+        return replace(self, formats=[], **fmt)
+
+    def format_label(self) -> str:
+        return f"{self.content_type} · {self.content_tone} · {self.content_length}"
+
+@dataclass
+class PipelineState:
+    """Intermediate results of a run. Field names match the session_state keys in app.py."""
+    ideas: list = None
+    filtered_data: dict = None
+    top_ideas: list = None
+    research_content: str = None
+    research_context: ResearchContext = None # Chunked, deduplicated view of research_content
+    draft_text: str = None
+    changed_sections: list = None # Patch mode: section numbers rewritten by the last revision (validation focuses on them)
+    validation_result: dict = None
+    pipeline_step: str = "not_started"
+    revision_count: int = 0
+    needs_more_research: bool = False
+    boss_feedback: str = ""
+    draft_approved: bool = False
+    research_cache: dict = field(default_factory=dict)
+    idea_index: int = 0 # Index of the selected idea within filtered_data["Idea"]
+    speculative_tasks: dict = field(default_factory=dict, repr=False) # idea -> in-flight research task
+    run_id: str = None # Telemetry run id, assigned on the first run_pipeline_async call
+    ttft: dict = field(default_factory=dict) # streamed step ("write_draft", "revision_1", ...) -> seconds to first token
+    cancel_requested: bool = False # Set (e.g. from another task) to abort a streaming draft
+    precheck_stats: dict = field(default_factory=dict) # {"rejected": n, "passed": n}; each rejection is a boss call saved
+    parse_stats: dict = field(default_factory=dict) # role -> {"ok", "salvaged", "repaired", "failed"} structured-output counts
+    outputs: dict = field(default_factory=dict) # Fan-out: format label -> {"status", "draft", "approved", "revisions", "validation", "error"}
+    error: str = None
+
+@dataclass
+class PipelineEvent:
+    """Progress notification emitted by the engine. kind: start | progress | token | warning | complete | error.
+
+    "token" events carry streamed draft text: message is the new text since the last event,
+    data["text"] the whole draft so far (data["done"] is set on the last one)."""
+    step: str
+    kind: str
+    message: str
+    data: dict = None
+
+class PipelineError(Exception):
+    """Raised when a step cannot produce usable output."""
+    def __init__(self, step: str, message: str):
+        super().__init__(message)
+        self.step = step
+
+def _emit(on_event, step, kind, message, data=None):
+    print(f"[{step}] {message}")
+    if on_event: on_event(PipelineEvent(step, kind, message, data))
+
+# --- Wrapper function for Crew Kickoff with Retry ---
+# Transient errors are retried per core/retry_policy.py with asyncio.sleep, so backoff never blocks the loop.
+# Not cancellable: kickoff_async runs the crew in a worker thread that would keep spending tokens after a timeout.
+@adaptive_retry(cancellable=False)
+async def kickoff_with_retry(crew):
+    """ Executes crew.kickoff_async() with retry logic for specified API errors. """
+    task_description = crew.tasks[0].description[:100] if crew.tasks else "Unknown Task"
+    print(f"Attempting kickoff for task: {task_description}...")
+    result = await crew.kickoff_async()
+    print(f"Kickoff successful for task: {task_description}.")
+    return result
+
+async def run_agent_task(agent, task, role: str):
+    """Runs a single-agent, single-task crew with retries, inside an LLM telemetry span named after the agent role."""
+    from crewai import Crew, Process
+    crew = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
+    with telemetry.span(role, kind="llm", role=role) as span, routing.route_span(role):
+        result = await kickoff_with_retry(crew)
+        usage = getattr(result, "token_usage", None) # Crew-level totals if the LLM callbacks reported nothing
+        if usage is not None and not span.prompt_tokens and not span.completion_tokens:
+            telemetry.record_usage(getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0), role=role)
+    return result
+
+# --- Token streaming (writer / revision) ---
+STREAM_EMIT_INTERVAL = 0.1 # Min seconds between "token" events, so UIs redraw at most ~10x per second
+
+class StreamCancelled(PipelineError):
+    """Raised when state.cancel_requested is set while a draft is streaming."""
+
+def agent_messages(agent, task) -> list:
+    """The single-agent crew prompt as chat messages. Only valid for tool-less agents such as the writer."""
+    system = f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"
+    return [("system", system), ("human", f"{task.description}\n\nThis is the expected criteria for your final answer: {task.expected_output}")]
+
+def budgeted_task(task_type: str, role: str, agent, build, step: str, on_event=None, **sections):
+    """build(**sections) → Task, with the prompt counted and fitted to the role's budget (core/prompt_budget.py) before any call.
+    Raises PromptTooLarge when even the trimmed prompt cannot fit."""
+    def render(fitted):
+        task = build(**fitted)
+        return task, "\n".join(text for _, text in agent_messages(agent, task))
+    task, report = prompt_budget.fit(task_type, role, render, sections)
+    if report["truncated"]:
+        trimmed = ", ".join(f"{name} {before}→{after}" for name, (before, after) in report["truncated"].items())
+        _emit(on_event, step, "warning", f"Trimmed the {task_type} prompt to fit the budget ({trimmed} tokens).", {"prompt_tokens": report["tokens"]})
+    return task
+
+async def stream_agent_task(role: str, agent, task, stream_key: str, state, on_event=None, step: str = None) -> str:
+    """Streams a tool-less agent task straight from the shared chat model and returns the assembled text.
+    Emits throttled "token" events and records time-to-first-token in state.ttft[stream_key]. A retry restarts the stream."""
+    with telemetry.span(role, kind="llm", role=role, streamed=True) as span, routing.route_span(role):
+        text = await _stream_with_retry(role, agent, task, stream_key, state, on_event, step or stream_key)
+        span.attrs["ttft"] = state.ttft.get(stream_key)
+    return text
+
+@adaptive_retry
+async def _stream_with_retry(role: str, agent, task, stream_key: str, state, on_event, step: str) -> str:
+    from core.llm_pool import get_llm
+    start = time.perf_counter(); parts = []; emitted = 0; last_emit = 0.0
+    async for chunk in get_llm(role).astream(agent_messages(agent, task), stream_usage=True):
+        if getattr(state, "cancel_requested", False): raise StreamCancelled(step, "Draft cancelled while streaming.")
+        usage = getattr(chunk, "usage_metadata", None) # Final chunk only
+        if usage: telemetry.record_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0), role=role)
+        delta = chunk.content if isinstance(chunk.content, str) else ""
+        if not delta: continue
+        now = time.perf_counter()
+        if not parts:
+            state.ttft[stream_key] = round(now - start, 3)
+            _emit(on_event, step, "progress", f"First token after {state.ttft[stream_key]:.2f}s.", {"ttft": state.ttft[stream_key]})
+        parts.append(delta)
+        if on_event and now - last_emit >= STREAM_EMIT_INTERVAL:
+            text = "".join(parts); on_event(PipelineEvent(step, "token", text[emitted:], {"text": text})); emitted = len(text); last_emit = now
+    text = "".join(parts)
+    if on_event: on_event(PipelineEvent(step, "token", text[emitted:], {"text": text, "done": True}))
+    return text
+
+# --- Draft tournament (writer) ---
+@adaptive_retry
+async def _sample_drafts(role: str, messages, count: int) -> list:
+    from core.llm_pool import get_llm
+    result = await get_llm(role).agenerate([messages], n=count)
+    return [generation.text for generation in result.generations[0]]
+
+async def draft_tournament(job: PipelineJob, agent, task, step: str, on_event=None) -> str:
+    """Samples job.draft_candidates drafts in one n-sampled call (one prompt charge) and returns the one with the best
+    local score (draft_checks.score_draft), so only the winner enters the revision loop."""
+    with telemetry.span("writer", kind="llm", role="writer", candidates=job.draft_candidates), routing.route_span("writer"):
+        drafts = await _sample_drafts("writer", agent_messages(agent, task), job.draft_candidates)
+    drafts = list(dict.fromkeys(draft for draft in drafts if draft.strip())) # Identical samples score the same
+    if not drafts: return ""
+    with telemetry.span("tournament", kind="check", candidates=len(drafts)) as span:
+        scored = [draft_checks.score_draft(draft, job.content_type, job.target_audience, job.content_length, job.keywords) for draft in drafts]
+        winner = max(range(len(drafts)), key=lambda i: scored[i][0])
+        span.attrs.update(scores=[score for score, _ in scored], winner=winner)
+    telemetry.increment("mindflow_draft_candidates_total", len(drafts))
+    _emit(on_event, step, "progress", f"Picked draft {winner + 1} of {len(drafts)} (score {scored[winner][0]:.2f}, {len(scored[winner][1])} local issue(s)).",
+          {"scores": [score for score, _ in scored], "winner": winner})
+    return drafts[winner]
+
+# --- Structured output (filter / boss) ---
+STRUCTURED_REPAIR_ATTEMPTS = 2
+PARSE_OUTCOMES = ("ok", "salvaged", "repaired", "failed") # salvaged = valid JSON found locally, no extra call
+
+def _message_text(message) -> str:
+    """Tool-call arguments (or plain content) of a structured-output reply, for local salvage and repair."""
+    tool_calls = (getattr(message, "additional_kwargs", None) or {}).get("tool_calls") or []
+    if tool_calls: return tool_calls[0].get("function", {}).get("arguments") or ""
+    return str(getattr(message, "content", "") or "")
+
+@adaptive_retry
+async def _structured_call(role: str, schema, messages, model: str = None):
+    from core.llm_pool import get_llm
+    return await get_llm(role, model).with_structured_output(schema, method="function_calling", include_raw=True).ainvoke(messages)
+
+async def repair_structured_output(role: str, schema, raw_text: str, error: str, context: str = "", model: str = None):
+    """Asks the model to restate a malformed reply in the schema. Only this small call is retried, not the step."""
+    for attempt in range(1, STRUCTURED_REPAIR_ATTEMPTS + 1):
+        messages = [("system", f"You repair malformed outputs into valid {schema.__name__} objects. Keep the original meaning; do not invent new content."),
+                    ("human", f"The following output failed validation ({error}).\n{context}\n--- OUTPUT START ---\n{raw_text[:4000]}\n--- OUTPUT END ---\nRestate it as a {schema.__name__}.")]
+        with routing.route_span(role, model, repair=True): result = await _structured_call(role, schema, messages, model)
+        if result.get("parsed") is not None: return result["parsed"]
+        error = str(result.get("parsing_error") or "invalid output")[:300]; raw_text = _message_text(result.get("raw")) or raw_text
+        print(f"Repair attempt {attempt} for {schema.__name__} failed: {error}")
+    return None
+
+def record_parse_outcome(state, role: str, outcome: str):
+    stats = state.parse_stats.setdefault(role, dict.fromkeys(PARSE_OUTCOMES, 0))
+    stats[outcome] += 1
+    telemetry.increment("mindflow_structured_output_total", role=role, outcome=outcome)
+
+async def structured_agent_task(role: str, agent, task, schema, state, step: str, on_event=None, repair_context: str = ""):
+    """Runs a tool-less agent task as a function call with `schema` and returns the validated object, or None.
+    With a cascade route (core/routing.py) a reply that fails the schema or has low confidence is re-asked on the
+    larger model. Malformed output of the last tier is salvaged locally, then repaired with a short dedicated call;
+    outcomes go to state.parse_stats."""
+    from core.schemas import parse_model
+    route = routing.get_route(role); tiers = route.tiers()
+    with telemetry.span(role, kind="llm", role=role, schema=schema.__name__) as span:
+        for tier, model in enumerate(tiers):
+            with routing.route_span(role, model, tier=tier) as tier_span:
+                result = await _structured_call(role, schema, agent_messages(agent, task), model)
+                parsed = result.get("parsed"); outcome = "ok"
+                if parsed is None:
+                    raw_text = _message_text(result.get("raw"))
+                    parsed = parse_model(schema, raw_text); outcome = "salvaged"
+                score = routing.confidence(parsed) if parsed is not None else None
+                tier_span.attrs.update(parse=outcome if parsed is not None else "invalid", confidence=score)
+            if tier == len(tiers) - 1 or (parsed is not None and score >= route.min_confidence): break
+            reason = "schema" if parsed is None else "confidence"
+            telemetry.increment("mindflow_route_escalations_total", role=role, reason=reason)
+            _emit(on_event, step, "progress", f"{schema.__name__} from {model} " + ("failed the schema" if parsed is None else f"has low confidence ({score:.2f})") + f"; escalating to {tiers[tier + 1]}.")
+        span.attrs.update(model=model, tiers_used=tier + 1)
+        if parsed is None:
+            error = str(result.get("parsing_error") or "no structured output")[:300]
+            _emit(on_event, step, "warning", f"{schema.__name__} output invalid ({error}). Repairing output only.")
+            parsed = await repair_structured_output(role, schema, raw_text, error, repair_context, model)
+            outcome = "repaired" if parsed is not None else "failed"
+        span.attrs["parse"] = outcome
+    record_parse_outcome(state, role, outcome)
+    return parsed
+
+# --- Output parsing helpers ---
+def parse_ideas(ideas_output) -> list:
+    """Turns the idea agent's output into a list of idea strings."""
+    ideas_output = getattr(ideas_output, 'raw', ideas_output)
+    ideas_list = []
+    if isinstance(ideas_output, str):
+        for line in (line.strip() for line in ideas_output.split('\n')):
+            if line:
+                if line.startswith('"') and line.endswith('"'): line = line[1:-1]
+                elif line.startswith("'") and line.endswith("'"): line = line[1:-1]
+                ideas_list.append(line)
+    elif isinstance(ideas_output, list): ideas_list = [str(item).strip().strip('"\'') for item in ideas_output]
+    elif ideas_output is not None: ideas_list = [str(ideas_output).strip().strip('"\'')]
+    return ideas_list
+
+def fallback_filter_data(ideas):
+    """Creates fallback filter data when JSON parsing or filtering fails."""
+    print("Executing fallback_filter_data.")
+    if isinstance(ideas, list) and ideas:
+        print(f"Using first idea as fallback: {ideas[0]}")
+        return { "Idea": [ideas[0]], "Score": [0.5], "Reasoning": ["Fallback: Filter agent output issue."] }
+    elif isinstance(ideas, str) and ideas.strip():
+        ideas_list = [idea.strip() for idea in ideas.split("\n") if idea.strip()]
+        if ideas_list:
+            print(f"Using first parsed idea as fallback: {ideas_list[0]}")
+            return { "Idea": [ideas_list[0]], "Score": [0.5], "Reasoning": ["Fallback: Filter agent output issue."] }
+    print("Fallback: No valid ideas provided."); return { "Idea": ["Default Fallback Idea"], "Score": [0.1], "Reasoning": ["Fallback: Critical error."] }
+
+def fallback_validation_result(revision_count: int, on_event=None) -> dict:
+    """Verdict used when the boss output could not be parsed or repaired."""
+    validation_result = {"approved": False, "issues": [{"instructions": "System could not parse validation feedback."}]}
+    if revision_count >= 2: _emit(on_event, "revision_loop", "warning", "Multiple validation parse failures. Auto-approving."); validation_result["approved"] = True
+    return validation_result
+
+def needs_more_research(feedback_instructions: str) -> bool:
+    feedback = feedback_instructions.lower()
+    return "depth" in feedback or "information" in feedback or "research" in feedback
+
+# --- Pipeline steps ---
+async def generate_ideas(job: PipelineJob, state, on_event=None):
+    _emit(on_event, "ideas", "progress", "Searching for Medium trends...")
+    agent = create_idea_agent()
+    task = budgeted_task("idea", "idea", agent, lambda: idea_generation_task(agent, job.niche, job.content_type, job.target_audience, job.content_tone, job.keywords), "ideas", on_event)
+    state.ideas = parse_ideas(await run_agent_task(agent, task, "idea"))
+    if not state.ideas: raise PipelineError("ideas", "Idea generation failed.")
+    state.pipeline_step = "filter_ideas"
+    _emit(on_event, "ideas", "complete", f"Generated {len(state.ideas)} ideas.")
+
+async def prerank_ideas(job: PipelineJob, state, on_event=None):
+    """Embedding dedup + relevance ranking of state.ideas (core/idea_rank.py). Returns an IdeaRanking, or None if embeddings are unavailable."""
+    if not job.prerank_top_k and not job.fast_filter: return None
+    from core.config import get_settings
+    from core.idea_rank import rank_ideas
+    with telemetry.span("prerank", kind="check") as span:
+        try: ranking = await asyncio.to_thread(rank_ideas, state.ideas, job.niche, job.keywords, job.prerank_top_k, get_settings().idea_dedup_threshold)
+        except Exception as e:
+            _emit(on_event, "filter_ideas", "warning", f"Idea pre-ranking unavailable ({type(e).__name__}: {e}). Sending all ideas to the filter."); return None
+        span.attrs.update(ideas=ranking.total, duplicates=len(ranking.duplicates), kept=len(ranking.ideas))
+    _emit(on_event, "filter_ideas", "progress", f"Pre-ranked {ranking.total} ideas: {len(ranking.duplicates)} near-duplicate(s) merged, top {len(ranking.ideas)} kept.",
+          {"duplicates": ranking.duplicates})
+    return ranking
+
+async def filter_ideas(job: PipelineJob, state, on_event=None):
+    if not state.ideas: raise PipelineError("filter_ideas", "Cannot filter, no ideas.")
+    _emit(on_event, "filter_ideas", "progress", "Evaluating relevance and feasibility...")
+    ranking = await prerank_ideas(job, state, on_event)
+    candidates = ranking.ideas if ranking is not None and ranking.ideas else state.ideas
+    if job.fast_filter and ranking is not None and ranking.ideas:
+        filtered_data = ranking.filter_result(job.niche) # Fast mode: no filter LLM call
+        _emit(on_event, "filter_ideas", "progress", "Fast mode: using the embedding ranking as the filter result.")
+    else:
+        agent = create_filter_agent()
+        task = budgeted_task("filter", "filter", agent, lambda: filter_ideas_task(agent, candidates, job.niche, job.target_audience, job.keywords), "filter_ideas", on_event)
+        from core.schemas import FilterResult
+        ideas_context = "Idea texts must be copied exactly from this list:\n" + "\n".join(f"- {idea}" for idea in candidates)
+        parsed = await structured_agent_task("filter", agent, task, FilterResult, state, "filter_ideas", on_event, repair_context=ideas_context)
+        if parsed is not None: filtered_data = parsed.model_dump()
+        else:
+            _emit(on_event, "filter_ideas", "warning", "Filter output could not be repaired. Using fallback.")
+            filtered_data = ranking.filter_result(job.niche) if ranking is not None and ranking.ideas else fallback_filter_data(candidates)
+    if not filtered_data or not filtered_data.get("Idea"): raise PipelineError("filter_ideas", "Filtering resulted in no ideas.")
+    state.filtered_data = filtered_data; state.top_ideas = [filtered_data["Idea"][0]]; state.idea_index = 0
+    state.pipeline_step = "research"
+    _emit(on_event, "filter_ideas", "complete", f"Selected top {len(filtered_data['Idea'])} ideas.")
+    if job.speculative_research > 0: start_speculative_research(job, state, on_event)
+
+def start_speculative_research(job: PipelineJob, state, on_event=None):
+    """Fans out research for the top-N filtered ideas as background tasks, capped at job.research_concurrency."""
+    ideas = (state.filtered_data or {}).get("Idea", [])[:job.speculative_research]
+    tasks = getattr(state, "speculative_tasks", None) or {}
+    semaphore = asyncio.Semaphore(max(1, job.research_concurrency))
+
+    async def research_one(idea):
+        async with semaphore:
+            with round_budget(): summary = await research_idea(idea, on_event) # Own deadline, not the filter step's
+        if summary: state.research_cache[idea] = summary
+
+    for idea in ideas:
+        if idea in state.research_cache or idea in tasks: continue
+        tasks[idea] = asyncio.create_task(research_one(idea))
+    state.speculative_tasks = tasks
+    if tasks: _emit(on_event, "research", "progress", f"Speculatively researching {len(tasks)} ideas (max {job.research_concurrency} at once)...")
+
+async def await_speculative_research(state, idea: str = None, on_event=None):
+    """Waits for one idea's speculative research (or all of it when idea is None). Failures are reported, not raised."""
+    tasks = getattr(state, "speculative_tasks", None) or {}
+    pending = {i: t for i, t in tasks.items() if idea is None or i == idea}
+    if not pending: return
+    results = await asyncio.gather(*pending.values(), return_exceptions=True)
+    for pending_idea, result in zip(pending, results):
+        if isinstance(result, Exception): _emit(on_event, "research", "warning", f"Speculative research failed for '{pending_idea[:40]}': {type(result).__name__}")
+    if idea is None: state.speculative_tasks = {} # Tasks are bound to this event loop; never keep them across runs
+
+SPECULATIVE_DRAIN_TIMEOUT = 5.0 # Seconds a finished run waits for leftover speculative research before cancelling it
+
+async def drain_speculative_research(state, timeout: float = SPECULATIVE_DRAIN_TIMEOUT, on_event=None):
+    """End of run: waits up to `timeout` seconds (0 = not at all) for speculative research still in flight and cancels the
+    rest. Whatever finished stays in research_cache."""
+    tasks = getattr(state, "speculative_tasks", None) or {}
+    state.speculative_tasks = {} # Tasks are bound to this event loop; never keep them across runs
+    pending = [task for task in tasks.values() if not task.done()]
+    if pending and timeout > 0: await asyncio.wait(pending, timeout=timeout)
+    cancelled = [task for task in tasks.values() if not task.done()]
+    for task in cancelled: task.cancel()
+    await asyncio.gather(*cancelled, return_exceptions=True)
+    for idea, task in tasks.items():
+        if task in cancelled or task.cancelled(): continue
+        if task.exception() is not None: _emit(on_event, "research", "warning", f"Speculative research failed for '{idea[:40]}': {type(task.exception()).__name__}")
+    if cancelled: _emit(on_event, "research", "progress", f"Cancelled speculative research for {len(cancelled)} idea(s) still running.")
+
+def switch_idea(state, index: int, on_event=None) -> bool:
+    """Makes filtered idea `index` the selected one, reusing its cached research. Returns False if no such idea exists."""
+    ideas = (state.filtered_data or {}).get("Idea", [])
+    if index < 0 or index >= len(ideas): return False
+    idea = ideas[index]
+    state.idea_index = index; state.top_ideas = [idea]
+    state.draft_text = None; state.changed_sections = None; state.validation_result = None; state.revision_count = 0; state.draft_approved = False
+    state.boss_feedback = ""; state.needs_more_research = False; state.error = None; state.cancel_requested = False; state.outputs = {}
+    state.research_content = state.research_cache.get(idea); state.research_context = None
+    state.pipeline_step = "write_draft" if state.research_content else "research"
+    _emit(on_event, "research", "progress", f"Switched to idea #{index + 1}: {idea[:60]} ({'research cached' if state.research_content else 'needs research'}).")
+    return True
+
+async def remember_research(idea: str, research_text: str, on_event=None):
+    """Writes research back to the Chroma research memory (best effort)."""
+    memory = await asyncio.to_thread(get_research_memory)
+    if memory is None: return
+    try: await asyncio.to_thread(memory.store, idea, research_text)
+    except Exception as e: _emit(on_event, "research", "warning", f"Could not store research in memory: {type(e).__name__}")
+
+async def research_idea(idea: str, on_event=None) -> str:
+    """Researches one idea, reusing (or only topping up) stored research for semantically similar ideas."""
+    memory = await asyncio.to_thread(get_research_memory)
+    match = None
+    if memory is not None:
+        try: match = await asyncio.to_thread(memory.lookup, idea)
+        except Exception as e: _emit(on_event, "research", "warning", f"Research memory lookup failed: {type(e).__name__}")
+    if match and match["action"] == "reuse":
+        _emit(on_event, "research", "progress", f"Reusing stored research for a similar idea (similarity {match['similarity']:.2f}).", {"memory": "reuse"})
+        return match["research"]
+    existing = None
+    if match: # Close but not identical: only ask for what is missing
+        existing = ResearchContext.from_text(match["research"]).select(idea, 600)
+        _emit(on_event, "research", "progress", f"Topping up stored research from a related idea (similarity {match['similarity']:.2f}).", {"memory": "topup"})
+    agent = create_research_agent()
+    with telemetry.bind(step="research", idea=idea[:80]): # Speculative tasks inherit the filter step otherwise
+        task = budgeted_task("research", "research", agent, lambda research: research_task(agent, idea, existing_research=research or None), "research", on_event, research=existing)
+        summary = await run_agent_task(agent, task, "research")
+    if not summary: return None
+    research_text = f"{match['research']}\n\n{summary}" if match else str(summary)
+    await remember_research(idea, research_text, on_event)
+    return research_text
+
+async def research(job: PipelineJob, state, on_event=None):
+    if not state.top_ideas: raise PipelineError("research", "Cannot research, no top idea.")
+    top_idea = state.top_ideas[0]
+    if top_idea not in state.research_cache and top_idea in (getattr(state, "speculative_tasks", None) or {}):
+        _emit(on_event, "research", "progress", "Waiting for speculative research on the selected idea...")
+        await await_speculative_research(state, top_idea, on_event)
+    if top_idea in state.research_cache:
+        set_research(state, state.research_cache[top_idea])
+        state.pipeline_step = "write_draft"
+        _emit(on_event, "research", "complete", "Research loaded from cache.", {"cached": True}); return
+    _emit(on_event, "research", "progress", f"Researching topic: {top_idea[:60]}...")
+    research_summary = await research_idea(top_idea, on_event)
+    if not research_summary: raise PipelineError("research", "Research returned no content.")
+    state.research_cache[top_idea] = research_summary; set_research(state, research_summary)
+    state.pipeline_step = "write_draft"
+    _emit(on_event, "research", "complete", "Research complete.", {"cached": False})
+
+async def write_draft(job: PipelineJob, state, on_event=None):
+    if not state.research_content or not state.top_ideas: raise PipelineError("write_draft", "Cannot write draft, missing inputs.")
+    _emit(on_event, "write_draft", "progress", "Crafting the initial version...")
+    agent = create_writer_agent()
+    task = budgeted_task("write", "writer", agent, lambda research: writing_task(agent, state.top_ideas[0], research, job.content_type, job.target_audience, job.content_tone, job.content_length,
+                         keywords=job.keywords, word_range=draft_checks.length_target(job.content_type, job.content_length)), "write_draft", on_event, research=state.research_content)
+    if job.draft_candidates > 1: draft = await draft_tournament(job, agent, task, "write_draft", on_event)
+    elif job.stream_draft: draft = await stream_agent_task("writer", agent, task, "write_draft", state, on_event)
+    else: draft = await run_agent_task(agent, task, "writer")
+    if not draft: raise PipelineError("write_draft", "Writer returned an empty draft.")
+    state.draft_text = str(draft); state.changed_sections = None
+    state.pipeline_step = "revision_loop"; state.validation_result = {"approved": False, "issues": [{"instructions": "Initial draft requires review."}]}; state.revision_count = 0; state.draft_approved = False # Setup for loop
+    _emit(on_event, "write_draft", "complete", "Initial draft complete.")
+
+def set_research(state, text: str):
+    """Replaces the research with `text`, chunked and deduplicated."""
+    state.research_context = ResearchContext.from_text(text)
+    state.research_content = state.research_context.full_text()
+
+def ensure_research_context(state) -> ResearchContext:
+    context = getattr(state, "research_context", None)
+    if context is None: # e.g. research restored from an older session
+        context = state.research_context = ResearchContext.from_text(state.research_content or "")
+    return context
+
+def research_for_prompt(job: PipelineJob, state) -> str:
+    """Only the research most relevant to the idea and current feedback, within job.research_token_budget."""
+    context = ensure_research_context(state)
+    query = f"{state.top_ideas[0] if state.top_ideas else ''} {state.boss_feedback or ''}"
+    return context.select(query, job.research_token_budget)
+
+def check_max_revisions(job: PipelineJob, state, on_event=None) -> bool:
+    """Auto-approves the draft once max_revisions is reached. Returns True if it did."""
+    if state.revision_count < job.max_revisions: return False
+    state.draft_approved = True; state.pipeline_step = "completed"
+    state.validation_result = {"approved": True, "issues": [{"instructions": f"Max revisions reached. Auto-approved."}]}
+    _emit(on_event, "revision_loop", "warning", "Max revisions reached.")
+    return True
+
+def precheck_draft(job: PipelineJob, state, on_event=None) -> dict:
+    """Local length / keyword / structure / readability checks. Returns a rejecting verdict on clear failures, else None."""
+    with telemetry.span("precheck", kind="check") as span:
+        issues = draft_checks.check_draft(state.draft_text, job.content_type, job.target_audience, job.content_length, job.keywords)
+        span.attrs["issues"] = [issue["check"] for issue in issues]
+    outcome = "rejected" if issues else "passed"
+    state.precheck_stats[outcome] = state.precheck_stats.get(outcome, 0) + 1
+    telemetry.increment("mindflow_precheck_total", outcome=outcome)
+    if not issues: return None
+    _emit(on_event, "revision_loop", "progress", f"Local checks failed ({', '.join(sorted({issue['check'] for issue in issues}))}). Revising without boss review.", {"approved": False, "precheck": True})
+    return {"approved": False, "issues": issues, "source": "precheck"}
+
+async def validate_draft(job: PipelineJob, state, on_event=None) -> dict:
+    """Runs the local pre-checks, then the boss agent on drafts that pass them. Marks the run completed when approved."""
+    _emit(on_event, "revision_loop", "progress", "Checking quality standards...")
+    if job.precheck:
+        rejection = precheck_draft(job, state, on_event)
+        if rejection is not None: state.validation_result = rejection; return rejection
+    reviewed = (state.validation_result or {}).get("source") != "precheck" # The boss has not seen the draft yet after a pre-check rejection
+    agent = create_boss_agent()
+    if job.revision_mode == "patch":
+        focus = set(state.changed_sections) if getattr(state, "changed_sections", None) and reviewed else None
+        numbered = draft_sections.number_sections(draft_sections.split_sections(state.draft_text), only=focus, preview_chars=120)
+        task = budgeted_task("validate_sections", "boss", agent, lambda draft, research, feedback: section_validation_task(agent, draft, research, job.content_tone, job.content_length, feedback or None),
+                             "revision_loop", on_event, draft=numbered, research=research_for_prompt(job, state), feedback=state.boss_feedback if focus else None)
+    else:
+        task = budgeted_task("validate", "boss", agent, lambda draft, research: validation_task(agent, draft, research, job.content_tone, job.content_length),
+                             "revision_loop", on_event, draft=state.draft_text, research=research_for_prompt(job, state))
+    from core.schemas import ValidationResult
+    parsed = await structured_agent_task("boss", agent, task, ValidationResult, state, "revision_loop", on_event)
+    validation_result = parsed.model_dump() if parsed is not None else fallback_validation_result(state.revision_count, on_event)
+    state.validation_result = validation_result
+    if validation_result.get("approved", False):
+        state.draft_approved = True; state.pipeline_step = "completed"
+        _emit(on_event, "revision_loop", "complete", f"Draft approved after {state.revision_count} revisions.", {"approved": True})
+    else:
+        _emit(on_event, "revision_loop", "progress", f"Revisions needed (Rev {state.revision_count}).", {"approved": False})
+    return validation_result
+
+def prepare_revision(state) -> str:
+    """Bumps the revision counter and turns the latest validation issues into feedback text."""
+    state.revision_count += 1
+    issues = state.validation_result.get("issues", [{"instructions": "Improve clarity."}]) if state.validation_result else [{"instructions": "Validation failed."}]
+    feedback_instructions = " ".join([issue.get("instructions", "") for issue in issues if isinstance(issue, dict)])
+    state.boss_feedback = feedback_instructions
+    state.needs_more_research = needs_more_research(feedback_instructions)
+    print(f"Feedback for Rev {state.revision_count}: {feedback_instructions}")
+    return feedback_instructions
+
+async def additional_research(job: PipelineJob, state, on_event=None):
+    """Researches the top idea again, focused on the boss feedback, and appends it to research_content."""
+    if not state.top_ideas: raise PipelineError("revision_loop", "Cannot research, top idea missing.")
+    top_idea = state.top_ideas[0]; cache_key = f"{top_idea}_additional_rev{state.revision_count}"
+    ensure_research_context(state)
+    if cache_key in state.research_cache:
+        state.research_context.add(str(state.research_cache[cache_key]), f"Rev {state.revision_count}, cached")
+        state.research_content = state.research_context.full_text()
+        _emit(on_event, "revision_loop", "progress", "Additional research loaded from cache.", {"cached": True})
+    else:
+        _emit(on_event, "revision_loop", "progress", "Looking for details based on feedback...")
+        agent = create_research_agent()
+        task = budgeted_task("research", "research", agent, lambda feedback: research_task(agent, top_idea, additional_context=f"Address feedback: {feedback}"),
+                             "revision_loop", on_event, feedback=state.boss_feedback)
+        additional = await run_agent_task(agent, task, "research")
+        if additional:
+            additional_str = str(additional); state.research_cache[cache_key] = additional_str
+            kept = state.research_context.add(additional_str, f"Rev {state.revision_count}")
+            state.research_content = state.research_context.full_text()
+            await remember_research(top_idea, state.research_content, on_event)
+            _emit(on_event, "revision_loop", "progress", f"Additional research complete ({kept} new chunks, {state.research_context.duplicates_dropped} duplicates dropped so far).", {"cached": False})
+    state.needs_more_research = False
+
+async def revise_sections(job: PipelineJob, state, on_event=None) -> bool:
+    """Patch mode: rewrites only the sections the boss flagged and applies the edits to the stored draft.
+    Returns False (caller falls back to a full revision) if no issue names a section or no usable edits come back."""
+    sections = draft_sections.split_sections(state.draft_text)
+    by_section = draft_sections.issue_sections((state.validation_result or {}).get("issues"), len(sections))
+    targets = sorted(number for number in by_section if number)
+    if not targets: return False
+    feedback = "\n".join(f"[S{number}] " + " ".join(by_section[number]) for number in targets)
+    if by_section.get(0): feedback += "\nWhole draft (apply within the sections above): " + " ".join(by_section[0])
+    _emit(on_event, "revision_loop", "progress", f"Rewriting section(s) {', '.join(map(str, targets))} of {len(sections)}...")
+    agent = create_writer_agent()
+    task = budgeted_task("revise_sections", "writer", agent, lambda draft, feedback, research: section_revision_task(
+                             agent, draft, draft_sections.outline(sections), feedback, job.content_type, job.target_audience, job.content_tone, research),
+                         "revision_loop", on_event, draft=draft_sections.number_sections(sections, only=set(targets)), feedback=feedback, research=research_for_prompt(job, state))
+    crew_output = await run_agent_task(agent, task, "writer")
+    edits = draft_sections.parse_section_edits(getattr(crew_output, 'raw', str(crew_output)))
+    edits = {number: text for number, text in edits.items() if number in targets}
+    if not edits:
+        _emit(on_event, "revision_loop", "warning", "Writer returned no usable section edits. Revising the full draft."); return False
+    state.draft_text = draft_sections.apply_section_edits(sections, edits)
+    state.changed_sections = draft_sections.changed_sections(sections, draft_sections.split_sections(state.draft_text))
+    _emit(on_event, "revision_loop", "progress", f"Revision {state.revision_count} complete (patched {len(edits)} section(s)).", {"sections": sorted(edits)})
+    return True
+
+async def revise_draft(job: PipelineJob, state, on_event=None):
+    if job.revision_mode == "patch" and await revise_sections(job, state, on_event): return
+    _emit(on_event, "revision_loop", "progress", "Incorporating feedback...")
+    agent = create_writer_agent()
+    task = budgeted_task("revise", "writer", agent, lambda draft, feedback, research: revision_task(agent, draft, feedback, job.content_type, job.target_audience, job.content_tone, research),
+                         "revision_loop", on_event, draft=state.draft_text, feedback=state.boss_feedback, research=research_for_prompt(job, state))
+    if job.stream_draft: revised_draft = await stream_agent_task("writer", agent, task, f"revision_{state.revision_count}", state, on_event, step="revision_loop")
+    else: revised_draft = await run_agent_task(agent, task, "writer")
+    if revised_draft:
+        state.draft_text = str(revised_draft); state.changed_sections = None
+        _emit(on_event, "revision_loop", "progress", f"Revision {state.revision_count} complete.")
+
+async def run_revision_loop(job: PipelineJob, state, on_event=None):
+    """Validate → (research) → revise until approved or max_revisions is reached."""
+    while not state.draft_approved:
+        if job.idea_fallback and state.revision_count >= job.max_revisions and switch_idea(state, state.idea_index + 1, on_event):
+            _emit(on_event, "revision_loop", "warning", "Max revisions reached. Falling back to the next filtered idea."); return
+        if check_max_revisions(job, state, on_event): break
+        with telemetry.bind(revision=state.revision_count), round_budget(): await validate_draft(job, state, on_event)
+        if state.draft_approved: break
+        prepare_revision(state)
+        with telemetry.bind(revision=state.revision_count), round_budget():
+            if state.needs_more_research: await additional_research(job, state, on_event)
+            await revise_draft(job, state, on_event)
+        checkpoint(job, state) # A failure in the next round resumes here, at revision N
+
+# --- Multi-format fan-out ---
+def branch_state(state) -> PipelineState:
+    """Fresh state for one fan-out format: the shared idea and research, copied so each format's revisions stay separate.
+    It has no run id, so the branch is never checkpointed on its own; fan_out saves its result on the parent run."""
+    context = ensure_research_context(state)
+    return PipelineState(ideas=state.ideas, filtered_data=state.filtered_data, top_ideas=list(state.top_ideas), idea_index=state.idea_index,
+                         research_content=state.research_content, research_context=ResearchContext.from_dict(context.to_dict()),
+                         research_cache=dict(state.research_cache), pipeline_step="write_draft")
+
+async def run_branch(job: PipelineJob, state, on_event=None) -> PipelineState:
+    """write_draft → revision_loop (→ research again after an idea fallback) for one format. Errors are recorded on state.error."""
+    steps = dict(STEPS)
+    try:
+        while state.pipeline_step in steps:
+            step_name = state.pipeline_step
+            with telemetry.bind(step=step_name), telemetry.span(step_name, kind="step"), round_budget():
+                await steps[step_name](job, state, on_event)
+    except Exception as e:
+        state.error = f"{type(e).__name__}: {e}"; failed_step = getattr(e, "step", state.pipeline_step); state.pipeline_step = "failed"
+        _emit(on_event, failed_step, "warning", f"Error during {failed_step}: {state.error}")
+    return state
+
+def format_output(state) -> dict:
+    return {"status": "completed" if state.draft_approved and not state.error else "failed", "draft": state.draft_text, "approved": state.draft_approved,
+            "revisions": state.revision_count, "validation": state.validation_result, "error": state.error}
+
+def merge_stats(state, branch):
+    """Adds a branch's pre-check and structured-output counts to the parent run."""
+    for outcome, count in branch.precheck_stats.items(): state.precheck_stats[outcome] = state.precheck_stats.get(outcome, 0) + count
+    for role, outcomes in branch.parse_stats.items():
+        stats = state.parse_stats.setdefault(role, dict.fromkeys(PARSE_OUTCOMES, 0))
+        for outcome, count in outcomes.items(): stats[outcome] = stats.get(outcome, 0) + count
+
+async def fan_out(job: PipelineJob, state, on_event=None):
+    """Writes and reviews one draft per job.formats entry in parallel, all from the research already in state.
+    Results go to state.outputs; formats completed before a resume are not written again."""
+    if not state.research_content or not state.top_ideas: raise PipelineError("fan_out", "Cannot fan out, missing research.")
+    variants = {variant.format_label(): variant for variant in map(job.variant, job.formats)}
+    if not variants: raise PipelineError("fan_out", "Cannot fan out, the job has no formats.")
+    outputs = dict(state.outputs or {})
+    pending = [label for label in variants if (outputs.get(label) or {}).get("status") != "completed"]
+    _emit(on_event, "fan_out", "progress", f"Writing {len(pending)} format(s) in parallel from one research pass: {', '.join(pending)}.")
+
+    async def run_format(label: str):
+        tagged = (lambda event: on_event(PipelineEvent(event.step, event.kind, f"[{label}] {event.message}", {**(event.data or {}), "format": label}))) if on_event else None
+        with telemetry.bind(format=label):
+            branch = await run_branch(variants[label], branch_state(state), tagged)
+        outputs[label] = format_output(branch); merge_stats(state, branch)
+        state.outputs = dict(outputs); checkpoint(job, state) # A finished format survives a restart of the others
+        _emit(on_event, "fan_out", "progress", f"{label}: " + ("approved" if outputs[label]["status"] == "completed" else f"failed ({branch.error})") + f" after {branch.revision_count} revision(s).")
+
+    await asyncio.gather(*(run_format(label) for label in pending))
+    state.outputs = {label: outputs[label] for label in variants} # In the requested order
+    first = next(iter(state.outputs.values()))
+    state.draft_text = first["draft"]; state.validation_result = first["validation"]; state.changed_sections = None
+    state.revision_count = max(output["revisions"] for output in state.outputs.values())
+    failed = [label for label, output in state.outputs.items() if output["status"] != "completed"]
+    if failed: raise PipelineError("fan_out", f"{len(failed)} of {len(variants)} format(s) failed: {', '.join(failed)}.")
+    state.draft_approved = True; state.pipeline_step = "completed"
+    _emit(on_event, "fan_out", "complete", f"All {len(variants)} formats approved.")
+
+def round_budget():
+    """Retry deadline / token budget (MINDFLOW_STEP_DEADLINE, MINDFLOW_STEP_TOKEN_BUDGET) for a step or one revision round."""
+    from core.config import get_settings
+    settings = get_settings()
+    return step_budget(settings.step_deadline, settings.step_token_budget)
+
+def checkpoint(job: PipelineJob, state, status: str = "running"):
+    """Saves the run to the run store (core/run_store.py). Storage errors are logged, never raised.
+    States without a run id (fan-out branches) are skipped: they must not overwrite the parent run's row."""
+    from core.run_store import get_run_store
+    if not getattr(state, "run_id", None): return
+    try:
+        store = get_run_store()
+        if store is not None: store.save(job, state, status=status)
+    except Exception as e: print(f"Checkpoint of run {getattr(state, 'run_id', None)} failed: {e}")
+
+STEPS = [("ideas", generate_ideas), ("filter_ideas", filter_ideas), ("research", research), ("write_draft", write_draft), ("revision_loop", run_revision_loop),
+         ("fan_out", fan_out)]
+
+async def run_pipeline_async(job: PipelineJob, state: PipelineState = None, on_event=None) -> PipelineState:
+    """Runs (or continues) a full pipeline for one job in the current event loop. Errors are recorded on state.error, not raised."""
+    state = state if state is not None else PipelineState()
+    if state.pipeline_step == "not_started": state.pipeline_step = "ideas"
+    if not getattr(state, "run_id", None): state.run_id = telemetry.new_run_id()
+    steps = dict(STEPS)
+    with telemetry.bind(run_id=state.run_id), telemetry.span("pipeline", kind="run") as run_span:
+        try:
+            checkpoint(job, state)
+            while state.pipeline_step in steps: # A step may move the run backwards (e.g. idea fallback → write_draft)
+                if state.pipeline_step == "write_draft" and job.formats: state.pipeline_step = "fan_out" # Every format branches off the shared research
+                if state.pipeline_step == "fan_out" and not job.formats: state.pipeline_step = "write_draft" # Resumed without its formats: one draft
+                step_name = state.pipeline_step
+                _emit(on_event, step_name, "start", f"Starting {step_name}.")
+                with telemetry.bind(step=step_name), telemetry.span(step_name, kind="step"), round_budget():
+                    await steps[step_name](job, state, on_event)
+                checkpoint(job, state, "completed" if state.pipeline_step == "completed" else "running")
+        except Exception as e:
+            traceback.print_exc()
+            state.error = f"{type(e).__name__}: {e}"; failed_step = getattr(e, "step", state.pipeline_step)
+            state.pipeline_step = "failed"; run_span.status = "error"; run_span.error = state.error[:300]
+            _emit(on_event, failed_step, "error", f"Error during {failed_step}: {state.error}")
+            from core.run_store import get_run_store
+            try:
+                status = "cancelled" if isinstance(e, StreamCancelled) else "failed" # A user stop is never auto-resumed
+                if get_run_store() is not None: get_run_store().mark(state.run_id, status, state.error) # Resume point stays at the last checkpoint
+            except Exception as store_error: print(f"Could not mark run {state.run_id} failed: {store_error}")
+        finally:
+            # Keep finished research in research_cache, but never hold a failed or finished run for the slowest background call
+            await drain_speculative_research(state, 0 if state.pipeline_step == "failed" else SPECULATIVE_DRAIN_TIMEOUT, on_event)
+        run_span.attrs.update(approved=state.draft_approved, revisions=state.revision_count, parse_stats=state.parse_stats, precheck_stats=state.precheck_stats)
+    return state
+
+def run_pipeline(job: PipelineJob, state: PipelineState = None, on_event=None) -> PipelineState:
+    """Blocking wrapper around run_pipeline_async for callers without an event loop."""
+    return asyncio.run(run_pipeline_async(job, state, on_event))
+
+def result_record(job: PipelineJob, state: PipelineState, elapsed: float = None) -> dict:
+    """JSON-serializable summary of a finished run (used by the batch runner)."""
+    return {
+        "job": asdict(job),
+        "status": "completed" if state.draft_approved and not state.error else "failed",
+        "error": state.error,
+        "idea": state.top_ideas[0] if state.top_ideas else None,
+        "filtered": state.filtered_data,
+        "research": state.research_content,
+        "draft": state.draft_text,
+        "approved": state.draft_approved,
+        "revisions": state.revision_count,
+        "validation": state.validation_result,
+        "run_id": state.run_id,
+        "ttft": dict(state.ttft),
+        "precheck_stats": state.precheck_stats,
+        "parse_stats": state.parse_stats,
+        "outputs": state.outputs or None,
+        "elapsed_seconds": round(elapsed, 2) if elapsed is not None else None,
+    }
+
+async def run_job_async(job: PipelineJob, on_event=None, resume: bool = True) -> dict:
+    """Runs a job; with resume, an unfinished stored run with the same inputs continues from its last checkpoint."""
+    start = time.perf_counter()
+    state = None
+    if resume:
+        from core.run_store import unfinished_state
+        state = unfinished_state(job)
+        if state is not None: _emit(on_event, state.pipeline_step, "progress", f"Resuming run {state.run_id} at {state.pipeline_step}.")
+    state = await run_pipeline_async(job, state, on_event=on_event)
+    return result_record(job, state, time.perf_counter() - start)
+
+def run_job(job: PipelineJob, on_event=None) -> dict:
+    return asyncio.run(run_job_async(job, on_event))
@@ -0,0 +1,122 @@
+# core/prompt_budget.py
+"""
+Preflight token budgets for agent prompts.
+
+Every task prompt is counted with the local tokenizer (core/tokens.py) before it is sent:
+- Variable sections are capped first (MINDFLOW_PROMPT_BUDGETS, default research=3000,feedback=1200).
+- If the whole prompt plus the route's output reserve still exceeds the model's context window,
+  research and then feedback are shrunk further, keeping whole paragraphs / lines from the top
+  (research_for_prompt already orders research by relevance).
+- The draft is never cut: a prompt that cannot fit with the full draft (or a draft over its own
+  cap, if one is configured) raises PromptTooLarge before any API call, instead of a
+  context-length 400 from the provider.
+Prompt sizes go to the mindflow_prompt_tokens histogram per task type; truncations to
+mindflow_prompt_truncations_total.
+
+Usage:
+    task, report = prompt_budget.fit("validate", "boss", render, {"draft": draft, "research": research})
+    # render(sections) -> (task, prompt_text); report = {"tokens", "limit", "truncated": {section: (before, after)}}
+"""
+import re
+
+from core import telemetry
+from core.config import get_settings
+from core.tokens import count_tokens
+
+# Context windows in tokens; the longest matching prefix wins. Override with MINDFLOW_CONTEXT_WINDOW.
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-4.1": 1047576,
+    "o1": 200000,
+    "o3": 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+DEFAULT_SECTION_CAPS = {"research": 3000, "feedback": 1200}
+SHRINK_ORDER = ("research", "feedback") # Sections that may be cut to make a prompt fit, first to last
+PROMPT_OVERHEAD = 300 # Crew framing, tool schemas and chat formatting not present in the rendered text
+TRUNCATION_MARK = "\n[... truncated to fit the prompt budget ...]"
+
+
+class PromptTooLarge(Exception):
+    """A prompt that cannot fit its budget even after truncation; raised before the API call."""
+    def __init__(self, task_type: str, message: str):
+        super().__init__(f"{task_type} prompt refused: {message}")
+        self.task_type = task_type
+
+def _refuse(task_type: str, message: str):
+    telemetry.increment("mindflow_prompt_refused_total", task=task_type)
+    raise PromptTooLarge(task_type, message)
+
+
+def context_window(model: str) -> int:
+    settings = get_settings()
+    if settings.context_window: return settings.context_window
+    match = max((name for name in CONTEXT_WINDOWS if (model or "").startswith(name)), key=len, default=None)
+    return CONTEXT_WINDOWS[match] if match else DEFAULT_CONTEXT_WINDOW
+
+def prompt_limit(role: str) -> tuple:
+    """(model, input token limit) for a role: context window minus the output reserve and framing overhead."""
+    from core.routing import get_route
+    route = get_route(role)
+    window = context_window(route.model)
+    reserve = route.max_tokens or min(4096, window // 4)
+    return route.model, window - reserve - PROMPT_OVERHEAD
+
+def section_caps() -> dict:
+    """Per-section token caps from MINDFLOW_PROMPT_BUDGETS ("research=3000,feedback=1200,draft=8000")."""
+    caps = dict(DEFAULT_SECTION_CAPS)
+    for part in (get_settings().prompt_budgets or "").split(","):
+        if "=" not in part: continue
+        name, value = part.split("=", 1)
+        try: caps[name.strip()] = int(value)
+        except ValueError: print(f"Ignoring invalid prompt budget '{part}'")
+    return caps
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Keeps whole paragraphs (then lines, then sentences) from the top of `text` within max_tokens."""
+    if not text or count_tokens(text) <= max_tokens: return text
+    budget = max_tokens - count_tokens(TRUNCATION_MARK)
+    if budget <= 0: return ""
+    kept, used = [], 0
+    for piece in re.split(r"(\n\s*\n|\n)", text): # Separators are kept so the result reads as before
+        size = count_tokens(piece)
+        if used + size > budget:
+            if not kept: # First paragraph alone is too long: cut it on sentence boundaries
+                for sentence in re.split(r"(?<=[.!?])\s+", piece):
+                    size = count_tokens(sentence + " ")
+                    if used + size > budget: break
+                    kept.append(sentence + " "); used += size
+            break
+        kept.append(piece); used += size
+    return "".join(kept).rstrip() + TRUNCATION_MARK
+
+def fit(task_type: str, role: str, render, sections: dict) -> tuple:
+    """Renders the task with section caps applied, shrinks research / feedback until it fits, or raises PromptTooLarge.
+    Returns (task, report)."""
+    caps = section_caps(); model, limit = prompt_limit(role)
+    truncated = {}
+    def shrink(name: str, max_tokens: int):
+        before = truncated[name][0] if name in truncated else count_tokens(sections[name])
+        sections[name] = truncate_text(sections[name], max(0, max_tokens))
+        truncated[name] = (before, count_tokens(sections[name]))
+    sections = {name: value or "" for name, value in sections.items()}
+    for name, cap in caps.items():
+        if name not in sections or count_tokens(sections[name]) <= cap: continue
+        if name in SHRINK_ORDER: shrink(name, cap)
+        else: _refuse(task_type, f"{name} has ~{count_tokens(sections[name])} tokens, over its budget of {cap} (MINDFLOW_PROMPT_BUDGETS).")
+    task, text = render(sections); tokens = count_tokens(text)
+    for name in SHRINK_ORDER:
+        if tokens <= limit: break
+        if not sections.get(name): continue
+        shrink(name, count_tokens(sections[name]) - (tokens - limit) - 16)
+        task, text = render(sections); tokens = count_tokens(text)
+    telemetry.observe_value("mindflow_prompt_tokens", tokens, task=task_type)
+    for name in truncated: telemetry.increment("mindflow_prompt_truncations_total", task=task_type, section=name)
+    if tokens > limit:
+        _refuse(task_type, f"~{tokens} tokens even with research and feedback cut, but {model} allows {limit} after the output reserve. "
+                           "Shorten the draft or route this agent to a model with a larger context window.")
+    return task, {"tokens": tokens, "limit": limit, "truncated": truncated}
@@ -0,0 +1,131 @@
+# core/research_context.py
+"""
+Research kept as discrete, deduplicated chunks instead of one ever-growing blob.
+
+Each revision pass adds chunks; overlapping content is dropped on the way in. Prompts get a
+rolling summary plus only the chunks most relevant to the current feedback, within a token budget.
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+
+from core.tokens import count_tokens
+
+STOPWORDS = set("""a an the and or but if then of to in on for with by from at as is are was were be been being it its this that
+these those their there they them we you your our i he she his her not no can could should would will may might must
+about into over under more most less very also than such so do does did have has had just only any each other""".split())
+
+def _terms(text: str) -> list:
+    return [w for w in re.findall(r"[a-z0-9][a-z0-9\-']+", text.lower()) if w not in STOPWORDS]
+
+def _shingles(terms: list, size: int = 3) -> set:
+    if len(terms) < size: return {" ".join(terms)} if terms else set()
+    return {" ".join(terms[i:i + size]) for i in range(len(terms) - size + 1)}
+
+def _first_sentence(text: str) -> str:
+    text = re.sub(r"^[#>*\-\d.\s]+", "", text.strip())
+    match = re.match(r"(.+?[.!?])(\s|$)", text, re.DOTALL)
+    return (match.group(1) if match else text).strip()
+
+
+class ResearchContext:
+    """Deduplicated research chunks with a rolling summary and budgeted, feedback-aware selection."""
+
+    def __init__(self, summary_budget: int = 250, chunk_tokens: int = 180, similarity_threshold: float = 0.6):
+        self.summary_budget = summary_budget
+        self.chunk_tokens = chunk_tokens
+        self.similarity_threshold = similarity_threshold
+        self.chunks = [] # {"text", "source", "tokens", "hash", "shingles"}
+        self.summary = ""
+        self.duplicates_dropped = 0
+
+    @classmethod
+    def from_text(cls, text: str, source: str = "research", **kwargs) -> "ResearchContext":
+        context = cls(**kwargs)
+        context.add(text, source)
+        return context
+
+    # --- Ingest ---
+    def _split(self, text: str) -> list:
+        """Splits on blank lines, then merges short paragraphs so chunks approach chunk_tokens."""
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text or "") if p.strip()]
+        chunks, current = [], ""
+        for paragraph in paragraphs:
+            candidate = f"{current}\n{paragraph}" if current else paragraph
+            if current and count_tokens(candidate) > self.chunk_tokens: chunks.append(current); current = paragraph
+            else: current = candidate
+        if current: chunks.append(current)
+        return chunks
+
+    def _is_duplicate(self, digest: str, shingles: set) -> bool:
+        for chunk in self.chunks:
+            if chunk["hash"] == digest: return True
+            if shingles and chunk["shingles"]:
+                overlap = len(shingles & chunk["shingles"]) / min(len(shingles), len(chunk["shingles"]))
+                if overlap >= self.similarity_threshold: return True
+        return False
+
+    def add(self, text: str, source: str = "research") -> int:
+        """Adds new research, skipping chunks that repeat existing content. Returns the number of chunks kept."""
+        added = 0
+        for chunk_text in self._split(str(text or "")):
+            terms = _terms(chunk_text)
+            digest = hashlib.sha1(" ".join(terms).encode("utf-8")).hexdigest()
+            shingles = _shingles(terms)
+            if self._is_duplicate(digest, shingles): self.duplicates_dropped += 1; continue
+            self.chunks.append({"text": chunk_text, "source": source, "tokens": count_tokens(chunk_text), "hash": digest, "shingles": shingles})
+            added += 1
+        if added: self._update_summary()
+        return added
+
+    def _update_summary(self):
+        """Rolling extractive summary: lead sentence of each chunk, most term-dense first, within summary_budget."""
+        leads = [(i, _first_sentence(chunk["text"])) for i, chunk in enumerate(self.chunks)]
+        ranked = sorted(leads, key=lambda item: -len(set(_terms(item[1]))))
+        kept, used = [], 0
+        for index, sentence in ranked:
+            cost = count_tokens(sentence)
+            if sentence and used + cost <= self.summary_budget: kept.append((index, sentence)); used += cost
+        self.summary = " ".join(sentence for _, sentence in sorted(kept))
+
+    # --- Render ---
+    @property
+    def total_tokens(self) -> int:
+        return sum(chunk["tokens"] for chunk in self.chunks)
+
+    def full_text(self) -> str:
+        """All chunks in order, with a header whenever the source changes (used for display and storage)."""
+        parts, last_source = [], None
+        for chunk in self.chunks:
+            if chunk["source"] != last_source and last_source is not None: parts.append(f"Additional Research ({chunk['source']}):")
+            parts.append(chunk["text"]); last_source = chunk["source"]
+        return "\n\n".join(parts)
+
+    def select(self, query: str, budget: int) -> str:
+        """Rolling summary plus the chunks most relevant to `query` (TF-IDF overlap), kept in original order, within `budget` tokens."""
+        if self.total_tokens + count_tokens(self.summary) <= budget: return self.full_text()
+        query_terms = Counter(_terms(query or ""))
+        doc_freq = Counter(term for chunk in self.chunks for term in set(_terms(chunk["text"])))
+        n = len(self.chunks)
+        def score(chunk):
+            terms = Counter(_terms(chunk["text"]))
+            relevance = sum(math.log(1 + n / doc_freq[t]) * min(terms[t], 3) for t in query_terms if t in terms)
+            return relevance / math.sqrt(chunk["tokens"] or 1)
+        used = count_tokens(self.summary) if self.summary else 0
+        picked = []
+        for index in sorted(range(n), key=lambda i: (-score(self.chunks[i]), i)):
+            if used + self.chunks[index]["tokens"] <= budget: picked.append(index); used += self.chunks[index]["tokens"]
+        body = "\n\n".join(self.chunks[i]["text"] for i in sorted(picked))
+        return f"Summary: {self.summary}\n\nRelevant Details:\n{body}" if self.summary else body
+
+    # --- Persistence ---
+    def to_dict(self) -> dict:
+        return {"summary_budget": self.summary_budget, "chunk_tokens": self.chunk_tokens, "similarity_threshold": self.similarity_threshold,
+                "chunks": [{"text": c["text"], "source": c["source"]} for c in self.chunks]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ResearchContext":
+        context = cls(data.get("summary_budget", 250), data.get("chunk_tokens", 180), data.get("similarity_threshold", 0.6))
+        for chunk in data.get("chunks", []): context.add(chunk["text"], chunk.get("source", "research"))
+        return context
@@ -0,0 +1,262 @@
+# core/retry_policy.py
+"""
+Retry policy for LLM calls: error classification, Retry-After, jittered backoff, per-step
+deadlines and token budgets, and a process-wide circuit breaker.
+
+- Only transient failures are retried (timeouts, connection errors, 408/409/429, 5xx). A 400
+  (bad request, context window exceeded), 401 or 404 fails the call at once.
+- A server-provided Retry-After (or "try again in 20s") replaces the computed backoff;
+  otherwise the delay is full-jitter exponential: uniform(0, min(max_delay, base * 2^attempt)).
+- Inside `step_budget(...)` no retry is started that would overrun the step deadline or
+  that follows a step which has already used its token budget. Direct (async HTTP) attempts are cut off at the
+  deadline; for crew kickoffs (`cancellable=False`) the deadline is advisory: crewai runs the kickoff in a
+  worker thread that cancelling the await would not stop, so a running attempt is allowed to finish.
+- After `breaker_failures` consecutive provider failures the breaker opens: calls fail fast with
+  CircuitOpenError for `breaker_cooldown` seconds, then a single probe call decides whether it closes.
+- Seconds and tokens spent on failed attempts (and the waits between them) are added to the open
+  spans and to the mindflow_retry_wasted_* counters.
+
+Usage:
+    @adaptive_retry
+    async def call(...): ...
+
+    with step_budget(deadline=300, max_tokens=20000):
+        await call(...)
+"""
+import asyncio
+import contextvars
+import email.utils
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from core import telemetry
+from core.config import get_settings
+
+RETRYABLE_STATUS = (408, 409, 429)
+RETRY_AFTER_CAP = 120.0 # Longer server-requested waits fail the call instead of parking a pipeline
+BREAKER_COUNTED = ("timeout", "connection", "server") # Rate limits (429) are backpressure, not provider failure
+
+_budget = contextvars.ContextVar("mindflow_step_budget", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit breaker is open."""
+
+class RetryBudgetExceeded(Exception):
+    """Raised when a call runs past the step deadline."""
+
+
+# --- Error classification ---
+_transient_errors = None
+
+def transient_errors() -> tuple:
+    """Exception types without an HTTP status that are worth retrying. litellm / openai / httpx are imported on the first failure."""
+    global _transient_errors
+    if _transient_errors is None:
+        errors = (asyncio.TimeoutError, ConnectionError)
+        try:
+            from litellm.exceptions import APIConnectionError, Timeout
+            errors += (APIConnectionError, Timeout)
+        except ImportError: pass
+        try:
+            from openai import APIConnectionError as OpenAIConnectionError, APITimeoutError
+            errors += (OpenAIConnectionError, APITimeoutError)
+        except ImportError: pass
+        try:
+            import httpx
+            errors += (httpx.TransportError,)
+        except ImportError: pass
+        _transient_errors = errors
+    return _transient_errors
+
+def status_code(error) -> int:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def classify(error) -> str:
+    """One of: timeout, connection, rate_limit, server (retryable) or fatal."""
+    if isinstance(error, (CircuitOpenError, RetryBudgetExceeded)): return "fatal"
+    status = status_code(error)
+    if status is not None:
+        if status == 429: return "rate_limit"
+        if status >= 500 or status in RETRYABLE_STATUS: return "server"
+        return "fatal"
+    if isinstance(error, transient_errors()): return "timeout" if "timeout" in type(error).__name__.lower() or isinstance(error, asyncio.TimeoutError) else "connection"
+    return "fatal"
+
+def retry_after(error) -> float:
+    """Seconds the server asked us to wait (Retry-After-Ms / Retry-After headers or the error message), or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "litellm_response_headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"): return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try: return max(0.0, float(value))
+            except ValueError:
+                when = email.utils.parsedate_to_datetime(value)
+                return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError, AttributeError): pass
+    match = re.search(r"try again in (\d+(?:\.\d+)?)\s*(ms|s)\b", str(error), re.IGNORECASE)
+    if match: return float(match.group(1)) / (1000 if match.group(2).lower() == "ms" else 1)
+    return None
+
+
+# --- Circuit breaker ---
+class CircuitBreaker:
+    """closed → open after `failures` consecutive provider failures → half-open after `cooldown` → closed on a successful probe."""
+
+    def __init__(self, name: str, failures: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failures = max(1, failures)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    raise CircuitOpenError(f"Circuit '{self.name}' is open after {self.consecutive} consecutive failures; retry in {self.remaining():.0f}s.")
+                self.state = "half_open"; self._probing = False
+            if self.state == "half_open":
+                if self._probing: raise CircuitOpenError(f"Circuit '{self.name}' is half-open; a probe call is in flight.")
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed": print(f"Circuit '{self.name}' closed.")
+            self.state = "closed"; self.consecutive = 0; self._probing = False
+
+    def record_failure(self, kind: str, answered: bool = False):
+        """`answered`: the provider returned an HTTP status. A fatal answer (e.g. a 400) proves it is up and closes the
+        breaker; a fatal local error (parse error, cancellation, bug) only releases the probe and leaves the state as is."""
+        with self._lock:
+            self._probing = False
+            if kind == "fatal":
+                if answered: self.state = "closed"; self.consecutive = 0
+                return
+            if kind not in BREAKER_COUNTED:
+                if self.state == "half_open": self.state = "open"; self.opened_at = time.monotonic() # Probe did not prove recovery
+                return
+            self.consecutive += 1
+            if self.state == "half_open" or (self.state == "closed" and self.consecutive >= self.failures):
+                self.state = "open"; self.opened_at = time.monotonic()
+                print(f"Circuit '{self.name}' opened after {self.consecutive} consecutive failures (cooldown {self.cooldown:.0f}s).")
+                telemetry.increment("mindflow_circuit_open_total", breaker=self.name)
+
+    def remaining(self) -> float:
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at)) if self.state == "open" else 0.0
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str = "llm") -> CircuitBreaker:
+    """Process-wide breaker per provider, so every pipeline in the process fails fast together."""
+    with _breakers_lock:
+        if name not in _breakers:
+            settings = get_settings()
+            _breakers[name] = CircuitBreaker(name, settings.breaker_failures, settings.breaker_cooldown)
+        return _breakers[name]
+
+
+# --- Step budgets ---
+class StepBudget:
+    """Deadline (monotonic) and token allowance of one pipeline step; tokens are read from the step span."""
+
+    def __init__(self, deadline: float = None, max_tokens: int = None):
+        self.deadline = time.monotonic() + deadline if deadline else None
+        self.max_tokens = max_tokens or None
+        self.span = telemetry.current_span()
+        self.start_tokens = self.tokens_used()
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic() if self.deadline is not None else None
+
+    def tokens_used(self) -> int:
+        return self.span.prompt_tokens + self.span.completion_tokens if self.span is not None else 0
+
+    def over_tokens(self) -> bool:
+        return self.max_tokens is not None and self.tokens_used() - self.start_tokens >= self.max_tokens
+
+@contextmanager
+def step_budget(deadline: float = None, max_tokens: int = None):
+    """Deadline (seconds from now) and token budget for the retried calls inside the block. Open it inside the step span."""
+    token = _budget.set(StepBudget(deadline, max_tokens))
+    try: yield _budget.get()
+    finally: _budget.reset(token)
+
+
+# --- Retry loop ---
+def _span_tokens() -> int:
+    current = telemetry.current_span()
+    return current.prompt_tokens + current.completion_tokens if current is not None else 0
+
+def backoff(attempt: int, base: float, max_delay: float) -> float:
+    """Full jitter: uniform(0, min(max_delay, base * 2^attempt)) for attempt = 0, 1, ..."""
+    return random.uniform(0, min(max_delay, base * 2 ** attempt))
+
+def _give_up(role: str, reason: str):
+    telemetry.increment("mindflow_retry_giveups_total", role=role, reason=reason)
+
+def adaptive_retry(func=None, *, breaker: str = "llm", cancellable: bool = True):
+    """Decorator for async LLM calls: retries transient errors under the policy above. A retry restarts the call from scratch.
+    cancellable=False for calls that keep running in a thread when cancelled: the deadline then only gates new attempts."""
+    if func is None: return lambda f: adaptive_retry(f, breaker=breaker, cancellable=cancellable)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        settings = get_settings()
+        circuit = get_breaker(breaker)
+        budget = _budget.get()
+        current = telemetry.current_span()
+        role = (current.attrs.get("role") or current.name) if current is not None else func.__name__
+        attempt = 0
+        while True:
+            try: circuit.before_call()
+            except CircuitOpenError: _give_up(role, "circuit_open"); raise
+            remaining = budget.remaining() if budget is not None else None
+            if remaining is not None and remaining <= 0: _give_up(role, "deadline"); raise RetryBudgetExceeded(f"Step deadline passed before the {role} call.")
+            started, tokens_before = time.monotonic(), _span_tokens()
+            try:
+                result = await (asyncio.wait_for(func(*args, **kwargs), remaining) if remaining is not None and cancellable else func(*args, **kwargs))
+                circuit.record_success()
+                return result
+            except asyncio.CancelledError:
+                circuit.record_failure("fatal"); raise # Releases a half-open probe; says nothing about the provider
+            except Exception as e:
+                error, kind = e, classify(e)
+                if isinstance(e, asyncio.TimeoutError) and remaining is not None and time.monotonic() - started >= remaining:
+                    error, kind = RetryBudgetExceeded(f"{role} call exceeded the step deadline."), "deadline"
+                    error.__cause__ = e
+            circuit.record_failure("timeout" if kind == "deadline" else kind, answered=status_code(error) is not None)
+            record_waste(role, time.monotonic() - started, max(0, _span_tokens() - tokens_before))
+            attempt += 1
+            if kind in ("fatal", "deadline"): _give_up(role, kind); raise error
+            if attempt >= settings.retry_max_attempts: _give_up(role, "attempts"); raise error
+            if circuit.state == "open": _give_up(role, "circuit_open"); raise error # This failure tripped the breaker: stop now
+            if budget is not None and budget.over_tokens(): _give_up(role, "tokens"); raise error
+            server_wait = retry_after(error)
+            if server_wait is not None and server_wait > RETRY_AFTER_CAP: _give_up(role, "retry_after"); raise error
+            if server_wait is not None: delay = server_wait + random.uniform(0, 0.1 * server_wait + 0.05) # Jitter so waiters do not return in lockstep
+            else: delay = backoff(attempt - 1, settings.retry_base_delay, settings.retry_max_delay)
+            remaining = budget.remaining() if budget is not None else None
+            if remaining is not None and delay >= remaining: _give_up(role, "deadline"); raise error
+            print(f"[{role}] {kind} error ({type(error).__name__}: {str(error)[:120]}); retry {attempt}/{settings.retry_max_attempts - 1} in {delay:.1f}s")
+            telemetry.record_retry()
+            record_waste(role, delay, 0) # Time parked in backoff is lost too
+            await asyncio.sleep(delay)
+    return wrapper
+
+def record_waste(role: str, seconds: float, tokens: int):
+    """Adds a failed attempt (or a backoff wait) to the open spans and the wasted-work counters."""
+    telemetry.record_waste(seconds, tokens)
+    telemetry.increment("mindflow_retry_wasted_seconds_total", seconds, role=role)
+    if tokens: telemetry.increment("mindflow_retry_wasted_tokens_total", tokens, role=role)
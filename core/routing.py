@@ -0,0 +1,115 @@
+# core/routing.py
+"""
+Per-agent model routes: model, temperature and max tokens for each role, plus optional cheap-first
+cascades for the structured (filter / boss) calls.
+
+Routes default to OPENAI_MODEL_NAME with role-appropriate sampling (deterministic JSON for filter and
+boss, more varied ideas). Override any field with MINDFLOW_ROUTES, inline JSON or a path to a JSON file:
+
+    MINDFLOW_ROUTES='{"filter": {"model": "gpt-4o-mini", "escalate_to": "gpt-4o"},
+                      "boss": {"model": "gpt-4o-mini", "escalate_to": "gpt-4o", "min_confidence": 0.6},
+                      "writer": {"model": "gpt-4o", "max_tokens": 2500}}'
+
+A cascade sends the structured call to `model` first and re-asks `escalate_to` only when the reply
+fails the schema (after local salvage) or its confidence is below `min_confidence`. Every LLM call
+runs in a "route" span named role:model, so `python -m core.telemetry summary` shows latency and cost
+per route.
+
+    python -m core.routing          # effective routes
+"""
+import argparse
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, fields, replace
+from functools import lru_cache
+
+from core import telemetry
+from core.config import get_settings
+
+# Role defaults; model None = OPENAI_MODEL_NAME
+DEFAULT_ROUTES = {
+    "idea": {"temperature": 0.9},
+    "filter": {"temperature": 0.0, "max_tokens": 800},
+    "research": {"temperature": 0.3},
+    "writer": {"temperature": 0.7},
+    "boss": {"temperature": 0.0, "max_tokens": 1000},
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    role: str
+    model: str
+    temperature: float = 0.7
+    max_tokens: int = None # None = provider default
+    escalate_to: str = None # Larger model for the second cascade tier (structured calls only)
+    min_confidence: float = 0.5
+
+    def tiers(self) -> list:
+        return [self.model] + ([self.escalate_to] if self.escalate_to and self.escalate_to != self.model else [])
+
+
+def _load_overrides(raw: str) -> dict:
+    if not raw: return {}
+    try:
+        if os.path.isfile(raw):
+            with open(raw, encoding="utf-8") as f: return json.load(f)
+        return json.loads(raw)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ignoring invalid MINDFLOW_ROUTES ({e})"); return {}
+
+@lru_cache(maxsize=1)
+def get_routes() -> dict:
+    """role -> Route, from DEFAULT_ROUTES and MINDFLOW_ROUTES."""
+    settings = get_settings()
+    overrides = _load_overrides(settings.routes)
+    known = {f.name for f in fields(Route)} - {"role"}
+    routes = {}
+    for role in set(DEFAULT_ROUTES) | set(overrides):
+        values = {"model": settings.model_name, **DEFAULT_ROUTES.get(role, {})}
+        for key, value in (overrides.get(role) or {}).items():
+            if key in known: values[key] = value
+            else: print(f"Ignoring unknown route field '{role}.{key}'")
+        routes[role] = Route(role=role, **values)
+    return routes
+
+def get_route(role: str) -> Route:
+    route = get_routes().get(role)
+    return route if route is not None else Route(role=role, model=get_settings().model_name)
+
+def tier_route(role: str, model: str) -> Route:
+    """The role's route with `model` swapped in (the escalation tier keeps the role's sampling settings)."""
+    return replace(get_route(role), model=model, escalate_to=None)
+
+@contextmanager
+def route_span(role: str, model: str = None, **attrs):
+    """Span (kind "route", name role:model) around one call on a route; priced at the route's model unless usage reports another."""
+    model = model or get_route(role).model
+    with telemetry.span(f"{role}:{model}", kind="route", role=role, **attrs) as span:
+        span.model = model
+        yield span
+
+
+def confidence(parsed) -> float:
+    """0.0-1.0 trust in a structured reply: the model's own estimate, capped by consistency checks."""
+    from core.schemas import FilterResult, ValidationResult
+    score = parsed.confidence if getattr(parsed, "confidence", None) is not None else 1.0
+    if isinstance(parsed, FilterResult):
+        if not parsed.Idea: return 0.0
+        if len(parsed.Score) > 1 and max(parsed.Score) - min(parsed.Score) < 0.05: score = min(score, 0.4) # Ranking does not discriminate
+    elif isinstance(parsed, ValidationResult):
+        if not parsed.approved and not parsed.issues: return 0.0 # Rejection without anything to fix
+        if parsed.approved and parsed.issues: score = min(score, 0.5)
+    return score
+
+
+def main(argv=None):
+    argparse.ArgumentParser(prog="python -m core.routing", description="Show the effective per-agent model routes.").parse_args(argv)
+    print(f"{'role':<10}{'model':<24}{'temp':>6}{'max tok':>9}  cascade")
+    for role, route in sorted(get_routes().items()):
+        cascade = f"→ {route.escalate_to} (min confidence {route.min_confidence})" if len(route.tiers()) > 1 else "-"
+        print(f"{role:<10}{route.model:<24}{route.temperature:>6}{route.max_tokens or '-':>9}  {cascade}")
+
+if __name__ == "__main__":
+    main()
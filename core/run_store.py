@@ -0,0 +1,202 @@
+# core/run_store.py
+"""
+Durable checkpoints of pipeline runs, keyed by run id and job input hash.
+
+The engine saves the run state after every completed step and after every revision round, so
+a browser refresh, a worker restart or an error costs at most the step in progress: resuming a
+run that failed during revision N starts again at revision N, without redoing ideas, filtering
+or research.
+
+    python -m core.run_store list                     # most recent runs, newest first
+    python -m core.run_store resume 3f2a9c...         # continue a failed / interrupted run
+    python -m core.run_store gc --older-than-days 7   # drop finished runs older than a week
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, fields
+
+from core.config import get_settings
+
+# PipelineState fields worth persisting (in-flight tasks and UI flags are not)
+STATE_FIELDS = ["ideas", "filtered_data", "top_ideas", "research_content", "research_context", "draft_text", "changed_sections",
+                "validation_result", "pipeline_step", "revision_count", "needs_more_research", "boss_feedback", "draft_approved",
+                "research_cache", "idea_index", "run_id", "ttft", "precheck_stats", "parse_stats", "outputs", "error"]
+STATUSES = ("running", "failed", "completed", "cancelled") # Cancelled runs are never resumed automatically
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+STALE_RUN_SECONDS = 900 # A "running" run without a checkpoint for this long is assumed dead (worker crash, closed tab)
+# Resumable runs: failed, or "running" without a recent checkpoint (a live run may still be executing elsewhere)
+UNFINISHED_WHERE = "(status = 'failed' OR (status = 'running' AND updated_at < ?))"
+
+
+def input_hash(job) -> str:
+    """Hash of the job inputs; equal jobs map to the same hash, so an unfinished run can be picked up again."""
+    return hashlib.sha256(json.dumps(asdict(job), sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def state_to_dict(state) -> dict:
+    data = {name: getattr(state, name, None) for name in STATE_FIELDS}
+    if data["research_context"] is not None: data["research_context"] = data["research_context"].to_dict()
+    return data
+
+def restore_state(data: dict, state=None):
+    """Copies checkpointed fields onto `state` (a PipelineState or st.session_state); returns it."""
+    from core.pipeline import PipelineState
+    from core.research_context import ResearchContext
+    state = state if state is not None else PipelineState()
+    for name in STATE_FIELDS:
+        if name not in data: continue
+        value = data[name]
+        if name == "research_context" and value is not None: value = ResearchContext.from_dict(value)
+        setattr(state, name, value)
+    return state
+
+
+class RunStore:
+    """One row per run in a SQLite file: job, latest checkpoint, next step and status."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute("""CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY, input_hash TEXT NOT NULL, job TEXT NOT NULL, state TEXT NOT NULL,
+            step TEXT, status TEXT NOT NULL, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)""")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS runs_input ON runs(input_hash, updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def save(self, job, state, step: str = None, status: str = "running"):
+        """Checkpoints the run; `step` is where a resume starts (defaults to state.pipeline_step)."""
+        now = time.time()
+        self._conn().execute(
+            """INSERT INTO runs (run_id, input_hash, job, state, step, status, error, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(run_id) DO UPDATE SET job = excluded.job, state = excluded.state, step = excluded.step,
+               status = excluded.status, error = excluded.error, updated_at = excluded.updated_at""",
+            (state.run_id, input_hash(job), json.dumps(asdict(job), default=str), json.dumps(state_to_dict(state), default=str),
+             step or state.pipeline_step, status, getattr(state, "error", None), now, now))
+
+    def mark(self, run_id: str, status: str, error: str = None):
+        """Updates status / error only, keeping the last good checkpoint as the resume point."""
+        self._conn().execute("UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?", (status, error, time.time(), run_id))
+
+    def load(self, run_id: str):
+        """(job, state dict, resume step) for a run id or unique id prefix, or None."""
+        rows = self._conn().execute("SELECT job, state, step FROM runs WHERE run_id LIKE ? ORDER BY updated_at DESC LIMIT 2", (run_id + "%",)).fetchall()
+        if len(rows) != 1: return None
+        from core.pipeline import PipelineJob
+        job_data, state_data, step = rows[0]
+        job_data = json.loads(job_data)
+        known = {f.name for f in fields(PipelineJob)}
+        return PipelineJob(**{k: v for k, v in job_data.items() if k in known}), json.loads(state_data), step
+
+    def find_unfinished(self, job, stale_after: float = STALE_RUN_SECONDS) -> str:
+        """Run id of the most recent failed (or stale running) run with the same inputs, or None."""
+        row = self._conn().execute(
+            f"SELECT run_id FROM runs WHERE input_hash = ? AND {UNFINISHED_WHERE} ORDER BY updated_at DESC LIMIT 1",
+            (input_hash(job), time.time() - stale_after)).fetchone()
+        return row[0] if row else None
+
+    def list(self, status: str = None, limit: int = 20, unfinished: bool = False, stale_after: float = STALE_RUN_SECONDS) -> list:
+        """Most recent runs, newest first. `unfinished` keeps only resumable runs, by the same rule as find_unfinished."""
+        query = "SELECT run_id, status, step, job, error, created_at, updated_at FROM runs"
+        params = ()
+        if status: query += " WHERE status = ?"; params = (status,)
+        elif unfinished: query += f" WHERE {UNFINISHED_WHERE}"; params = (time.time() - stale_after,)
+        rows = self._conn().execute(query + " ORDER BY updated_at DESC LIMIT ?", params + (limit,)).fetchall()
+        return [{"run_id": run_id, "status": status, "step": step, "niche": json.loads(job).get("niche"), "error": error,
+                 "created_at": created_at, "updated_at": updated_at} for run_id, status, step, job, error, created_at, updated_at in rows]
+
+    def delete(self, run_id: str) -> int:
+        return self._conn().execute("DELETE FROM runs WHERE run_id = ?", (run_id,)).rowcount
+
+    def gc(self, older_than_days: float = 7, statuses: tuple = FINISHED_STATUSES) -> int:
+        """Deletes runs in `statuses` not updated for `older_than_days`. Returns rows removed."""
+        cutoff = time.time() - older_than_days * 86400
+        query = f"DELETE FROM runs WHERE updated_at < ? AND status IN ({','.join('?' * len(statuses))})"
+        removed = self._conn().execute(query, (cutoff, *statuses)).rowcount
+        self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_run_store():
+    """Process-wide RunStore, or None if disabled (MINDFLOW_RUN_STORE=0)."""
+    global _store
+    settings = get_settings()
+    if not settings.run_store: return None
+    with _store_lock:
+        if _store is None: _store = RunStore(settings.run_store_path)
+        return _store
+
+
+def stored_run(run_id: str, state=None):
+    """(job, state) of a stored run with the state positioned at its resume step, or None."""
+    store = get_run_store()
+    loaded = store.load(run_id) if store and run_id else None
+    if loaded is None: return None
+    job, data, step = loaded
+    state = restore_state(data, state)
+    state.pipeline_step = step; state.error = None
+    return job, state
+
+def unfinished_state(job):
+    """Restored state of an unfinished run with the same inputs, positioned at its resume step, or None."""
+    store = get_run_store()
+    stored = stored_run(store.find_unfinished(job)) if store else None
+    return stored[1] if stored else None
+
+async def resume_run_async(run_id: str, on_event=None, state=None):
+    """Continues a stored run from its last checkpoint. Returns (job, state)."""
+    from core.pipeline import run_pipeline_async
+    stored = stored_run(run_id, state)
+    if stored is None: raise ValueError(f"No stored run matches '{run_id}'.")
+    job, state = stored
+    return job, await run_pipeline_async(job, state, on_event)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.run_store", description="List, resume and clean up checkpointed pipeline runs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    listing = sub.add_parser("list", help="Most recent runs.")
+    listing.add_argument("--status", choices=STATUSES); listing.add_argument("--limit", type=int, default=20)
+    resume = sub.add_parser("resume", help="Continue a run from its last checkpoint.")
+    resume.add_argument("run_id", help="Run id (or a unique prefix).")
+    resume.add_argument("--output", "-o", help="Append the result record to this JSONL file.")
+    gc = sub.add_parser("gc", help="Delete old runs.")
+    gc.add_argument("--older-than-days", type=float, default=7)
+    gc.add_argument("--all", action="store_true", help="Also delete runs that never finished.")
+    args = parser.parse_args(argv)
+
+    store = get_run_store()
+    if store is None: raise SystemExit("Run store is disabled (MINDFLOW_RUN_STORE=0).")
+    if args.command == "list":
+        runs = store.list(args.status, args.limit)
+        if not runs: print("No stored runs.")
+        for run in runs:
+            updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["updated_at"]))
+            print(f"{run['run_id']}  {run['status']:<10} {(run['step'] or ''):<14} {updated}  {run['niche']}" + (f"  ({run['error'][:60]})" if run["error"] else ""))
+    elif args.command == "resume":
+        from core.pipeline import result_record
+        start = time.perf_counter()
+        job, state = asyncio.run(resume_run_async(args.run_id, on_event=lambda event: print(f"[{event.step}] {event.message}") if event.kind != "token" else None))
+        record = result_record(job, state, time.perf_counter() - start)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as f: f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"Run {state.run_id}: {record['status']} after {record['revisions']} revision(s)" + (f" ({record['error']})" if record["error"] else ""))
+    else:
+        print(f"Removed {store.gc(args.older_than_days, STATUSES if args.all else FINISHED_STATUSES)} run(s).")
+
+if __name__ == "__main__":
+    main()
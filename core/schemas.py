@@ -0,0 +1,59 @@
+# core/schemas.py
+"""
+Typed outputs for the filter and boss agents.
+
+The engine requests these through function calling (ChatOpenAI.with_structured_output), validates
+them with pydantic, and on malformed output sends only a small repair call, never the whole step again.
+`model_dump()` keeps the dict shapes the rest of the app already uses.
+"""
+import json
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+
+class FilterResult(BaseModel):
+    """Ranked ideas from the filter agent. The three lists correspond by index."""
+    Idea: List[str] = Field(description="Exact idea text from the input, best first.")
+    Score: List[float] = Field(description="Score between 0.0 and 1.0 for each idea.")
+    Reasoning: List[str] = Field(description="One concise sentence per idea.")
+    confidence: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="How sure you are of this ranking, 0.0-1.0.")
+
+    @field_validator("Score")
+    @classmethod
+    def clamp_scores(cls, scores):
+        return [min(1.0, max(0.0, float(score))) for score in scores]
+
+    @model_validator(mode="after")
+    def same_lengths(self):
+        if not len(self.Idea) == len(self.Score) == len(self.Reasoning): raise ValueError("Idea, Score and Reasoning must have the same length")
+        return self
+
+
+class ValidationIssue(BaseModel):
+    instructions: str = Field(description="Specific, actionable feedback.")
+    section: Optional[int] = Field(default=None, description="Draft section number the issue applies to, or null for the whole draft.")
+
+
+class ValidationResult(BaseModel):
+    """The boss agent's verdict on a draft."""
+    approved: bool = Field(description="True if the draft meets all requirements.")
+    issues: List[ValidationIssue] = Field(default_factory=list, description="Problems to fix; empty when approved.")
+    confidence: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="How sure you are of this verdict, 0.0-1.0.")
+
+
+def parse_model(schema, text: str):
+    """Validates `text` as `schema`; otherwise tries each embedded JSON object in turn. Returns None if nothing fits."""
+    if isinstance(text, dict):
+        try: return schema.model_validate(text)
+        except ValidationError: return None
+    text = str(text or "")
+    try: return schema.model_validate_json(text)
+    except ValidationError: pass
+    decoder = json.JSONDecoder()
+    for start in (i for i, char in enumerate(text) if char == "{"):
+        try: candidate, _ = decoder.raw_decode(text, start)
+        except json.JSONDecodeError: continue
+        try: return schema.model_validate(candidate)
+        except ValidationError: continue
+    return None
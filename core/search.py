@@ -0,0 +1,176 @@
+# core/search.py
+"""
+Cached, shared web search layer used by WebSearchTool.
+
+- One backend client per process (DuckDuckGo by default, or a local stand-in for tests).
+- Queries are normalized (case, whitespace, keyword order) before lookup.
+- Truncated results are cached with a TTL in a persistent SQLite store.
+- Concurrent identical queries are coalesced into one in-flight backend request.
+
+    python -m core.search stats
+    python -m core.search query "ai productivity site:medium.com"
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from core.config import get_settings
+from core.sqlite_kv import SQLiteKVStore
+
+MAX_RESULT_CHARS = 2000 # Truncate long search results
+
+
+def normalize_query(query: str) -> str:
+    """Case-folds, collapses whitespace and sorts unique terms so 'AI  SaaS' and 'saas ai' share a cache entry."""
+    terms = re.split(r"\s+", (query or "").strip().lower())
+    return " ".join(sorted(set(term for term in terms if term)))
+
+
+class StaticSearchBackend:
+    """Local stand-in backend: returns canned results (exact normalized-query match or term overlap), no network."""
+
+    def __init__(self, results: dict = None, default: str = "No results found.", latency: float = 0.0):
+        self.results = {normalize_query(q): text for q, text in (results or {}).items()}
+        self.default = default
+        self.latency = latency
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> "StaticSearchBackend":
+        with open(path, encoding="utf-8") as f: return cls(json.load(f))
+
+    def invoke(self, query: str) -> str:
+        self.calls += 1
+        if self.latency: time.sleep(self.latency)
+        normalized = normalize_query(query)
+        if normalized in self.results: return self.results[normalized]
+        terms = set(normalized.split())
+        best = max(self.results.items(), key=lambda item: len(terms & set(item[0].split())), default=None)
+        if best and terms & set(best[0].split()): return best[1]
+        return self.default
+
+
+class SearchService:
+    """Normalizing, caching, request-coalescing front end for a search backend."""
+
+    def __init__(self, backend, store: SQLiteKVStore = None, max_chars: int = MAX_RESULT_CHARS, namespace: str = "search"):
+        self.backend = backend
+        self.store = store
+        self.max_chars = max_chars
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._in_flight = {} # normalized query -> Future
+        self._latencies = [] # backend call latencies (seconds), most recent last
+        self._counts = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def _truncate(self, response: str) -> str:
+        if len(response) > self.max_chars: response = response[:self.max_chars] + "... (truncated)"
+        return response
+
+    def search(self, query: str) -> str:
+        key = normalize_query(query)
+        if self.store is not None:
+            cached = self.store.get(self.namespace, key)
+            if cached is not None:
+                with self._lock: self._counts["hits"] += 1
+                print(f"Search cache hit for: {query}")
+                return cached
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader: future = self._in_flight[key] = Future()
+            else: self._counts["coalesced"] += 1
+        if not leader:
+            print(f"Joining in-flight search for: {query}")
+            return future.result()
+        try:
+            result = self._fetch(query, key)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e); raise
+        finally:
+            with self._lock: self._in_flight.pop(key, None)
+
+    def _fetch(self, query: str, key: str) -> str:
+        with self._lock: self._counts["misses"] += 1
+        start = time.perf_counter()
+        try:
+            print(f"Executing search for: {query}")
+            response = str(self.backend.invoke(query))
+            print(f"Search response length: {len(response)}")
+        except Exception as e:
+            with self._lock: self._counts["errors"] += 1
+            print(f"Search failed for '{query}': {e}"); return f"Error: {e}" # Errors are returned, never cached
+        finally:
+            with self._lock: self._latencies = (self._latencies + [time.perf_counter() - start])[-1000:]
+        response = self._truncate(response)
+        if self.store is not None: self.store.set(self.namespace, key, response)
+        return response
+
+    def stats(self) -> dict:
+        """Hit rate, coalesced requests and backend latency (p50/p95, seconds) for this process."""
+        with self._lock:
+            counts = dict(self._counts); latencies = sorted(self._latencies)
+        lookups = counts["hits"] + counts["misses"] + counts["coalesced"]
+        counts["hit_rate"] = round((counts["hits"] + counts["coalesced"]) / lookups, 3) if lookups else 0.0
+        counts["backend_calls"] = len(latencies)
+        if latencies:
+            counts["latency_p50"] = round(latencies[len(latencies) // 2], 3)
+            counts["latency_p95"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+        return counts
+
+
+# --- Process-wide service ---
+_service = None
+_service_lock = threading.Lock()
+
+def create_backend(name: str = None):
+    """Builds the configured backend: 'duckduckgo' (default) or 'static' (MINDFLOW_SEARCH_FIXTURES JSON)."""
+    settings = get_settings()
+    name = (name or settings.search_backend).lower()
+    if name == "static":
+        fixtures = settings.search_fixtures
+        return StaticSearchBackend.from_file(fixtures) if fixtures else StaticSearchBackend()
+    from langchain_community.tools import DuckDuckGoSearchRun
+    return DuckDuckGoSearchRun()
+
+def get_search_service() -> SearchService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            settings = get_settings()
+            store = SQLiteKVStore(path=settings.search_cache_path, table="search_cache", ttl_seconds=settings.search_ttl, max_entries=5000)
+            _service = SearchService(create_backend(), store)
+        return _service
+
+def set_search_service(service: SearchService):
+    """Swaps the process-wide service (e.g. for a StaticSearchBackend in tests or benchmarks)."""
+    global _service
+    with _service_lock: _service = service
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.search", description="Query or inspect the MindFlow search cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show persistent hit/miss counters.")
+    query_p = sub.add_parser("query", help="Run a (cached) search.")
+    query_p.add_argument("text")
+    sub.add_parser("purge", help="Delete all cached search results.")
+    args = parser.parse_args(argv)
+
+    service = get_search_service()
+    if args.command == "stats":
+        for namespace, s in service.store.stats().items():
+            print(f"{namespace}: {s['entries']} entries, {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.1%} hit rate)")
+    elif args.command == "query":
+        print(service.search(args.text)); print(service.stats())
+    elif args.command == "purge":
+        print(f"Removed {service.store.purge()} entries.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# core/sqlite_kv.py
+import os
+import sqlite3
+import threading
+import time
+
+class SQLiteKVStore:
+    """
+    Namespaced key/value store backed by a single SQLite file.
+    Safe to share between processes (WAL mode + busy timeout). Entries expire after
+    `ttl_seconds` and the table is trimmed to `max_entries` by least-recent access.
+    Hit/miss/eviction counters are kept per namespace in the same file.
+    """
+
+    def __init__(self, path: str, table: str = "kv", ttl_seconds: float = None, max_entries: int = None, evict_every: int = 32):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self.max_entries = max_entries if max_entries and max_entries > 0 else None
+        self.evict_every = max(1, evict_every)
+        self._local = threading.local()
+        self._writes_since_evict = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+                namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                created_at REAL NOT NULL, accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key))""")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)")
+            conn.execute(f"""CREATE TABLE IF NOT EXISTS {table}_stats (
+                namespace TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0, evictions INTEGER NOT NULL DEFAULT 0)""")
+
+    # --- Connection handling (one connection per thread) ---
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = _Transaction(conn)
+            conn = self._local.conn
+        return conn
+
+    def _bump(self, conn, namespace: str, column: str, amount: int = 1):
+        conn.execute(f"INSERT INTO {self.table}_stats (namespace, {column}) VALUES (?, ?) "
+                     f"ON CONFLICT(namespace) DO UPDATE SET {column} = {column} + excluded.{column}", (namespace, amount))
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    # --- Public API ---
+    def get(self, namespace: str, key: str):
+        """Returns the stored value, or None on a miss (missing or expired)."""
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute(f"SELECT value, created_at FROM {self.table} WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+            if row is None:
+                self._bump(conn, namespace, "misses"); return None
+            value, created_at = row
+            if self._is_expired(created_at, now):
+                conn.execute(f"DELETE FROM {self.table} WHERE namespace = ? AND key = ?", (namespace, key))
+                self._bump(conn, namespace, "misses"); self._bump(conn, namespace, "evictions"); return None
+            conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+            self._bump(conn, namespace, "hits")
+            return value
+
+    def set(self, namespace: str, key: str, value: str):
+        """Stores a value, replacing any previous entry, and trims the store if needed."""
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO {self.table} (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)", (namespace, key, value, now, now))
+        with self._lock:
+            self._writes_since_evict += 1
+            run_eviction = self._writes_since_evict >= self.evict_every
+            if run_eviction: self._writes_since_evict = 0
+        if run_eviction: self.evict()
+
+    def delete(self, namespace: str, key: str):
+        with self._conn() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def evict(self) -> int:
+        """Drops expired entries, then least-recently-used entries above max_entries. Returns rows removed."""
+        removed = 0
+        with self._conn() as conn:
+            if self.ttl_seconds is not None:
+                rows = conn.execute(f"SELECT namespace, COUNT(*) FROM {self.table} WHERE created_at < ? GROUP BY namespace", (time.time() - self.ttl_seconds,)).fetchall()
+                conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+                for namespace, count in rows: self._bump(conn, namespace, "evictions", count); removed += count
+            if self.max_entries is not None:
+                victims = f"SELECT rowid FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?"
+                rows = conn.execute(f"SELECT namespace, COUNT(*) FROM {self.table} WHERE rowid IN ({victims}) GROUP BY namespace", (self.max_entries,)).fetchall()
+                conn.execute(f"DELETE FROM {self.table} WHERE rowid IN ({victims})", (self.max_entries,))
+                for namespace, count in rows: self._bump(conn, namespace, "evictions", count); removed += count
+        return removed
+
+    def purge(self, namespace: str = None) -> int:
+        """Deletes all entries (optionally for one namespace). Returns rows removed."""
+        with self._conn() as conn:
+            if namespace is None: cursor = conn.execute(f"DELETE FROM {self.table}")
+            else: cursor = conn.execute(f"DELETE FROM {self.table} WHERE namespace = ?", (namespace,))
+            return cursor.rowcount
+
+    def reset_stats(self, namespace: str = None):
+        with self._conn() as conn:
+            if namespace is None: conn.execute(f"DELETE FROM {self.table}_stats")
+            else: conn.execute(f"DELETE FROM {self.table}_stats WHERE namespace = ?", (namespace,))
+
+    def stats(self) -> dict:
+        """Per-namespace entry counts, sizes and hit/miss/eviction counters."""
+        result = {}
+        conn = self._conn()
+        for namespace, entries, size in conn.execute(f"SELECT namespace, COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM {self.table} GROUP BY namespace"):
+            result[namespace] = {"entries": entries, "bytes": size, "hits": 0, "misses": 0, "evictions": 0}
+        for namespace, hits, misses, evictions in conn.execute(f"SELECT namespace, hits, misses, evictions FROM {self.table}_stats"):
+            entry = result.setdefault(namespace, {"entries": 0, "bytes": 0})
+            entry.update(hits=hits, misses=misses, evictions=evictions)
+        for entry in result.values():
+            lookups = entry["hits"] + entry["misses"]
+            entry["hit_rate"] = round(entry["hits"] / lookups, 3) if lookups else 0.0
+        return result
+
+    def entries(self, namespace: str = None, limit: int = 20) -> list:
+        """Most recently used entries as (namespace, key, created_at, accessed_at, size) tuples."""
+        query = f"SELECT namespace, key, created_at, accessed_at, LENGTH(value) FROM {self.table}"
+        params = ()
+        if namespace is not None: query += " WHERE namespace = ?"; params = (namespace,)
+        query += " ORDER BY accessed_at DESC LIMIT ?"
+        return self._conn().execute(query, params + (limit,)).fetchall()
+
+
+class _Transaction:
+    """Wraps an autocommit connection so `with conn:` runs an IMMEDIATE transaction."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
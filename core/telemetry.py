@@ -0,0 +1,466 @@
+# core/telemetry.py
+"""
+Spans for pipeline runs, steps and every LLM call.
+
+Each span records wall time, prompt/completion tokens, retries and the seconds / tokens they wasted
+(core/retry_policy.py), LLM cache hits/misses, estimated cost, revision number and run id. Finished spans go to:
+- a rotating JSONL trace file (MINDFLOW_TRACE_PATH, default .mindflow/traces.jsonl)
+- Prometheus text-format files, one per process (MINDFLOW_METRICS_PATH, default .mindflow/metrics.prom →
+  .mindflow/metrics.<pid>.prom), rewritten at most every METRICS_FLUSH_INTERVAL seconds and at the end
+  of each run; `serve` sums them, so worker processes do not overwrite each other's counters. A process
+  deletes its file at exit, and files of processes that are no longer alive are pruned when merging
+
+    python -m core.telemetry summary              # p50 / p95, tokens and cost per step and agent
+    python -m core.telemetry summary --run 3f2a9c...
+    python -m core.telemetry serve --port 9464    # Expose the metrics file for Prometheus to scrape
+
+Usage from code:
+    with telemetry.bind(run_id=state.run_id), telemetry.span("research", kind="step"):
+        ...
+    telemetry.record_usage(prompt_tokens=812, completion_tokens=240) # Added to every open span
+"""
+import argparse
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import re
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from core.config import get_settings
+
+# USD per 1K tokens (prompt, completion). Override or extend with MINDFLOW_MODEL_PRICES="model=prompt/completion,...".
+DEFAULT_PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+}
+DURATION_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+METRICS_FLUSH_INTERVAL = 5.0 # Min seconds between metric file rewrites (run spans and process exit flush at once)
+
+_attrs = contextvars.ContextVar("mindflow_span_attrs", default={})
+_stack = contextvars.ContextVar("mindflow_span_stack", default=())
+_span_ids = itertools.count(1)
+_lock = threading.Lock() # Spans are shared with worker threads (crew kickoffs, callbacks)
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str = "llm" # run | step | llm
+    attrs: dict = field(default_factory=dict) # run_id, step, revision, role, ...
+    span_id: int = field(default_factory=lambda: next(_span_ids))
+    parent_id: int = None
+    start: float = field(default_factory=time.time)
+    wall_seconds: float = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    wasted_seconds: float = 0.0 # Failed attempts and backoff waits
+    wasted_tokens: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    model: str = None
+    cost: float = 0.0 # USD, summed per call at the model that served it (a span may mix routes)
+    status: str = "ok"
+    error: str = None
+
+    def to_dict(self) -> dict:
+        record = {"name": self.name, "kind": self.kind, "span_id": self.span_id, "parent_id": self.parent_id,
+                  "start": round(self.start, 3), "wall_seconds": self.wall_seconds,
+                  "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+                  "retries": self.retries, "wasted_seconds": round(self.wasted_seconds, 3), "wasted_tokens": self.wasted_tokens, "cache_hits": self.cache_hits, "cache_misses": self.cache_misses,
+                  "model": self.model, "cost_usd": round(self.cost, 6),
+                  "status": self.status, "error": self.error}
+        record.update(self.attrs)
+        return record
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+def _parse_prices(raw: str) -> dict:
+    """Parses 'gpt-4o=0.0025/0.01,...' into {'gpt-4o': (0.0025, 0.01)}."""
+    prices = {}
+    for part in (raw or "").split(","):
+        if "=" not in part or "/" not in part: continue
+        model, value = part.split("=", 1)
+        try: prices[model.strip()] = tuple(float(v) for v in value.split("/", 1))
+        except ValueError: print(f"Ignoring invalid price '{part}'")
+    return prices
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated cost; the longest matching price-table prefix wins (e.g. 'gpt-4o-mini-2024-07-18' → gpt-4o-mini)."""
+    if not prompt_tokens and not completion_tokens: return 0.0
+    prices = {**DEFAULT_PRICES, **_parse_prices(get_settings().model_prices)}
+    model = model or get_settings().model_name
+    match = max((name for name in prices if model.startswith(name)), key=len, default=None)
+    if match is None: return 0.0
+    prompt_price, completion_price = prices[match]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+# --- Recording API (no-ops outside a span) ---
+@contextmanager
+def bind(**attrs):
+    """Attributes (run_id, step, revision, ...) attached to every span opened inside this block."""
+    token = _attrs.set({**_attrs.get(), **attrs})
+    try: yield
+    finally: _attrs.reset(token)
+
+@contextmanager
+def span(name: str, kind: str = "llm", **attrs):
+    """Times the block as a span and exports it on exit. Errors mark the span as failed and propagate."""
+    stack = _stack.get()
+    current = Span(name=name, kind=kind, attrs={**_attrs.get(), **attrs}, parent_id=stack[-1].span_id if stack else None)
+    token = _stack.set(stack + (current,))
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"; current.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        _stack.reset(token)
+        current.wall_seconds = round(time.perf_counter() - started, 3)
+        telemetry = get_telemetry()
+        if telemetry is not None: telemetry.export(current)
+
+def current_span() -> Span:
+    stack = _stack.get()
+    return stack[-1] if stack else None
+
+def _route_model(role: str) -> str:
+    from core.routing import get_route
+    return get_route(role).model
+
+def record_usage(prompt_tokens: int = 0, completion_tokens: int = 0, model: str = None, role: str = None):
+    """Adds token usage to every open span, so run and step spans aggregate their LLM calls. The call is priced once, at
+    `model` (else the innermost route span's model, i.e. the cascade tier in use, else the role's route model), and that
+    cost is added to every open span."""
+    with _lock:
+        stack = _stack.get()
+        priced = model or next((s.model for s in reversed(stack) if s.kind == "route" and s.model), None) or (_route_model(role) if role else None)
+        cost = cost_usd(priced, int(prompt_tokens or 0), int(completion_tokens or 0))
+        for s in stack:
+            s.prompt_tokens += int(prompt_tokens or 0); s.completion_tokens += int(completion_tokens or 0); s.cost += cost
+            if model: s.model = model
+
+def record_retry():
+    with _lock:
+        for s in _stack.get(): s.retries += 1
+
+def record_waste(seconds: float = 0.0, tokens: int = 0):
+    """Adds work lost to a failed attempt or a backoff wait to every open span."""
+    with _lock:
+        for s in _stack.get(): s.wasted_seconds += seconds; s.wasted_tokens += int(tokens or 0)
+
+def increment(metric: str, value: float = 1.0, **labels):
+    """Bumps a free-form Prometheus counter, e.g. increment("mindflow_structured_output_total", role="boss", outcome="repaired")."""
+    metrics = getattr(get_telemetry(), "metrics", None)
+    if metrics is not None: metrics.increment(metric, labels, value)
+
+def observe_value(metric: str, value: float, buckets: tuple = TOKEN_BUCKETS, **labels):
+    """Adds a sample to a free-form Prometheus histogram, e.g. observe_value("mindflow_prompt_tokens", 2310, task="validate")."""
+    metrics = getattr(get_telemetry(), "metrics", None)
+    if metrics is not None: metrics.observe_value(metric, labels, value, buckets)
+
+def record_cache(hit: bool):
+    with _lock:
+        for s in _stack.get():
+            if hit: s.cache_hits += 1
+            else: s.cache_misses += 1
+
+
+# --- Exporters ---
+class TraceWriter:
+    """Appends spans as JSON lines; rotates to path.1 … path.N once the file exceeds max_bytes."""
+
+    def __init__(self, path: str, max_bytes: int = 10_000_000, backups: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"): os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def write(self, record: dict):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes: self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f: f.write(line)
+
+
+def process_metrics_path(path: str, pid: int = None) -> str:
+    """metrics.prom → metrics.<pid>.prom: each process writes its own file."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt": return True # os.kill(pid, 0) would terminate the process on Windows
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except PermissionError: return True # Alive, owned by another user
+    except OSError: return False
+    return True
+
+def merge_metrics(path: str) -> str:
+    """Sums the per-process files of `path` (metrics.<pid>.prom) into one exposition; samples with equal names and labels add up.
+    Files left by processes that are no longer alive (killed before their exit cleanup) are deleted, not counted."""
+    root, ext = os.path.splitext(path)
+    directory, base = os.path.split(os.path.abspath(root))
+    pattern = re.compile(re.escape(base) + r"\.(\d+)" + re.escape(ext) + "$")
+    families = {} # metric family -> (comment lines, {sample: value}), in first-seen order
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        match = pattern.match(name)
+        if not match: continue
+        if not _pid_alive(int(match.group(1))):
+            try: os.remove(os.path.join(directory, name))
+            except OSError: pass
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f: lines = f.read().splitlines()
+        except OSError: continue # Being replaced by its writer
+        family = None
+        for line in lines:
+            if not line.strip(): continue
+            if line.startswith("#"):
+                family = line.split()[2] if len(line.split()) > 2 else family
+                comments, _ = families.setdefault(family, ([], {}))
+                if line not in comments: comments.append(line)
+                continue
+            sample, _, value = line.rpartition(" ")
+            try: value = float(value)
+            except ValueError: continue
+            samples = families.setdefault(family, ([], {}))[1]
+            samples[sample] = samples.get(sample, 0.0) + value
+    lines = []
+    for comments, samples in families.values():
+        lines += comments + [f"{sample} {value:.12g}" for sample, value in samples.items()]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class PrometheusMetrics:
+    """In-process aggregates rendered in Prometheus text exposition format and written atomically to this process's file."""
+
+    def __init__(self, path: str = None, flush_interval: float = METRICS_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._flushed = 0.0
+        self._closed = False
+        if path: atexit.register(self.close) # Counters of a finished process must not keep adding up in `serve`
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1) + [0.0]) # labels -> bucket counts, +Inf, sum
+        self._counters = defaultdict(float) # (metric, labels) -> value
+        self._histograms = {} # (metric, labels) -> (buckets, counts per bucket + [+Inf, sum])
+
+    def observe(self, s: Span):
+        labels = (("kind", s.kind), ("name", s.name))
+        with self._lock:
+            hist = self._durations[labels]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if s.wall_seconds <= bound: hist[i] += 1
+            hist[len(DURATION_BUCKETS)] += 1; hist[-1] += s.wall_seconds
+            self._counters[("mindflow_spans_total", labels + (("status", s.status),))] += 1
+            if s.kind == "llm": # Run / step spans repeat the same usage, so only LLM spans feed the counters
+                self._counters[("mindflow_tokens_total", labels + (("type", "prompt"),))] += s.prompt_tokens
+                self._counters[("mindflow_tokens_total", labels + (("type", "completion"),))] += s.completion_tokens
+                self._counters[("mindflow_retries_total", labels)] += s.retries
+                self._counters[("mindflow_llm_cache_hits_total", labels)] += s.cache_hits
+                self._counters[("mindflow_llm_cache_misses_total", labels)] += s.cache_misses
+                self._counters[("mindflow_cost_usd_total", labels)] += s.cost
+            elif s.kind == "route": # role:model routes (core/routing.py); latency is in the histogram above
+                self._counters[("mindflow_route_cost_usd_total", labels)] += s.cost
+
+    def increment(self, metric: str, labels: dict, value: float = 1.0):
+        with self._lock: self._counters[(metric, tuple(sorted(labels.items())))] += value
+        self.maybe_flush()
+
+    def observe_value(self, metric: str, labels: dict, value: float, buckets: tuple):
+        with self._lock:
+            key = (metric, tuple(sorted(labels.items())))
+            bounds, counts = self._histograms.setdefault(key, (buckets, [0] * (len(buckets) + 1) + [0.0]))
+            for i, bound in enumerate(bounds):
+                if value <= bound: counts[i] += 1
+            counts[len(bounds)] += 1; counts[-1] += value
+        self.maybe_flush()
+
+    @staticmethod
+    def _labels(labels, extra=()) -> str:
+        return "{" + ",".join(f'{key}="{value}"' for key, value in tuple(labels) + tuple(extra)) + "}"
+
+    def render(self) -> str:
+        lines = ["# HELP mindflow_span_duration_seconds Wall time of MindFlow runs, steps and LLM calls.",
+                 "# TYPE mindflow_span_duration_seconds histogram"]
+        with self._lock:
+            for labels, hist in sorted(self._durations.items()):
+                for bound, count in zip(DURATION_BUCKETS, hist):
+                    lines.append(f"mindflow_span_duration_seconds_bucket{self._labels(labels, [('le', bound)])} {count}")
+                lines.append(f"mindflow_span_duration_seconds_bucket{self._labels(labels, [('le', '+Inf')])} {hist[len(DURATION_BUCKETS)]}")
+                lines.append(f"mindflow_span_duration_seconds_sum{self._labels(labels)} {hist[-1]:.3f}")
+                lines.append(f"mindflow_span_duration_seconds_count{self._labels(labels)} {hist[len(DURATION_BUCKETS)]}")
+            declared = set()
+            for (metric, labels), (bounds, counts) in sorted(self._histograms.items()):
+                if metric not in declared: lines.append(f"# TYPE {metric} histogram"); declared.add(metric)
+                for bound, count in zip(bounds, counts):
+                    lines.append(f"{metric}_bucket{self._labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{metric}_bucket{self._labels(labels, [('le', '+Inf')])} {counts[len(bounds)]}")
+                lines.append(f"{metric}_sum{self._labels(labels)} {counts[-1]:g}")
+                lines.append(f"{metric}_count{self._labels(labels)} {counts[len(bounds)]}")
+            for (metric, labels), value in sorted(self._counters.items()):
+                if metric not in declared: lines.append(f"# TYPE {metric} counter"); declared.add(metric)
+                lines.append(f"{metric}{self._labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def maybe_flush(self):
+        """Flushes unless the file was written less than flush_interval seconds ago, keeping file I/O off hot paths."""
+        if time.monotonic() - self._flushed >= self.flush_interval: self.flush()
+
+    def flush(self):
+        if not self.path or self._closed: return
+        self._flushed = time.monotonic()
+        target = process_metrics_path(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        tmp = f"{target}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(self.render())
+        os.replace(tmp, target)
+
+    def close(self):
+        """Removes this process's file; later flushes are no-ops."""
+        self._closed = True
+        if not self.path: return
+        try: os.remove(process_metrics_path(self.path))
+        except OSError: pass
+
+
+class Telemetry:
+    def __init__(self, trace: TraceWriter = None, metrics: PrometheusMetrics = None):
+        self.trace = trace
+        self.metrics = metrics
+
+    def export(self, s: Span):
+        try:
+            if self.trace is not None: self.trace.write(s.to_dict())
+            if self.metrics is not None:
+                self.metrics.observe(s)
+                if s.kind == "run": self.metrics.flush() # A finished run is visible at once
+                else: self.metrics.maybe_flush()
+        except OSError as e:
+            print(f"Telemetry export failed: {e}") # Never fail a pipeline over telemetry
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+def get_telemetry():
+    """Process-wide exporter, or None if disabled (MINDFLOW_TELEMETRY=0)."""
+    global _telemetry
+    settings = get_settings()
+    if not settings.telemetry: return None
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry(TraceWriter(settings.trace_path, settings.trace_max_bytes), PrometheusMetrics(settings.metrics_path))
+        return _telemetry
+
+def set_telemetry(telemetry):
+    """Swaps the process-wide exporter (e.g. to point a benchmark at its own files)."""
+    global _telemetry
+    with _telemetry_lock: _telemetry = telemetry
+
+
+# --- CLI ---
+def load_spans(path: str) -> list:
+    """Reads a trace file and its rotated backups (oldest first)."""
+    paths = sorted((p for p in (f"{path}.{i}" for i in range(1, 10)) if os.path.exists(p)), reverse=True) + [path]
+    spans = []
+    for p in paths:
+        if not os.path.exists(p): continue
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                try: spans.append(json.loads(line))
+                except json.JSONDecodeError: continue
+    return spans
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+def summarize(spans: list) -> list:
+    """Per (kind, name): count, p50/p95 wall time, mean tokens, retries, cache hits and total cost."""
+    groups = defaultdict(list)
+    for s in spans: groups[(s.get("kind"), s.get("name"))].append(s)
+    rows = []
+    for (kind, name), items in sorted(groups.items(), key=lambda item: (item[0][0] or "", item[0][1] or "")):
+        walls = [s["wall_seconds"] or 0.0 for s in items]
+        rows.append({"kind": kind, "name": name, "count": len(items), "errors": sum(s.get("status") != "ok" for s in items),
+                     "p50": percentile(walls, 0.5), "p95": percentile(walls, 0.95),
+                     "tokens": round(statistics.mean(s["prompt_tokens"] + s["completion_tokens"] for s in items)),
+                     "retries": sum(s.get("retries", 0) for s in items), "wasted_seconds": round(sum(s.get("wasted_seconds", 0.0) for s in items), 2),
+                     "wasted_tokens": sum(s.get("wasted_tokens", 0) for s in items), "cache_hits": sum(s.get("cache_hits", 0) for s in items),
+                     "cost_usd": round(sum(s.get("cost_usd", 0.0) for s in items), 4)})
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.telemetry", description="Summarize MindFlow traces or serve Prometheus metrics.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary_p = sub.add_parser("summary", help="Latency percentiles, tokens and cost per step / agent.")
+    summary_p.add_argument("--trace", help="Trace file (default: MINDFLOW_TRACE_PATH).")
+    summary_p.add_argument("--run", help="Only spans for this run id.")
+    summary_p.add_argument("--json", action="store_true")
+    serve_p = sub.add_parser("serve", help="Serve the metrics of all processes at /metrics.")
+    serve_p.add_argument("--port", type=int, default=9464)
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    if args.command == "summary":
+        spans = load_spans(args.trace or settings.trace_path)
+        if args.run: spans = [s for s in spans if s.get("run_id") == args.run]
+        rows = summarize(spans)
+        if args.json: print(json.dumps(rows, indent=2)); return
+        if not rows: print("No spans recorded."); return
+        print(f"{'kind':<6}{'name':<28}{'count':>7}{'err':>5}{'p50 s':>9}{'p95 s':>9}{'tokens':>9}{'retries':>9}{'cache':>7}{'cost $':>10}")
+        for r in rows:
+            print(f"{r['kind']:<6}{r['name']:<28}{r['count']:>7}{r['errors']:>5}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['tokens']:>9}{r['retries']:>9}{r['cache_hits']:>7}{r['cost_usd']:>10.4f}")
+        runs = [s for s in spans if s.get("kind") == "run"]
+        if runs:
+            print(f"\n{len({s.get('run_id') for s in runs})} run(s), total cost ${sum(s.get('cost_usd', 0.0) for s in runs):.4f}")
+            print(f"retries wasted {sum(s.get('wasted_seconds', 0.0) for s in runs):.1f}s and {sum(s.get('wasted_tokens', 0) for s in runs)} tokens")
+        cascades = defaultdict(lambda: [0, 0]) # role -> [structured calls, escalated]
+        for s in spans:
+            if s.get("kind") == "route" and s.get("tier") is not None: cascades[s.get("role")][0 if s["tier"] == 0 else 1] += 1
+        for role, (calls, escalated) in sorted(cascades.items()):
+            if escalated: print(f"cascade [{role}]: {escalated} of {calls} call(s) escalated ({escalated / max(calls, 1):.0%})")
+        parse_totals = defaultdict(lambda: defaultdict(int)) # role -> outcome -> count, from per-run parse_stats
+        for s in runs:
+            for role, outcomes in (s.get("parse_stats") or {}).items():
+                for outcome, count in outcomes.items(): parse_totals[role][outcome] += count
+        for role, outcomes in sorted(parse_totals.items()):
+            total = sum(outcomes.values()) or 1
+            print(f"structured output [{role}]: " + ", ".join(f"{outcome} {count} ({count / total:.0%})" for outcome, count in outcomes.items())
+                  + f" — {outcomes['salvaged'] + outcomes['repaired']} wasted cycle(s) avoided")
+    elif args.command == "serve":
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics": self.send_error(404); return
+                body = merge_metrics(settings.metrics_path).encode("utf-8")
+                self.send_response(200); self.send_header("Content-Type", "text/plain; version=0.0.4"); self.end_headers(); self.wfile.write(body)
+        print(f"Serving {process_metrics_path(settings.metrics_path, '<pid>')} (all processes) at http://0.0.0.0:{args.port}/metrics")
+        ThreadingHTTPServer(("0.0.0.0", args.port), MetricsHandler).serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# core/tokens.py
+"""Token counting helpers. Uses tiktoken when installed, otherwise a ~4 chars/token estimate."""
+from core.config import get_settings
+
+_encoding = None # None = not loaded yet, False = tiktoken unavailable
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken # Optional dependency, imported on first use
+        except ImportError:
+            _encoding = False; return None
+        try: _encoding = tiktoken.encoding_for_model(get_settings().model_name)
+        except KeyError: _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding or None
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in `text` for the configured model (estimated if tiktoken is unavailable)."""
+    if not text: return 0
+    encoding = _get_encoding()
+    if encoding is not None: return len(encoding.encode(text, disallowed_special=()))
+    return max(1, (len(text) + 3) // 4)
@@ -0,0 +1,124 @@
+# core/worker.py
+"""
+Worker processes that execute queued pipeline jobs (core/job_queue.py) outside the web process.
+
+    python -m core.worker                          # MINDFLOW_WORKERS processes x MINDFLOW_WORKER_CONCURRENCY pipelines
+    python -m core.worker --workers 8 --concurrency 3
+    python -m core.worker --drain                  # exit once the queue is empty (batch / cron use)
+
+Each process runs its own event loop with up to `concurrency` pipelines in flight, claims jobs
+atomically, heartbeats them and streams engine events into the queue. The parent process restarts
+crashed workers and requeues jobs whose worker stopped heartbeating; the requeued job resumes
+from the run store checkpoint (core/run_store.py) instead of starting over.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import get_settings
+
+HEARTBEAT_INTERVAL = 5.0
+STALE_AFTER = 60.0 # Seconds without a heartbeat before a running job is requeued
+
+
+async def run_claimed(queue, job_id: str, job):
+    """Runs one claimed job to completion (or cancellation) and records the outcome in the queue."""
+    from core import telemetry
+    from core.pipeline import PipelineState, result_record, run_pipeline_async
+    from core.run_store import get_run_store, stored_run, unfinished_state
+    previous_run = (queue.get(job_id) or {}).get("run_id") # Set if an earlier attempt of this job was interrupted
+    stored = stored_run(previous_run) if previous_run else None
+    state = stored[1] if stored else unfinished_state(job)
+    state = state or PipelineState()
+    if not state.run_id: state.run_id = telemetry.new_run_id()
+    queue.set_run_id(job_id, state.run_id)
+    if stored or state.pipeline_step != "not_started": queue.add_event(job_id, _event(state.pipeline_step, "progress", f"Resuming run {state.run_id} at {state.pipeline_step}."))
+    start = time.perf_counter()
+    try:
+        state = await run_pipeline_async(job, state, on_event=lambda event: queue.add_event(job_id, event))
+    except asyncio.CancelledError:
+        queue.add_event(job_id, _event(state.pipeline_step, "error", "Run cancelled."))
+        queue.finish(job_id, "cancelled", error="Cancelled by user.")
+        if get_run_store() is not None: get_run_store().mark(state.run_id, "cancelled", "Cancelled by user.") # Not "failed": an identical job must start fresh
+        return
+    except Exception as e: # run_pipeline_async records step errors itself; this is a last resort
+        queue.finish(job_id, "failed", error=f"{type(e).__name__}: {e}"); return
+    record = result_record(job, state, time.perf_counter() - start)
+    queue.finish(job_id, record["status"], record, record["error"])
+
+def _event(step: str, kind: str, message: str):
+    from core.pipeline import PipelineEvent
+    return PipelineEvent(step, kind, message)
+
+async def worker_loop(worker_id: str, concurrency: int, poll_interval: float = 1.0, drain: bool = False):
+    """Claims and runs jobs until stopped (SIGTERM / SIGINT) or, with drain, until the queue is empty."""
+    from core.job_queue import get_job_queue
+    queue = get_job_queue()
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 2)) # Crew kickoffs run in threads
+    stopping = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try: loop.add_signal_handler(sig, stopping.set)
+        except (NotImplementedError, RuntimeError): pass # Windows: rely on the parent terminating us
+    tasks, last_heartbeat = {}, 0.0
+    while not stopping.is_set() or tasks:
+        while not stopping.is_set() and len(tasks) < concurrency:
+            claimed = queue.claim(worker_id)
+            if claimed is None: break
+            job_id, job = claimed
+            print(f"[{worker_id}] Running job {job_id}: {job.niche}")
+            tasks[job_id] = asyncio.create_task(run_claimed(queue, job_id, job))
+        if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL:
+            last_heartbeat = time.monotonic()
+            for job_id in queue.heartbeat(list(tasks)): tasks[job_id].cancel()
+        if drain and not tasks: break
+        if tasks: await asyncio.wait(tasks.values(), timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+        else:
+            try: await asyncio.wait_for(stopping.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError: pass
+        for job_id in [job_id for job_id, task in tasks.items() if task.done()]: del tasks[job_id]
+
+def worker_process(index: int, concurrency: int, poll_interval: float, drain: bool):
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Worker {index} ({worker_id}) started, concurrency {concurrency}")
+    asyncio.run(worker_loop(worker_id, concurrency, poll_interval, drain))
+
+
+def main(argv=None):
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m core.worker", description="Run pipeline worker processes for the job queue.")
+    parser.add_argument("--workers", "-w", type=int, default=settings.workers, help="Worker processes.")
+    parser.add_argument("--concurrency", "-c", type=int, default=settings.worker_concurrency, help="Pipelines in flight per process.")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--drain", action="store_true", help="Exit when no queued or running jobs remain.")
+    args = parser.parse_args(argv)
+
+    from core.job_queue import get_job_queue
+    queue = get_job_queue()
+    requeued = queue.requeue_stale(STALE_AFTER)
+    if requeued: print(f"Requeued {requeued} job(s) from lost workers.")
+    context = multiprocessing.get_context("spawn") # Fresh interpreters: no SQLite connections or event loops inherited
+    spawn = lambda i: context.Process(target=worker_process, args=(i, max(1, args.concurrency), args.poll_interval, args.drain), name=f"mindflow-worker-{i}")
+    processes = [spawn(i) for i in range(max(1, args.workers))]
+    for process in processes: process.start()
+    print(f"{len(processes)} worker(s) x {args.concurrency} pipelines on {settings.queue_path}. Ctrl+C to stop after the running jobs.")
+    try:
+        while any(process.is_alive() for process in processes):
+            time.sleep(STALE_AFTER / 4)
+            queue.requeue_stale(STALE_AFTER)
+            if args.drain: continue
+            for i, process in enumerate(processes):
+                if not process.is_alive(): print(f"Worker {i} exited ({process.exitcode}); restarting."); processes[i] = spawn(i); processes[i].start()
+    except KeyboardInterrupt:
+        print("Stopping workers (running jobs finish first)...")
+        for process in processes:
+            if process.is_alive(): process.terminate() # SIGTERM: stop claiming, finish running jobs
+        for process in processes: process.join()
+
+if __name__ == "__main__":
+    main()
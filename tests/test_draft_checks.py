@@ -0,0 +1,62 @@
+# tests/test_draft_checks.py
+from core.draft_checks import check_draft, check_keywords, check_length, check_readability, keyword_coverage, length_target, reading_ease, score_draft, word_count
+
+PLAIN = "AI tools help you plan your day. They save time for real work. "
+HARD = "Organizational interoperability necessitates comprehensive infrastructural standardization methodologies. "
+
+
+def blog(paragraph: str = PLAIN, repeats: int = 16, conclusion: str = "## Conclusion\n\nIn short, " + PLAIN) -> str:
+    body = (paragraph * repeats).strip()
+    return "\n\n".join(["# Plan Better", "Intro: " + body, "## Why it matters", body, "## How to start", body, conclusion])
+
+
+def test_word_count_and_length_targets():
+    assert word_count("Hello world, it's 2024 and 3.5 rocks.") == 7
+    assert length_target("Blog", "Short") == (300, 600)
+    assert length_target("Social", "Short") == (30, 80)
+    assert length_target("Blog", "Unknown") == (600, 1200)
+
+
+def test_well_formed_draft_passes():
+    draft = blog()
+    assert 600 <= word_count(draft) <= 1200
+    assert check_draft(draft, "Blog", "Beginners", "Medium", ["AI", "productivity tools", "time"]) == []
+
+
+def test_empty_draft_is_a_length_failure():
+    assert [issue["check"] for issue in check_draft("  ", "Blog", "Beginners", "Medium", [])] == ["length"]
+
+
+def test_length_has_tolerance_on_both_sides():
+    assert check_length("word " * 430, "Blog", "Medium") == [] # 72% of the 600 minimum
+    assert "Expand" in check_length("word " * 400, "Blog", "Medium")[0]["instructions"]
+    assert "Tighten" in check_length("word " * 1900, "Blog", "Medium")[0]["instructions"]
+
+
+def test_keyword_coverage_is_case_insensitive_on_word_boundaries():
+    assert keyword_coverage("Using ai daily", ["AI", "SaaS"]) == (0.5, ["SaaS"])
+    assert keyword_coverage("The aim is clear", ["AI"]) == (0.0, ["AI"])
+    assert check_keywords("Using ai daily", ["AI", "SaaS"]) == []
+    assert "SaaS, LLMs" in check_keywords("Using ai daily", ["AI", "SaaS", "LLMs"])[0]["instructions"]
+
+
+def test_structure_needs_headings_and_a_conclusion():
+    flat = "\n\n".join([(PLAIN * 14).strip()] * 4)
+    checks = {issue["instructions"].split()[0] for issue in check_draft(flat, "Blog", "Beginners", "Medium", [])}
+    assert checks == {"Organise", "End"}
+    no_ending = blog(conclusion="## Extra\n\n" + PLAIN)
+    assert [issue["section"] for issue in check_draft(no_ending, "Blog", "Beginners", "Medium", [])] == [4]
+    assert check_draft(flat, "Social", "Beginners", "Long", []) != [] # Length only: social posts need no headings
+
+
+def test_readability_flags_only_hard_sections_for_the_audience():
+    assert reading_ease(PLAIN * 5) > 60 > reading_ease(HARD * 5)
+    sections = [PLAIN * 6, HARD * 8]
+    assert [issue["section"] for issue in check_readability(sections, "Beginners")] == [2]
+    assert check_readability([HARD * 2], "Beginners") == [] # Too short to score
+
+
+def test_score_prefers_the_cleaner_draft():
+    good, _ = score_draft(blog(), "Blog", "Beginners", "Medium", ["AI"])
+    bad, issues = score_draft(blog(HARD, 16), "Blog", "Beginners", "Medium", ["AI"])
+    assert issues and good > bad
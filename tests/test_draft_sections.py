@@ -0,0 +1,39 @@
+# tests/test_draft_sections.py
+from core.draft_sections import apply_section_edits, changed_sections, issue_sections, number_sections, parse_section_edits, split_sections
+
+DRAFT = "# Title\n\nIntro paragraph.\n\n## Setup\n\nInstall it.\nThen run it.\n\nClosing words."
+
+
+def test_split_keeps_headings_with_the_following_block():
+    assert split_sections(DRAFT) == ["# Title\n\nIntro paragraph.", "## Setup\n\nInstall it.\nThen run it.", "Closing words."]
+    assert split_sections("") == []
+
+
+def test_number_sections_limits_and_previews():
+    sections = split_sections(DRAFT)
+    assert number_sections(sections, only={2}) == "[S2]\n## Setup\n\nInstall it.\nThen run it."
+    assert "[S1] (unchanged) # Tit..." in number_sections(sections, only={2}, preview_chars=5)
+
+
+def test_issue_sections_maps_numbers_and_falls_back_to_whole_draft():
+    issues = [{"section": 2, "instructions": "fix"}, {"section": "S3", "instructions": "trim"},
+              {"sections": [1, 9], "instructions": "tone"}, {"instructions": "general"}, "not an issue"]
+    assert issue_sections(issues, section_count=3) == {2: ["fix"], 3: ["trim"], 1: ["tone"], 0: ["general"]}
+
+
+def test_parse_section_edits():
+    raw = "Here are the edits:\n[S2]\nNew setup.\n\nWith two paragraphs.\n[S3]\nDELETE\n[S4]\n"
+    assert parse_section_edits(raw) == {2: "New setup.\n\nWith two paragraphs.", 3: "DELETE"}
+    assert parse_section_edits("no markers") == {} and parse_section_edits(None) == {}
+
+
+def test_apply_replaces_deletes_and_ignores_out_of_range():
+    sections = split_sections(DRAFT)
+    result = apply_section_edits(sections, {2: "## Setup\n\nNew steps.", 3: "delete", 7: "ignored"})
+    assert result == "# Title\n\nIntro paragraph.\n\n## Setup\n\nNew steps."
+
+
+def test_round_trip_reports_changed_sections():
+    old = split_sections(DRAFT)
+    new = split_sections(apply_section_edits(old, parse_section_edits("[S2]\nShorter setup.\n\nExtra tip.")))
+    assert changed_sections(old, new) == [2, 3]
@@ -0,0 +1,58 @@
+# tests/test_embedding_cache.py
+import pytest
+
+from vectorstore.embedding_cache import CachedEmbeddingFunction, EmbeddingStore
+
+
+class Backend:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts: list) -> list:
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.5, -1.0] for text in texts]
+
+
+@pytest.fixture
+def backend():
+    return Backend()
+
+@pytest.fixture
+def embed(tmp_path, backend):
+    return CachedEmbeddingFunction(backend, "test-model", EmbeddingStore(str(tmp_path / "embeddings")))
+
+
+def test_misses_go_upstream_once_and_are_served_from_the_cache_after(embed, backend):
+    assert embed(["a", "bb"]) == [[1.0, 0.5, -1.0], [2.0, 0.5, -1.0]]
+    assert embed(["bb", "ccc", "a"]) == [[2.0, 0.5, -1.0], [3.0, 0.5, -1.0], [1.0, 0.5, -1.0]]
+    assert backend.calls == [["a", "bb"], ["ccc"]]
+    assert (embed.hits, embed.misses) == (2, 3)
+
+
+def test_repeats_within_a_call_are_one_miss_and_hits(embed, backend):
+    embed(["x", "x", "y"])
+    assert backend.calls == [["x", "y"]]
+    assert (embed.hits, embed.misses) == (1, 2)
+
+
+def test_vectors_survive_a_new_store_instance(tmp_path, embed, backend):
+    embed(["persisted"])
+    again = CachedEmbeddingFunction(backend, "test-model", EmbeddingStore(str(tmp_path / "embeddings")))
+    assert again(["persisted"]) == [[9.0, 0.5, -1.0]] and len(backend.calls) == 1
+
+
+def test_models_are_cached_separately(tmp_path, embed, backend):
+    embed(["same text"])
+    other = CachedEmbeddingFunction(backend, "other-model", EmbeddingStore(str(tmp_path / "embeddings")))
+    other(["same text"])
+    assert len(backend.calls) == 2
+    stats = EmbeddingStore(str(tmp_path / "embeddings")).stats()
+    assert {model: entry["entries"] for model, entry in stats.items()} == {"test-model": 1, "other-model": 1}
+
+
+def test_purge_drops_one_model(tmp_path, embed, backend):
+    embed(["a", "b"])
+    store = EmbeddingStore(str(tmp_path / "embeddings"))
+    assert store.purge("test-model") == 2 and store.stats() == {}
+    embed(["a"])
+    assert backend.calls[-1] == ["a"]
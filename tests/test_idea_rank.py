@@ -0,0 +1,58 @@
+# tests/test_idea_rank.py
+import pytest
+
+pytest.importorskip("numpy")
+
+from core.idea_rank import rank_ideas
+
+VECTORS = {
+    "AI writing assistants for teams": [1.0, 0.1, 0.0],
+    "AI writing tools for teams": [0.98, 0.0, 0.2], # Near-duplicate of the first
+    "Automating invoices with AI": [0.6, 0.8, 0.0],
+    "Gardening tips for spring": [0.0, 0.0, 1.0],
+    "productivity: AI": [1.0, 0.3, 0.0],
+    "AI": [0.9, 0.4, 0.0],
+}
+
+
+def embed(texts: list) -> list:
+    embed.calls.append(list(texts))
+    return [VECTORS[text] for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    embed.calls = []
+
+
+def rank(ideas, **kwargs):
+    return rank_ideas(ideas, "productivity", ["AI"], embed=embed, **kwargs)
+
+
+def test_ranks_by_relevance_and_collapses_near_duplicates():
+    ranking = rank(["Gardening tips for spring", "AI writing tools for teams", "Automating invoices with AI", "AI writing assistants for teams"])
+    assert ranking.ideas == ["AI writing assistants for teams", "Automating invoices with AI", "Gardening tips for spring"]
+    assert ranking.duplicates == {"AI writing tools for teams": "AI writing assistants for teams"}
+    assert ranking.relevance == sorted(ranking.relevance, reverse=True) and ranking.total == 4
+
+
+def test_one_embedding_call_and_exact_repeats_skipped():
+    rank(["Automating invoices with AI", " Automating invoices with AI ", ""])
+    assert embed.calls == [["Automating invoices with AI", "productivity: AI", "AI"]]
+
+
+def test_top_k_limits_distinct_ideas():
+    ranking = rank(list(VECTORS)[:4], top_k=2)
+    assert ranking.ideas == ["AI writing assistants for teams", "Automating invoices with AI"]
+
+
+def test_filter_result_rescales_scores_and_lists_keyword_hits():
+    result = rank(["Gardening tips for spring", "Automating invoices with AI"]).filter_result("productivity")
+    assert result["Idea"] == ["Automating invoices with AI", "Gardening tips for spring"]
+    assert result["Score"] == [1.0, 0.5]
+    assert result["Reasoning"][0].endswith("mentions AI.") and result["Reasoning"][1].endswith("'productivity'.")
+
+
+def test_no_ideas():
+    assert rank([]).ideas == [] and embed.calls == []
+    assert rank([]).filter_result("x") == {"Idea": [], "Score": [], "Reasoning": []}
@@ -0,0 +1,103 @@
+# tests/test_ingest.py
+import json
+import threading
+
+import pytest
+
+from core.sqlite_kv import SQLiteKVStore
+from vectorstore.ingest import Ingestor, chunk_id, chunk_text, content_hash, iter_documents
+
+
+class Collection:
+    """The slice of a Chroma collection the ingestor uses."""
+    name = "research_docs"
+
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, ids, include):
+        return {"ids": [chunk for chunk in ids if chunk in self.rows]}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.rows.update((chunk, metadata) for chunk, metadata in zip(ids, metadatas))
+
+
+class Embedder:
+    def __init__(self):
+        self.texts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock: self.texts += texts
+        return [[0.1, 0.2] for _ in texts]
+
+
+@pytest.fixture
+def state(tmp_path):
+    return SQLiteKVStore(str(tmp_path / "ingest_state.sqlite"))
+
+def doc(key: str, text: str) -> dict:
+    return {"key": key, "text": text, "title": "", "source": key}
+
+def ingest(collection, embed, state, documents, **kwargs) -> dict:
+    return Ingestor(collection, embed, state, **kwargs).run(documents, progress_every=3600)
+
+
+def test_chunk_text_merges_paragraphs_up_to_the_limit():
+    assert chunk_text("One.\n\nTwo.\n\nThree.", chunk_tokens=1000) == ["One.\n\nTwo.\n\nThree."]
+    assert chunk_text("One.\n\nTwo.", chunk_tokens=1) == ["One.", "Two."]
+
+
+def test_iter_documents_reads_jsonl_and_text_files(tmp_path):
+    (tmp_path / "notes.md").write_text("Markdown body.")
+    with open(tmp_path / "feed.jsonl", "w") as f:
+        f.write(json.dumps({"id": "a1", "text": "First.", "title": "A"}) + "\n\nnot json\n" + json.dumps({"body": "Second."}) + "\n")
+    keys = [(d["key"], d["text"]) for d in iter_documents(str(tmp_path))]
+    assert keys == [("a1", "First."), ("feed.jsonl:4", "Second."), ("notes.md", "Markdown body.")]
+
+
+def test_finished_documents_are_skipped_on_the_next_run(state):
+    collection, embed = Collection(), Embedder()
+    documents = [doc("a", "Alpha one.\n\nAlpha two."), doc("b", "Beta.")]
+    first = ingest(collection, embed, state, documents, batch_size=1, chunk_tokens=1)
+    assert (first["documents"], first["chunks_embedded"]) == (2, 3)
+    assert state.get("ingest:research_docs", "a") == content_hash("Alpha one.\n\nAlpha two.")
+    second = ingest(collection, embed, state, documents + [doc("b", "Beta, edited.")], batch_size=1, chunk_tokens=1)
+    assert (second["documents_resumed"], second["documents"], second["chunks_embedded"]) == (2, 1, 1)
+
+
+def test_chunks_already_stored_are_not_embedded_again(state):
+    collection, embed = Collection(), Embedder()
+    ingest(collection, embed, state, [doc("a", "Shared paragraph.")])
+    stats = ingest(collection, embed, state, [doc("b", "Shared paragraph.")])
+    assert (stats["chunks_existing"], stats["chunks_embedded"]) == (1, 0)
+    assert embed.texts == ["Shared paragraph."] and state.get("ingest:research_docs", "b") is not None
+
+
+def test_repeated_keys_do_not_break_bookkeeping(state):
+    collection, embed = Collection(), Embedder()
+    documents = [doc("x", "First version.\n\nMore text."), doc("x", "Second version.")]
+    stats = ingest(collection, embed, state, documents, batch_size=1, chunk_tokens=1)
+    assert stats["documents"] == 2 and len(collection.rows) == 3
+    assert state.get("ingest:research_docs", "x") == content_hash("Second version.") # Last occurrence wins
+
+
+def test_document_waits_for_a_chunk_in_flight_in_another_batch(state):
+    collection, release = Collection(), threading.Event()
+    recorded_before_stored = []
+
+    def embed(texts):
+        if "Slow shared chunk." in texts: release.wait(5)
+        return [[0.1] for _ in texts]
+
+    class WatchedState(SQLiteKVStore):
+        def set(self, namespace, key, value):
+            if chunk_id("Slow shared chunk.") not in collection.rows: recorded_before_stored.append(key)
+            super().set(namespace, key, value)
+
+    watched = WatchedState(state.path)
+    timer = threading.Timer(0.2, release.set); timer.start()
+    ingest(collection, embed, watched, [doc("a", "Slow shared chunk."), doc("b", "Slow shared chunk.")], batch_size=1, workers=2)
+    timer.cancel()
+    assert recorded_before_stored == []
+    assert watched.get("ingest:research_docs", "a") and watched.get("ingest:research_docs", "b")
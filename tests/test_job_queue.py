@@ -0,0 +1,95 @@
+# tests/test_job_queue.py
+import asyncio
+
+import pytest
+
+from core import job_queue, pipeline, run_store, worker
+from core.job_queue import JobQueue
+from core.pipeline import PipelineEvent, PipelineJob
+
+
+@pytest.fixture
+def queue(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(job_queue.time, "time", clock)
+    return JobQueue(str(tmp_path / "queue.sqlite"))
+
+def job(niche: str) -> PipelineJob:
+    return PipelineJob(niche=niche, keywords=[])
+
+
+def test_claim_takes_highest_priority_then_oldest(queue, clock):
+    first = queue.enqueue(job("first")); clock.advance(1)
+    urgent = queue.enqueue(job("urgent"), priority=5); clock.advance(1)
+    queue.enqueue(job("last"))
+    claimed = [queue.claim("w1") for _ in range(3)]
+    assert [(job_id, claimed_job.niche) for job_id, claimed_job in claimed[:2]] == [(urgent, "urgent"), (first, "first")]
+    assert claimed[2][1].niche == "last" and queue.claim("w1") is None
+    record = queue.get(urgent)
+    assert (record["status"], record["worker"], record["attempts"]) == ("running", "w1", 1)
+
+
+def test_a_job_is_claimed_once(queue, tmp_path):
+    queue.enqueue(job("only"))
+    other = JobQueue(str(tmp_path / "queue.sqlite")) # Another process on the same file
+    assert queue.claim("w1") is not None and other.claim("w2") is None
+
+
+def test_cancel_queued_and_running_jobs(queue):
+    queued, running = queue.enqueue(job("a")), queue.enqueue(job("b"))
+    assert queue.cancel(queued) and queue.get(queued)["status"] == "cancelled"
+    queue.claim("w1")
+    assert queue.cancel(running) and queue.get(running)["status"] == "running" # The worker stops it
+    assert queue.heartbeat([running]) == [running]
+    assert not queue.cancel(queued) # Already finished
+
+
+def test_requeue_stale_returns_jobs_without_heartbeat(queue, clock):
+    stale, alive = queue.enqueue(job("stale")), queue.enqueue(job("alive"))
+    queue.claim("w1"); queue.claim("w2")
+    clock.advance(120); queue.heartbeat([alive])
+    assert queue.requeue_stale(timeout=60) == 1
+    assert (queue.get(stale)["status"], queue.get(stale)["worker"]) == ("queued", None)
+    assert queue.get(alive)["status"] == "running"
+
+
+def test_requeue_stale_fails_jobs_after_max_attempts(queue, clock):
+    job_id = queue.enqueue(job("flaky"))
+    for _ in range(3):
+        queue.claim("w1"); clock.advance(120); queue.requeue_stale(timeout=60, max_attempts=3)
+    record = queue.get(job_id)
+    assert (record["status"], record["attempts"]) == ("failed", 3)
+
+
+def test_events_and_streamed_partial_text(queue):
+    job_id = queue.enqueue(job("events"))
+    queue.add_event(job_id, PipelineEvent("research", "start", "Starting research."))
+    queue.add_event(job_id, PipelineEvent("write_draft", "token", "", {"text": "Hello"}))
+    queue.add_event(job_id, PipelineEvent("write_draft", "complete", "Done.", {"words": 1}))
+    events = queue.events(job_id)
+    assert [(step, kind) for _, step, kind, _, _ in events] == [("research", "start"), ("write_draft", "complete")]
+    assert queue.events(job_id, after_id=events[0][0])[0][4] == {"words": 1}
+    assert queue.get(job_id)["partial"] == "Hello"
+    queue.finish(job_id, "completed", {"approved": True})
+    record = queue.get(job_id)
+    assert (record["status"], record["result"], record["partial"]) == ("completed", {"approved": True}, None)
+
+
+def test_cancelled_worker_run_is_stored_as_cancelled(queue, monkeypatch):
+    monkeypatch.setattr(run_store, "_store", None)
+    started = asyncio.Event()
+
+    async def run_forever(job, state, on_event=None):
+        run_store.get_run_store().save(job, state); started.set()
+        await asyncio.sleep(60)
+    monkeypatch.setattr(pipeline, "run_pipeline_async", run_forever)
+
+    async def run():
+        job_id = queue.enqueue(job("stop me")); queue.claim("w1")
+        task = asyncio.create_task(worker.run_claimed(queue, job_id, job("stop me")))
+        await started.wait(); task.cancel(); await task
+        return job_id
+
+    job_id = asyncio.run(run())
+    assert queue.get(job_id)["status"] == "cancelled"
+    assert run_store.get_run_store().list()[0]["status"] == "cancelled"
+    assert run_store.unfinished_state(job("stop me")) is None # An identical job starts fresh
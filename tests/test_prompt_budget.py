@@ -0,0 +1,59 @@
+# tests/test_prompt_budget.py
+import pytest
+
+from core import prompt_budget, routing
+from core.prompt_budget import TRUNCATION_MARK, PromptTooLarge, fit, truncate_text
+from core.tokens import count_tokens
+
+
+@pytest.fixture(autouse=True)
+def small_window(monkeypatch):
+    """boss: 3000-token window - 1000 output reserve - framing overhead."""
+    monkeypatch.setenv("MINDFLOW_CONTEXT_WINDOW", "3000")
+    monkeypatch.setenv("MINDFLOW_PROMPT_BUDGETS", "research=400,feedback=200")
+    routing.get_routes.cache_clear()
+    yield
+    routing.get_routes.cache_clear()
+
+
+def paragraphs(prefix: str, count: int) -> str:
+    return "\n\n".join(f"{prefix} paragraph {i} has a few plain words in it." for i in range(count))
+
+def render(sections: dict) -> tuple:
+    text = f"Review this draft.\n\nDRAFT:\n{sections['draft']}\n\nRESEARCH:\n{sections['research']}\n\nFEEDBACK:\n{sections['feedback']}"
+    return {"description": text}, text
+
+
+def test_prompt_limit_subtracts_reserve_and_overhead():
+    assert prompt_budget.prompt_limit("boss") == (routing.get_route("boss").model, 3000 - 1000 - prompt_budget.PROMPT_OVERHEAD)
+
+
+def test_truncate_keeps_whole_paragraphs_from_the_top():
+    text = paragraphs("Research", 40)
+    cut = truncate_text(text, 100)
+    assert cut.endswith(TRUNCATION_MARK) and count_tokens(cut) <= 100
+    assert text.startswith(cut[:-len(TRUNCATION_MARK)]) and cut[:-len(TRUNCATION_MARK)].endswith("in it.")
+    assert truncate_text("short", 100) == "short"
+
+
+def test_fit_leaves_small_prompts_alone():
+    task, report = fit("validate", "boss", render, {"draft": "Draft.", "research": "Facts.", "feedback": ""})
+    assert report["truncated"] == {} and "Facts." in task["description"]
+
+
+def test_fit_applies_section_caps():
+    _, report = fit("validate", "boss", render, {"draft": "Draft.", "research": paragraphs("Research", 200), "feedback": ""})
+    before, after = report["truncated"]["research"]
+    assert before > 400 >= after
+
+
+def test_fit_shrinks_research_before_feedback_to_fit_the_window():
+    draft = paragraphs("Draft", 120)
+    task, report = fit("revise", "boss", render, {"draft": draft, "research": paragraphs("Research", 60), "feedback": paragraphs("Feedback", 15)})
+    assert report["tokens"] <= report["limit"]
+    assert draft in task["description"] # The draft is never cut
+    assert report["truncated"]["research"][1] < 400 # Cut below its cap to make room
+
+
+def test_fit_refuses_when_the_draft_alone_is_too_large():
+    with pytest.raises(PromptTooLarge): fit("validate", "boss", render, {"draft": paragraphs("Draft", 200), "research": "", "feedback": ""})
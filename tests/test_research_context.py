@@ -0,0 +1,48 @@
+# tests/test_research_context.py
+from core.research_context import ResearchContext
+
+PRICING = "Pricing for the starter plan begins at ten dollars per seat each month, billed annually."
+SECURITY = "Security audits happen quarterly and every customer database is encrypted at rest."
+ADOPTION = "Adoption grew fastest among remote teams that replaced spreadsheets with shared dashboards."
+
+
+def make_context(**kwargs) -> ResearchContext:
+    return ResearchContext.from_text("\n\n".join([PRICING, SECURITY, ADOPTION]), chunk_tokens=1, **kwargs)
+
+
+def test_paragraphs_become_chunks_with_a_summary():
+    context = make_context()
+    assert [chunk["text"] for chunk in context.chunks] == [PRICING, SECURITY, ADOPTION]
+    assert context.summary and context.total_tokens > 0
+
+
+def test_exact_and_near_duplicates_are_dropped():
+    context = make_context()
+    assert context.add(PRICING.upper(), "revision 1") == 0 # Same terms, different case
+    assert context.add("Note: " + SECURITY, "revision 1") == 0 # Shingle overlap above the threshold
+    assert context.add("Churn fell after onboarding calls were added for every new account.", "revision 1") == 1
+    assert context.duplicates_dropped == 2
+
+
+def test_full_text_marks_additional_sources():
+    context = make_context()
+    context.add("Churn fell after onboarding calls were added for every new account.", "revision 1")
+    assert context.full_text().endswith("Additional Research (revision 1):\n\nChurn fell after onboarding calls were added for every new account.")
+
+
+def test_select_returns_everything_when_it_fits():
+    context = make_context()
+    assert context.select("pricing", budget=10_000) == context.full_text()
+
+
+def test_select_keeps_the_chunks_relevant_to_the_feedback_within_budget():
+    context = make_context(summary_budget=1)
+    budget = max(chunk["tokens"] for chunk in context.chunks) + 1
+    selected = context.select("How is customer data encrypted? Mention the security audits.", budget)
+    assert SECURITY in selected and PRICING not in selected and ADOPTION not in selected
+
+
+def test_round_trips_through_dict():
+    context = make_context()
+    restored = ResearchContext.from_dict(context.to_dict())
+    assert restored.full_text() == context.full_text() and restored.summary == context.summary
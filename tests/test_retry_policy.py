@@ -0,0 +1,159 @@
+# tests/test_retry_policy.py
+import asyncio
+
+import pytest
+
+from core import retry_policy
+from core.retry_policy import CircuitBreaker, CircuitOpenError, RetryBudgetExceeded, adaptive_retry, backoff, classify, retry_after, step_budget
+
+
+class APIError(Exception):
+    def __init__(self, status_code: int = None, headers: dict = None, message: str = "error"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setenv("MINDFLOW_RETRY_BASE_DELAY", "0.001")
+    monkeypatch.setenv("MINDFLOW_RETRY_MAX_DELAY", "0.001")
+    monkeypatch.setenv("MINDFLOW_RETRY_MAX_ATTEMPTS", "3")
+    monkeypatch.setenv("MINDFLOW_BREAKER_FAILURES", "2")
+    monkeypatch.setattr(retry_policy, "_breakers", {})
+
+
+@pytest.mark.parametrize("error, kind", [
+    (APIError(429), "rate_limit"),
+    (APIError(503), "server"),
+    (APIError(408), "server"),
+    (APIError(400), "fatal"),
+    (APIError(401), "fatal"),
+    (asyncio.TimeoutError(), "timeout"),
+    (ConnectionError(), "connection"),
+    (ValueError("bad json"), "fatal"),
+    (CircuitOpenError(), "fatal"),
+])
+def test_classify(error, kind):
+    assert classify(error) == kind
+
+
+def test_retry_after_prefers_headers_then_message():
+    assert retry_after(APIError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(APIError(429, {"retry-after": "7"})) == 7.0
+    assert retry_after(APIError(429, message="Rate limit reached. Please try again in 250ms.")) == 0.25
+    assert retry_after(APIError(429)) is None
+
+
+def test_backoff_is_full_jitter_capped_at_max_delay():
+    for attempt in range(8):
+        assert 0 <= backoff(attempt, 1.0, 10.0) <= min(10.0, 2 ** attempt)
+
+
+def test_breaker_opens_after_consecutive_failures_and_closes_on_probe(clock, monkeypatch):
+    monkeypatch.setattr(retry_policy.time, "monotonic", clock)
+    breaker = CircuitBreaker("test", failures=2, cooldown=30)
+    breaker.record_failure("server"); breaker.before_call()
+    breaker.record_failure("server")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError): breaker.before_call()
+    clock.advance(31)
+    breaker.before_call() # The probe
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError): breaker.before_call() # Only one probe at a time
+    breaker.record_success()
+    assert (breaker.state, breaker.consecutive) == ("closed", 0)
+
+
+def test_failed_probe_reopens_breaker(clock, monkeypatch):
+    monkeypatch.setattr(retry_policy.time, "monotonic", clock)
+    breaker = CircuitBreaker("test", failures=1, cooldown=30)
+    breaker.record_failure("timeout"); clock.advance(31); breaker.before_call()
+    breaker.record_failure("timeout")
+    assert breaker.state == "open" and breaker.remaining() == 30
+
+
+def test_rate_limits_do_not_count_towards_opening():
+    breaker = CircuitBreaker("test", failures=1)
+    breaker.record_failure("rate_limit")
+    assert breaker.state == "closed"
+
+
+def test_only_an_answered_fatal_error_closes_the_breaker(clock, monkeypatch):
+    monkeypatch.setattr(retry_policy.time, "monotonic", clock)
+    breaker = CircuitBreaker("test", failures=1, cooldown=30)
+    breaker.record_failure("connection"); clock.advance(31); breaker.before_call()
+    breaker.record_failure("fatal") # Local error during the probe: provider health unknown
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    breaker.record_failure("fatal", answered=True) # e.g. a 400: the provider is up
+    assert breaker.state == "closed"
+
+
+def test_adaptive_retry_retries_transient_errors_then_succeeds():
+    calls = []
+
+    @adaptive_retry
+    async def call():
+        calls.append(1)
+        if len(calls) < 3: raise APIError(429, {"retry-after-ms": "1"})
+        return "ok"
+
+    assert asyncio.run(call()) == "ok" and len(calls) == 3
+
+
+def test_adaptive_retry_does_not_retry_fatal_errors():
+    calls = []
+
+    @adaptive_retry
+    async def call():
+        calls.append(1); raise APIError(400)
+
+    with pytest.raises(APIError): asyncio.run(call())
+    assert len(calls) == 1
+
+
+def test_adaptive_retry_gives_up_after_max_attempts():
+    calls = []
+
+    @adaptive_retry(breaker="other")
+    async def call():
+        calls.append(1); raise APIError(429)
+
+    with pytest.raises(APIError): asyncio.run(call())
+    assert len(calls) == 3
+
+
+def test_adaptive_retry_stops_when_the_breaker_opens():
+    calls = []
+
+    @adaptive_retry
+    async def call():
+        calls.append(1); raise APIError(500)
+
+    with pytest.raises(APIError): asyncio.run(call())
+    assert len(calls) == 2 # MINDFLOW_BREAKER_FAILURES=2 trips before the third attempt
+    with pytest.raises(CircuitOpenError): asyncio.run(call())
+    assert len(calls) == 2
+
+
+def test_step_deadline_cuts_off_a_cancellable_call():
+    @adaptive_retry
+    async def call():
+        await asyncio.sleep(1)
+
+    async def run():
+        with step_budget(deadline=0.05): await call()
+
+    with pytest.raises(RetryBudgetExceeded): asyncio.run(run())
+
+
+def test_step_deadline_is_advisory_for_non_cancellable_calls():
+    @adaptive_retry(cancellable=False)
+    async def call():
+        await asyncio.sleep(0.1); return "finished"
+
+    async def run():
+        with step_budget(deadline=0.05): return await call()
+
+    assert asyncio.run(run()) == "finished"
@@ -0,0 +1,75 @@
+# tests/test_run_store.py
+import pytest
+
+from core import run_store
+from core.pipeline import PipelineJob, PipelineState
+from core.research_context import ResearchContext
+from core.run_store import STALE_RUN_SECONDS, RunStore, restore_state
+
+
+@pytest.fixture
+def store(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(run_store.time, "time", clock)
+    return RunStore(str(tmp_path / "runs.sqlite"))
+
+def job(niche: str = "AI") -> PipelineJob:
+    return PipelineJob(niche=niche, keywords=["LLMs"])
+
+def save(store, run_id: str, status: str = "running", niche: str = "AI", step: str = "research") -> PipelineState:
+    state = PipelineState(); state.run_id = run_id; state.pipeline_step = step
+    store.save(job(niche), state, status=status)
+    return state
+
+
+def test_save_and_load_round_trip(store):
+    state = PipelineState(); state.run_id = "run1"; state.pipeline_step = "revision_loop"; state.revision_count = 2
+    state.research_context = ResearchContext.from_text("Fact one.\n\nFact two.")
+    store.save(job(), state)
+    loaded_job, data, step = store.load("run")
+    restored = restore_state(data)
+    assert (loaded_job, step) == (job(), "revision_loop")
+    assert restored.revision_count == 2 and restored.research_context.full_text() == state.research_context.full_text()
+
+
+def test_load_needs_a_unique_prefix(store):
+    save(store, "abc1"); save(store, "abc2")
+    assert store.load("abc") is None and store.load("abc2") is not None
+
+
+def test_mark_keeps_the_checkpoint(store):
+    save(store, "run1", step="write_draft")
+    store.mark("run1", "failed", "boom")
+    assert store.load("run1")[2] == "write_draft"
+    assert store.list()[0]["status"] == "failed" and store.list()[0]["error"] == "boom"
+
+
+def test_find_unfinished_matches_failed_or_stale_runs_with_equal_inputs(store, clock):
+    save(store, "done", status="completed")
+    assert store.find_unfinished(job()) is None
+    save(store, "live")
+    assert store.find_unfinished(job()) is None # Still checkpointing: another process owns it
+    clock.advance(STALE_RUN_SECONDS + 1)
+    assert store.find_unfinished(job()) == "live"
+    save(store, "failed", status="failed")
+    assert store.find_unfinished(job()) == "failed" # Most recent first
+    assert store.find_unfinished(job("Other niche")) is None
+
+
+def test_cancelled_runs_are_not_unfinished(store, clock):
+    save(store, "stopped"); store.mark("stopped", "cancelled", "Cancelled by user.")
+    clock.advance(STALE_RUN_SECONDS + 1)
+    assert store.find_unfinished(job()) is None and store.list(unfinished=True) == []
+
+
+def test_list_unfinished_uses_the_same_rule(store, clock):
+    save(store, "old")
+    clock.advance(STALE_RUN_SECONDS + 1)
+    save(store, "live"); save(store, "failed", status="failed"); save(store, "done", status="completed")
+    assert [run["run_id"] for run in store.list(unfinished=True)] == ["failed", "old"]
+
+
+def test_gc_removes_old_finished_runs_only(store, clock):
+    save(store, "done", status="completed"); save(store, "stopped", status="cancelled"); save(store, "live")
+    clock.advance(8 * 86400)
+    assert store.gc(older_than_days=7) == 2
+    assert [run["run_id"] for run in store.list()] == ["live"]
@@ -0,0 +1,72 @@
+# tests/test_sqlite_kv.py
+from core import sqlite_kv
+from core.sqlite_kv import SQLiteKVStore
+
+
+def make_store(tmp_path, **kwargs) -> SQLiteKVStore:
+    return SQLiteKVStore(str(tmp_path / "kv.sqlite"), **kwargs)
+
+
+def test_get_returns_value_and_counts_hits_and_misses(tmp_path):
+    store = make_store(tmp_path)
+    store.set("writer", "a", "1")
+    assert store.get("writer", "a") == "1"
+    assert store.get("writer", "missing") is None
+    stats = store.stats()["writer"]
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 1, 0.5)
+
+
+def test_namespaces_are_separate(tmp_path):
+    store = make_store(tmp_path)
+    store.set("writer", "a", "w"); store.set("boss", "a", "b")
+    assert (store.get("writer", "a"), store.get("boss", "a")) == ("w", "b")
+    assert store.purge("writer") == 1
+    assert store.get("writer", "a") is None and store.get("boss", "a") == "b"
+
+
+def test_expired_entry_is_a_miss_and_an_eviction(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(sqlite_kv.time, "time", clock)
+    store = make_store(tmp_path, ttl_seconds=60)
+    store.set("idea", "a", "1")
+    clock.advance(30)
+    assert store.get("idea", "a") == "1"
+    clock.advance(31) # Age counts from creation, not last access
+    assert store.get("idea", "a") is None
+    stats = store.stats()["idea"]
+    assert (stats["entries"], stats["misses"], stats["evictions"]) == (0, 1, 1)
+
+
+def test_evict_drops_expired_entries(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(sqlite_kv.time, "time", clock)
+    store = make_store(tmp_path, ttl_seconds=60)
+    store.set("idea", "old", "1")
+    clock.advance(45); store.set("idea", "new", "2")
+    clock.advance(30)
+    assert store.evict() == 1
+    assert [key for _, key, *_ in store.entries()] == ["new"]
+
+
+def test_evict_keeps_most_recently_used_entries(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(sqlite_kv.time, "time", clock)
+    store = make_store(tmp_path, max_entries=2)
+    for key in "abc":
+        store.set("research", key, key); clock.advance(1)
+    store.get("research", "a"); clock.advance(1) # "a" is now more recent than "b"
+    assert store.evict() == 1
+    assert sorted(key for _, key, *_ in store.entries()) == ["a", "c"]
+    assert store.stats()["research"]["evictions"] == 1
+
+
+def test_set_trims_every_evict_every_writes(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(sqlite_kv.time, "time", clock)
+    store = make_store(tmp_path, max_entries=2, evict_every=4)
+    for key in "abc":
+        store.set("filter", key, key); clock.advance(1)
+    assert len(store.entries()) == 3 # Not trimmed until the 4th write
+    store.set("filter", "d", "d")
+    assert sorted(key for _, key, *_ in store.entries()) == ["c", "d"]
+
+
+def test_store_is_shared_across_instances(tmp_path):
+    make_store(tmp_path).set("boss", "k", "v")
+    assert make_store(tmp_path).get("boss", "k") == "v"
@@ -1,46 +1,56 @@
 # vectorstore/chroma_setup.py
-import chromadb
-from chromadb.utils import embedding_functions
-import os
-from dotenv import load_dotenv
+# chromadb is imported inside the functions: it is slow to import and only needed once research runs.
+from core.config import get_settings
 
-# Load environment variables specifically for this module if needed
-load_dotenv()
+_client = None
+_embedding_function = None
 
-# Note: This setup seems unused by the agent logic provided so far.
-# Ensure agents have a tool or mechanism to interact with this if needed.
-def get_collection():
-    """
-    Initialize ChromaDB client and return a collection 'research_docs'.
-    Populates with dummy documents if empty.
-    Returns None if initialization fails.
-    """
-    chroma_openai_api_key = os.getenv("OPENAI_API_KEY")
+def get_client():
+    """Returns the process-wide persistent ChromaDB client."""
+    global _client
+    if _client is None:
+        import chromadb
+        # Ensure the directory exists or ChromaDB can create it
+        _client = chromadb.PersistentClient(path=get_settings().chroma_path)
+    return _client
+
+def get_embedding_function():
+    """OpenAI embedding function shared by all collections, behind the on-disk embedding cache (vectorstore/embedding_cache.py)."""
+    global _embedding_function
+    if _embedding_function is not None: return _embedding_function
+    from chromadb.utils import embedding_functions
+    settings = get_settings()
+    chroma_openai_api_key = settings.openai_api_key
     if not chroma_openai_api_key:
         print("Warning: OPENAI_API_KEY not found for ChromaDB embedding function.")
-        # Decide error handling: raise error, return None, or use default key if applicable
         raise ValueError("Missing OPENAI_API_KEY required for ChromaDB embeddings.")
+    backend = embedding_functions.OpenAIEmbeddingFunction(
+        api_key=chroma_openai_api_key,
+        api_base=settings.openai_base_url,
+        model_name=settings.embedding_model
+    )
+    if settings.embedding_cache:
+        from vectorstore.embedding_cache import CachedEmbeddingFunction, EmbeddingStore
+        backend = CachedEmbeddingFunction(backend, settings.embedding_model, EmbeddingStore(settings.embedding_cache_dir))
+    _embedding_function = backend
+    return _embedding_function
 
+def get_collection(seed: bool = True):
+    """
+    Initialize ChromaDB client and return a collection 'research_docs'.
+    Populates with dummy documents if empty (unless seed=False, as used by vectorstore/ingest.py).
+    Returns None if initialization fails.
+    """
     try:
-        # Define OpenAI embedding function within the function scope
-        openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=chroma_openai_api_key,
-            model_name="text-embedding-ada-002"
-        )
-
-        # Initialize ChromaDB client with persistent storage
-        # Ensure the directory exists or ChromaDB can create it
-        client = chromadb.PersistentClient(path="./chroma_data")
-
         # Get or create a collection
-        collection = client.get_or_create_collection(
+        collection = get_client().get_or_create_collection(
             name="research_docs",
-            embedding_function=openai_ef
+            embedding_function=get_embedding_function()
             # Consider adding metadata={"hnsw:space": "cosine"} for cosine similarity
         )
 
         # If the collection is empty, add dummy documents
-        if collection.count() == 0:
+        if seed and collection.count() == 0:
             print("ChromaDB collection 'research_docs' is empty. Adding dummy documents.")
             documents = [
                 "Search Engine Optimization (SEO) is crucial for improving website visibility and ranking on search engines like Google. Keywords are fundamental.",
@@ -65,4 +75,20 @@ def get_collection():
         print(f"Error initializing ChromaDB or adding documents: {e}")
         import traceback
         traceback.print_exc() # Print full traceback for debugging
-        return None
\ No newline at end of file
+        return None
+
+def get_research_memory_collection():
+    """
+    Collection 'research_memory': one entry per researched idea, embedded on the idea text,
+    with the research summary in metadata. Uses cosine distance so 1 - distance is similarity.
+    Returns None if initialization fails.
+    """
+    try:
+        return get_client().get_or_create_collection(
+            name="research_memory",
+            embedding_function=get_embedding_function(),
+            metadata={"hnsw:space": "cosine"}
+        )
+    except Exception as e:
+        print(f"Error initializing ChromaDB research memory: {e}")
+        return None
@@ -0,0 +1,151 @@
+# vectorstore/embedding_cache.py
+"""
+Content-addressed cache in front of any embedding function.
+
+Vectors are keyed by sha256(model + text) and stored as raw float32 rows in one append-only file
+per model (<dir>/<model>.f32), with a SQLite index (<dir>/index.sqlite) mapping key -> byte offset.
+Each call looks up all texts in one query and sends only the misses, deduplicated, to the backend
+in a single call, so re-ingests and repeated queries cost no embedding time.
+
+    python -m vectorstore.embedding_cache stats
+    python -m vectorstore.embedding_cache purge --model text-embedding-ada-002
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from array import array
+
+from core import telemetry
+
+LOOKUP_CHUNK = 500 # Keys per SELECT (stays under SQLite's parameter limit)
+
+
+def text_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """float32 vectors in per-model append-only files, indexed by content key. Safe across threads and processes."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, "index.sqlite")
+        self._local = threading.local()
+        self._conn().execute("""CREATE TABLE IF NOT EXISTS vectors (
+            model TEXT NOT NULL, key TEXT NOT NULL, offset INTEGER NOT NULL, dim INTEGER NOT NULL,
+            PRIMARY KEY (model, key))""")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def data_path(self, model: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w.\-]", "_", model) + ".f32")
+
+    def _offsets(self, conn, model: str, keys: list) -> dict:
+        rows = {}
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[i:i + LOOKUP_CHUNK]
+            query = f"SELECT key, offset, dim FROM vectors WHERE model = ? AND key IN ({','.join('?' * len(chunk))})"
+            rows.update((key, (offset, dim)) for key, offset, dim in conn.execute(query, [model, *chunk]))
+        return rows
+
+    def get_many(self, model: str, keys: list) -> dict:
+        """key -> list of floats for every stored key (reads in file order)."""
+        found = self._offsets(self._conn(), model, list(dict.fromkeys(keys)))
+        if not found: return {}
+        vectors = {}
+        with open(self.data_path(model), "rb") as f:
+            for key, (offset, dim) in sorted(found.items(), key=lambda item: item[1][0]):
+                f.seek(offset); row = array("f"); row.frombytes(f.read(dim * 4))
+                vectors[key] = row.tolist()
+        return vectors
+
+    def put_many(self, model: str, vectors: dict):
+        """Appends key -> vector pairs not already stored. The index is committed after the bytes are on disk."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE") # Serialises appenders across processes
+        try:
+            existing = self._offsets(conn, model, list(vectors))
+            rows = []
+            with open(self.data_path(model), "ab") as f:
+                for key, vector in vectors.items():
+                    if key in existing: continue
+                    data = array("f", (float(v) for v in vector))
+                    rows.append((model, key, f.tell(), len(data))); f.write(data.tobytes())
+                f.flush(); os.fsync(f.fileno())
+            conn.executemany("INSERT OR IGNORE INTO vectors (model, key, offset, dim) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK"); raise
+
+    def stats(self) -> dict:
+        result = {}
+        for model, entries, dim in self._conn().execute("SELECT model, COUNT(*), MAX(dim) FROM vectors GROUP BY model"):
+            path = self.data_path(model)
+            result[model] = {"entries": entries, "dim": dim, "bytes": os.path.getsize(path) if os.path.exists(path) else 0}
+        return result
+
+    def purge(self, model: str = None) -> int:
+        """Deletes the vectors of one model (or all). Returns entries removed."""
+        conn = self._conn()
+        models = [model] if model else [row[0] for row in conn.execute("SELECT DISTINCT model FROM vectors")]
+        removed = 0
+        for name in models:
+            removed += conn.execute("DELETE FROM vectors WHERE model = ?", (name,)).rowcount
+            if os.path.exists(self.data_path(name)): os.remove(self.data_path(name))
+        return removed
+
+
+class CachedEmbeddingFunction:
+    """Chroma-compatible embedding function: cache hits are served locally, misses go to `backend` in one batched call."""
+
+    def __init__(self, backend, model: str, store: EmbeddingStore):
+        self.backend = backend
+        self.model = model
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, input):
+        texts = [str(text) for text in input]
+        keys = [text_key(self.model, text) for text in texts]
+        cached = self.store.get_many(self.model, keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached} # Deduplicated misses
+        if missing:
+            fresh = dict(zip(missing, self.backend(list(missing.values()))))
+            self.store.put_many(self.model, fresh)
+            cached.update({key: [float(v) for v in vector] for key, vector in fresh.items()})
+        misses = len(missing) # One per text sent upstream; repeats within the call are served from it, i.e. hits
+        hits = len(texts) - misses
+        with self._lock: self.hits += hits; self.misses += misses
+        if hits: telemetry.increment("mindflow_embedding_cache_total", hits, outcome="hit")
+        if misses: telemetry.increment("mindflow_embedding_cache_total", misses, outcome="miss")
+        return [cached[key] for key in keys]
+
+
+def main(argv=None):
+    from core.config import get_settings
+    parser = argparse.ArgumentParser(prog="python -m vectorstore.embedding_cache", description="Inspect or purge the embedding cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Entries and size per model.")
+    purge = sub.add_parser("purge", help="Delete cached vectors.")
+    purge.add_argument("--model", help="Only this embedding model.")
+    args = parser.parse_args(argv)
+    store = EmbeddingStore(get_settings().embedding_cache_dir)
+    if args.command == "stats":
+        stats = store.stats()
+        if not stats: print("Embedding cache is empty.")
+        for model, entry in stats.items(): print(f"{model:<32} {entry['entries']:>8} vectors  dim {entry['dim']}  {entry['bytes'] / 2 ** 20:.1f} MB")
+    else: print(f"Removed {store.purge(args.model)} vectors.")
+
+if __name__ == "__main__":
+    main()
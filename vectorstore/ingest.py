@@ -0,0 +1,209 @@
+# vectorstore/ingest.py
+"""
+Bulk ingestion of source documents into the research_docs collection.
+
+    python -m vectorstore.ingest articles/                  # .md / .txt / .jsonl files, recursively
+    python -m vectorstore.ingest articles.jsonl --workers 8 --batch-size 256
+    python -m vectorstore.ingest articles.jsonl --fresh     # ignore the resume state
+
+JSONL records need "text" (or "content" / "body") and may carry "id" (or "url"), "title" and "source".
+Documents are split into ~chunk-tokens chunks, embedded in large batches on a bounded thread pool and
+upserted with their precomputed embeddings. Chunk ids are content hashes, so chunks already in the
+collection are never embedded again. Finished documents are recorded in .mindflow/ingest_state.sqlite;
+an interrupted run picks up where it stopped.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from core.config import get_settings
+from core.sqlite_kv import SQLiteKVStore
+from core.tokens import count_tokens
+
+TEXT_SUFFIXES = (".md", ".markdown", ".txt")
+
+
+def chunk_id(text: str) -> str:
+    return "chunk_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_text(text: str, chunk_tokens: int = 300) -> list:
+    """Paragraph-merging chunker; paragraphs longer than chunk_tokens are split on sentence boundaries."""
+    pieces = []
+    for paragraph in (p.strip() for p in re.split(r"\n\s*\n", text or "") if p.strip()):
+        if count_tokens(paragraph) <= chunk_tokens: pieces.append(paragraph)
+        else: pieces.extend(s.strip() for s in re.split(r"(?<=[.!?])\s+", paragraph) if s.strip())
+    chunks, current = [], ""
+    for piece in pieces:
+        candidate = f"{current}\n\n{piece}" if current else piece
+        if current and count_tokens(candidate) > chunk_tokens: chunks.append(current); current = piece
+        else: current = candidate
+    if current: chunks.append(current)
+    return chunks
+
+
+# --- Sources ---
+def _jsonl_documents(path: str, label: str):
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip(): continue
+            try: record = json.loads(line)
+            except json.JSONDecodeError as e: print(f"Skipping {label}:{line_no}: invalid JSON ({e})"); continue
+            text = record.get("text") or record.get("content") or record.get("body")
+            if not text: continue
+            key = str(record.get("id") or record.get("url") or f"{label}:{line_no}")
+            yield {"key": key, "text": str(text), "title": str(record.get("title") or ""), "source": str(record.get("source") or record.get("url") or label)}
+
+def iter_documents(path: str):
+    """Yields {"key", "text", "title", "source"} from a JSONL file, a text file or a directory of them."""
+    if os.path.isfile(path):
+        if path.lower().endswith(".jsonl"): yield from _jsonl_documents(path, os.path.basename(path))
+        else:
+            with open(path, encoding="utf-8", errors="replace") as f: yield {"key": os.path.basename(path), "text": f.read(), "title": "", "source": os.path.basename(path)}
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name); relative = os.path.relpath(full, path)
+            if name.lower().endswith(".jsonl"): yield from _jsonl_documents(full, relative)
+            elif name.lower().endswith(TEXT_SUFFIXES):
+                with open(full, encoding="utf-8", errors="replace") as f: yield {"key": relative, "text": f.read(), "title": os.path.splitext(name)[0], "source": relative}
+
+
+class Ingestor:
+    """Chunks, embeds and upserts documents. embed(texts) -> vectors runs on `workers` threads; Chroma writes stay on the caller's thread."""
+
+    def __init__(self, collection, embed, state: SQLiteKVStore = None, batch_size: int = 128, workers: int = 4, chunk_tokens: int = 300):
+        self.collection = collection
+        self.embed = embed
+        self.state = state # None = no resume bookkeeping
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.chunk_tokens = chunk_tokens
+        self.namespace = f"ingest:{collection.name}"
+        self.stats = {"documents": 0, "documents_resumed": 0, "chunks": 0, "chunks_embedded": 0, "chunks_existing": 0, "embedding_calls": 0}
+        self._seen = set() # Chunk ids embedded (or in flight) during this run
+        self._in_flight = {} # chunk id -> batch embedding it (until that batch is stored)
+        self._pending = {} # doc sequence number -> [unfinished batches, doc key, content hash, all chunks batched]
+        self._latest = {} # doc key -> sequence number of its last occurrence (a key may repeat across files / records)
+        self._doc_seq = itertools.count()
+
+    def _batches(self, documents):
+        """Groups chunks of consecutive documents into batches of batch_size (dedup by chunk id within a batch)."""
+        batch, batch_docs = {}, set()
+        for document in documents:
+            digest = content_hash(document["text"])
+            if self.state is not None and self.state.get(self.namespace, document["key"]) == digest:
+                self.stats["documents_resumed"] += 1; continue
+            self.stats["documents"] += 1
+            chunks = chunk_text(document["text"], self.chunk_tokens)
+            seq = next(self._doc_seq); self._latest[document["key"]] = seq
+            pending = self._pending[seq] = [0, document["key"], digest, False]
+            for index, text in enumerate(chunks):
+                self.stats["chunks"] += 1
+                metadata = {"source": document["source"], "title": document["title"], "doc": document["key"], "chunk": index}
+                entry = batch.setdefault(chunk_id(text), {"text": text, "metadata": metadata, "docs": set()})
+                entry["docs"].add(seq)
+                if seq not in batch_docs: batch_docs.add(seq); pending[0] += 1
+                if len(batch) >= self.batch_size: yield batch; batch, batch_docs = {}, set()
+            pending[3] = True; self._finish_document(seq)
+        if batch: yield batch
+
+    def _finish_document(self, seq: int):
+        """Records the document for resume once all of its chunks are stored. Only the last occurrence of a key is recorded."""
+        remaining, key, digest, batched = self._pending[seq]
+        if remaining == 0 and batched:
+            del self._pending[seq]
+            if self._latest.get(key) == seq:
+                del self._latest[key]
+                if self.state is not None: self.state.set(self.namespace, key, digest)
+
+    def _new_chunks(self, batch: dict) -> dict:
+        """Drops chunks whose content-hash id is already stored or in flight: those never reach the embedder.
+        Documents sharing an in-flight chunk wait for the batch embedding it before they are recorded."""
+        for chunk in batch:
+            owner = self._in_flight.get(chunk)
+            if owner is None: continue
+            owner_docs = {seq for entry in owner.values() for seq in entry["docs"]}
+            for seq in batch[chunk]["docs"] - owner_docs: self._pending[seq][0] += 1
+            owner[chunk]["docs"] |= batch[chunk]["docs"]
+        unseen = [chunk for chunk in batch if chunk not in self._seen]
+        existing = set(self.collection.get(ids=unseen, include=[])["ids"]) if unseen else set()
+        new = {chunk: batch[chunk] for chunk in unseen if chunk not in existing}
+        self._seen.update(new)
+        self._in_flight.update((chunk, batch) for chunk in new)
+        self.stats["chunks_existing"] += len(batch) - len(new)
+        return new
+
+    def _embed(self, chunks: dict) -> tuple:
+        ids = list(chunks)
+        return ids, self.embed([chunks[chunk]["text"] for chunk in ids])
+
+    def _complete(self, batch: dict, ids: list, vectors):
+        if ids:
+            self.collection.upsert(ids=ids, embeddings=[list(map(float, v)) for v in vectors],
+                                   documents=[batch[chunk]["text"] for chunk in ids], metadatas=[batch[chunk]["metadata"] for chunk in ids])
+            self.stats["chunks_embedded"] += len(ids); self.stats["embedding_calls"] += 1
+        for chunk in ids: self._in_flight.pop(chunk, None)
+        for seq in {seq for entry in batch.values() for seq in entry["docs"]}:
+            self._pending[seq][0] -= 1; self._finish_document(seq)
+
+    def run(self, documents, progress_every: float = 5.0) -> dict:
+        start = last_report = time.perf_counter()
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest") as pool:
+            for batch in self._batches(documents):
+                new = self._new_chunks(batch)
+                if not new: self._complete(batch, [], []); continue
+                while len(in_flight) >= self.workers * 2: # Bounded queue: at most 2 batches waiting per worker
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done: self._complete(in_flight.pop(future), *future.result())
+                in_flight[pool.submit(self._embed, new)] = batch
+                if time.perf_counter() - last_report >= progress_every:
+                    last_report = time.perf_counter(); print(self._progress(last_report - start))
+            for future in list(in_flight): self._complete(in_flight.pop(future), *future.result())
+        return self.summary(time.perf_counter() - start)
+
+    def _progress(self, elapsed: float) -> str:
+        return f"{self.stats['documents']} docs, {self.stats['chunks_embedded']} chunks embedded, {self.stats['chunks_existing']} already stored ({self.stats['documents'] / max(elapsed, 1e-9):.1f} docs/s)"
+
+    def summary(self, elapsed: float) -> dict:
+        stats = dict(self.stats)
+        stats.update(seconds=round(elapsed, 2), docs_per_sec=round(stats["documents"] / elapsed, 2) if elapsed else 0.0,
+                     embeddings_saved=stats["chunks_existing"], embedding_calls_saved=-(-stats["chunks_existing"] // self.batch_size))
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m vectorstore.ingest", description="Bulk-load documents into the research_docs collection.")
+    parser.add_argument("path", help="Directory of .md/.txt/.jsonl files, or a single JSONL / text file.")
+    parser.add_argument("--batch-size", type=int, default=128, help="Chunks per embedding call.")
+    parser.add_argument("--workers", type=int, default=4, help="Embedding calls in flight at once.")
+    parser.add_argument("--chunk-tokens", type=int, default=300)
+    parser.add_argument("--fresh", action="store_true", help="Ignore (and reset) the resume state for this collection.")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args(argv)
+
+    from vectorstore.chroma_setup import get_collection, get_embedding_function
+    collection = get_collection(seed=False)
+    if collection is None: raise SystemExit("Could not open the research_docs collection.")
+    state = SQLiteKVStore(os.path.join(get_settings().data_dir, "ingest_state.sqlite"), table="ingested")
+    ingestor = Ingestor(collection, get_embedding_function(), state, args.batch_size, args.workers, args.chunk_tokens)
+    if args.fresh: state.purge(ingestor.namespace)
+    try: summary = ingestor.run(iter_documents(args.path))
+    except KeyboardInterrupt:
+        print("Interrupted. Finished documents are recorded; rerun the same command to resume."); return
+    if args.json: print(json.dumps(summary, indent=2)); return
+    print(f"Ingested {summary['documents']} documents ({summary['chunks']} chunks) in {summary['seconds']}s, {summary['docs_per_sec']} docs/s")
+    print(f"Embedded {summary['chunks_embedded']} chunks in {summary['embedding_calls']} calls; {summary['embeddings_saved']} chunks already stored "
+          f"(~{summary['embedding_calls_saved']} calls saved), {summary['documents_resumed']} unchanged documents skipped by resume state")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# vectorstore/research_memory.py
+"""
+Semantic reuse of past research.
+
+Research summaries are stored in Chroma keyed by the idea's embedding. A new idea that is
+close enough to an earlier one reuses the stored research outright (>= reuse threshold) or
+only needs a top-up pass (>= top-up threshold), instead of a cold research call.
+"""
+import hashlib
+import threading
+import time
+
+from core.config import get_settings
+from vectorstore.chroma_setup import get_collection, get_research_memory_collection
+
+DEFAULT_REUSE_THRESHOLD = 0.92
+DEFAULT_TOPUP_THRESHOLD = 0.80
+
+
+class ResearchMemory:
+    """Stores and looks up research summaries by idea similarity."""
+
+    def __init__(self, memory_collection, docs_collection=None, reuse_threshold: float = DEFAULT_REUSE_THRESHOLD, topup_threshold: float = DEFAULT_TOPUP_THRESHOLD):
+        self.memory = memory_collection
+        self.docs = docs_collection
+        self.reuse_threshold = reuse_threshold
+        self.topup_threshold = topup_threshold
+
+    @staticmethod
+    def _id(idea: str) -> str:
+        return "research_" + hashlib.sha1(idea.strip().lower().encode("utf-8")).hexdigest()
+
+    def lookup(self, idea: str):
+        """Closest stored research as {"idea", "research", "similarity", "action"} (action: reuse | topup), or None."""
+        if self.memory.count() == 0: return None
+        result = self.memory.query(query_texts=[idea], n_results=1, include=["metadatas", "distances"])
+        if not result["ids"] or not result["ids"][0]: return None
+        metadata = result["metadatas"][0][0] or {}
+        similarity = 1.0 - float(result["distances"][0][0])
+        if similarity >= self.reuse_threshold: action = "reuse"
+        elif similarity >= self.topup_threshold: action = "topup"
+        else: return None
+        return {"idea": metadata.get("idea", ""), "research": metadata.get("research", ""), "similarity": round(similarity, 3), "action": action}
+
+    def store(self, idea: str, research: str):
+        """Upserts the research for an idea, and mirrors it into research_docs for the retrieval tool."""
+        record_id = self._id(idea)
+        self.memory.upsert(ids=[record_id], documents=[idea], metadatas=[{"idea": idea, "research": research, "updated_at": time.time()}])
+        if self.docs is not None:
+            self.docs.upsert(ids=[record_id], documents=[research], metadatas=[{"source": "research_memory", "idea": idea}])
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+def get_research_memory():
+    """Process-wide ResearchMemory, or None if disabled (MINDFLOW_RESEARCH_MEMORY=0) or Chroma is unavailable."""
+    global _memory
+    settings = get_settings()
+    if not settings.research_memory: return None
+    with _memory_lock:
+        if _memory is None:
+            try:
+                memory_collection = get_research_memory_collection()
+            except Exception as e:
+                print(f"Research memory unavailable: {e}"); memory_collection = None
+            if memory_collection is None: return None
+            _memory = ResearchMemory(
+                memory_collection, get_collection(),
+                reuse_threshold=settings.research_reuse_threshold,
+                topup_threshold=settings.research_topup_threshold,
+            )
+        return _memory